@@ -0,0 +1,124 @@
+import numpy
+from game import BACKGROUND_COLOR_BUCKETS, DEFAULT_BACKGROUND_COLOR
+
+
+class RelatedGamesAdjacency(object):
+    """Every game's un/related games in a GameNet network, as a compressed sparse row (CSR) structure.
+
+    The entries of the game in row i of the network's GameStore lie between offsets[i] and
+    offsets[i+1] of three flat arrays: the IDs of the un/related games, their scores, and their
+    background colors, as codes indexing into BACKGROUND_COLORS. Game titles and years get looked
+    up in the store only when rendered.
+    """
+
+    # A background color code indexes into this lookup table
+    BACKGROUND_COLORS = tuple(
+        background_color for _, _, background_color in BACKGROUND_COLOR_BUCKETS
+    ) + (DEFAULT_BACKGROUND_COLOR,)
+
+    def __init__(self, offsets, neighbor_ids, scores, background_color_codes, store):
+        """Initialize a RelatedGamesAdjacency object."""
+        self.offsets = offsets
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+        self.background_color_codes = background_color_codes
+        self.store = store
+
+    @classmethod
+    def from_related_games_strs(cls, related_games_strs, store):
+        """Build the structure from the un/related-games string of the game in each row of a store."""
+        counts = [related_games_str.count(',') + 1 for related_games_str in related_games_strs]
+        offsets = numpy.zeros(len(related_games_strs)+1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=offsets[1:])
+        # Each string is formatted 'id&score,id&score,...', so all of them together can be
+        # parsed in one go into alternating IDs and scores
+        all_entries_str = ','.join(related_games_strs)
+        if all_entries_str:
+            values = numpy.array(all_entries_str.replace('&', ',').split(','), dtype=numpy.float64)
+        else:
+            values = numpy.zeros(0, dtype=numpy.float64)
+        scores = values[1::2]
+        return cls(
+            offsets=offsets, neighbor_ids=values[0::2].astype(numpy.int32),
+            scores=scores.astype(numpy.float32),
+            # Bucket the scores before they lose precision, so that the colors come out exactly
+            # as RelatedGamesEntry.get_background_color() would give them
+            background_color_codes=cls.compute_background_color_codes(scores=scores),
+            store=store
+        )
+
+    @staticmethod
+    def compute_background_color_codes(scores):
+        """Return the code of each score's background color, by bucketing all of the scores at once."""
+        conditions = [comparison(scores, threshold) for comparison, threshold, _ in BACKGROUND_COLOR_BUCKETS]
+        background_color_codes = numpy.select(
+            conditions, range(len(conditions)), default=len(BACKGROUND_COLOR_BUCKETS)
+        )
+        return background_color_codes.astype(numpy.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def view(self, row):
+        """Return a lightweight view of the un/related games of the game in the given row of the store."""
+        return RelatedGamesView(adjacency=self, start=int(self.offsets[row]), end=int(self.offsets[row+1]))
+
+
+class RelatedGamesView(object):
+    """A view of one game's un/related games, which templates can iterate over as a list of entries."""
+
+    __slots__ = ('adjacency', 'start', 'end')
+
+    def __init__(self, adjacency, start, end):
+        """Initialize a RelatedGamesView object."""
+        self.adjacency = adjacency
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        for position in xrange(self.start, self.end):
+            yield RelatedGamesEntryView(adjacency=self.adjacency, position=position)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Related-games entry index out of range")
+        return RelatedGamesEntryView(adjacency=self.adjacency, position=self.start+i)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+
+class RelatedGamesEntryView(object):
+    """A view of an entry in a game's list of un/related games, with the attributes of a RelatedGamesEntry."""
+
+    __slots__ = ('adjacency', 'position')
+
+    def __init__(self, adjacency, position):
+        """Initialize a RelatedGamesEntryView object."""
+        self.adjacency = adjacency
+        self.position = position
+
+    @property
+    def game_id(self):
+        return str(self.adjacency.neighbor_ids[self.position])
+
+    @property
+    def score(self):
+        return float(self.adjacency.scores[self.position])
+
+    @property
+    def background_color(self):
+        return self.adjacency.BACKGROUND_COLORS[self.adjacency.background_color_codes[self.position]]
+
+    @property
+    def game_title(self):
+        return self.adjacency.store.get_field(self.adjacency.neighbor_ids[self.position], 'title')
+
+    @property
+    def game_year(self):
+        return self.adjacency.store.get_field(self.adjacency.neighbor_ids[self.position], 'year')
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+import warnings
+import Queue
+from sqlalchemy import event
+
+
+class AnalyticsEventQueue(object):
+    """A bounded, write-behind queue of analytics records (e.g., IconClick objects) to be saved to the database.
+
+    Routes record an event by putting its (not yet saved) model object into the queue, which
+    takes no locks on the database, and a background flusher thread saves the queued events in
+    batches, each in a single transaction; events recorded together (with record_all()) take up
+    one slot in the queue and always get saved in the same transaction. If the queue is full, a
+    route waits up to a timeout for space in it (backpressure) and then drops the event, and both
+    get counted. The flusher starts with the first event recorded, or the first call to start(),
+    in each process (so that it survives forking web servers), and on shutdown, close() saves
+    whatever is still queued. Listeners get told about events as they get recorded, and the
+    flusher also runs periodic tasks (e.g., checkpoints of what listeners have tallied), each
+    once more on shutdown.
+    """
+
+    def __init__(self, app, db, max_size=10000, batch_size=500, enqueue_timeout=0.0, poll_interval=1.0):
+        """Initialize an AnalyticsEventQueue object."""
+        self.app = app
+        self.db = db
+        self.events = Queue.Queue(maxsize=max_size)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        # How long the flusher waits for events before checking whether it's been closed
+        self.poll_interval = poll_interval
+        # If set, each event gets logged (with its ID) once it's been saved
+        self.logger = None
+        self.listeners = []
+        # Each is a [task, interval, next run time] list
+        self.periodic_tasks = []
+        self.lock = threading.Lock()
+        self.closing = threading.Event()
+        self.flusher = None
+        self.flusher_pid = None
+        self.enqueued = 0
+        self.waited = 0
+        self.dropped = 0
+        self.saved = 0
+        self.failed = 0
+        self.batches = 0
+
+    def add_listener(self, listener):
+        """Have a callable get called with each list of events recorded, in the recording thread."""
+        self.listeners.append(listener)
+
+    def add_periodic_task(self, task, interval):
+        """Have a callable get called (within an app context) by the flusher every interval seconds."""
+        self.periodic_tasks.append([task, interval, time.time() + interval])
+
+    def record(self, analytics_event):
+        """Queue an analytics event to be saved, or drop it if the queue stays full for too long."""
+        self.record_all(analytics_events=[analytics_event])
+
+    def record_all(self, analytics_events):
+        """Queue analytics events to be saved together, or drop them all if the queue stays full for too long."""
+        if not analytics_events:
+            return
+        if self.closing.is_set():
+            with self.lock:
+                self.dropped += len(analytics_events)
+            return
+        self.start()
+        try:
+            self.events.put_nowait(analytics_events)
+        except Queue.Full:
+            if not self._wait_to_enqueue(analytics_events=analytics_events):
+                with self.lock:
+                    self.dropped += len(analytics_events)
+                return
+        with self.lock:
+            self.enqueued += len(analytics_events)
+        for listener in self.listeners:
+            listener(analytics_events)
+
+    def _wait_to_enqueue(self, analytics_events):
+        """Wait for space in the full queue to put events in, returning whether there was any in time."""
+        if self.enqueue_timeout <= 0:
+            return False
+        with self.lock:
+            self.waited += len(analytics_events)
+        try:
+            self.events.put(analytics_events, timeout=self.enqueue_timeout)
+        except Queue.Full:
+            return False
+        return True
+
+    def start(self):
+        """Start the flusher thread, unless it's already running in this process.
+
+        Since the periodic tasks run on it, this should get called in each process that has any,
+        even if it never records an event (e.g., whenever it serves a request).
+        """
+        if self.flusher_pid == os.getpid():
+            return
+        with self.lock:
+            if self.flusher_pid != os.getpid():
+                self.flusher = threading.Thread(target=self._run_flusher, name='AnalyticsEventFlusher')
+                self.flusher.daemon = True
+                self.flusher.start()
+                self.flusher_pid = os.getpid()
+
+    def _run_flusher(self):
+        """Save queued events in batches until the queue is closed and empty."""
+        while True:
+            batch = []
+            try:
+                batch.extend(self.events.get(timeout=self.poll_interval))
+                # Take whatever else has piled up meanwhile, without waiting for more
+                while len(batch) < self.batch_size:
+                    batch.extend(self.events.get_nowait())
+            except Queue.Empty:
+                pass
+            if batch:
+                self._save_batch(batch=batch)
+            elif self.closing.is_set():
+                self._run_periodic_tasks(run_all=True)
+                return
+            self._run_periodic_tasks()
+
+    def _run_periodic_tasks(self, run_all=False):
+        """Run the periodic tasks that are due (or all of them)."""
+        for periodic_task in self.periodic_tasks:
+            task, interval, next_run_time = periodic_task
+            if not run_all and time.time() < next_run_time:
+                continue
+            with self.app.app_context():
+                try:
+                    task()
+                except Exception as error:
+                    warnings.warn("Periodic analytics task {} failed: {}".format(task, error))
+                finally:
+                    self.db.session.remove()
+            periodic_task[2] = time.time() + interval
+
+    def _save_batch(self, batch):
+        """Save a batch of events in a single transaction."""
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                session.add_all(batch)
+                # Flushing assigns the events their IDs, for logging
+                session.flush()
+                if self.logger:
+                    for analytics_event in batch:
+                        self.logger.debug(analytics_event)
+                session.commit()
+            except Exception as error:
+                session.rollback()
+                with self.lock:
+                    self.failed += len(batch)
+                warnings.warn("Couldn't save {} analytics events: {}".format(len(batch), error))
+            else:
+                with self.lock:
+                    self.saved += len(batch)
+                    self.batches += 1
+            finally:
+                session.remove()
+
+    def close(self, timeout=30.0):
+        """Stop accepting events and wait (up to a timeout, in seconds) for the queued ones to be saved."""
+        self.closing.set()
+        if self.flusher is not None and self.flusher_pid == os.getpid():
+            self.flusher.join(timeout)
+
+    def stats(self):
+        """Return the queue's size and its counts of enqueued, waited-on, dropped, saved, and failed events."""
+        with self.lock:
+            return {
+                'size': self.events.qsize(), 'max_size': self.max_size, 'enqueued': self.enqueued,
+                'waited': self.waited, 'dropped': self.dropped, 'saved': self.saved, 'failed': self.failed,
+                'batches': self.batches,
+            }
+
+
+def enable_write_ahead_logging(engine):
+    """Have a SQLite engine's connections use write-ahead logging, so readers and writers don't block each other."""
+    @event.listens_for(engine, 'connect')
+    def set_journal_mode(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # In WAL mode, this is still safe against corruption, and commits needn't wait on fsync
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
@@ -0,0 +1,128 @@
+"""Build approximate similarity indexes for GameSage, and report their recall and latency against exact search.
+
+Run this from the directory containing routes.py, e.g.:
+
+    python ann_report.py --networks ontology --clusters 400 --probes 4 8 16 32 --save
+
+For each network, it clusters the games' LSA vectors into an approximate (IVF) similarity index
+(see approximate_similarity.py), and then searches both indexes with a random sample of the
+games' own LSA vectors as queries. For each number of probes (clusters searched per query), it
+reports recall@k, i.e., the fraction of the exact k most (and least) related games that the
+approximate search also returns, along with the mean query latency of each search, and the
+smallest number of probes that meets the target recall. With --save, the index gets saved as a
+snapshot, to be loaded at startup by any network whose GAMESAGE_APPROXIMATE_SEARCH_PROBES
+setting (in routes.py) is a number of probes rather than None; exact search stays in use until
+then.
+"""
+
+import argparse
+import sys
+import time
+import numpy
+from approximate_similarity import IVFSimilarityIndex
+from loading import (
+    load_gamesage_ontology_database, load_gamesage_gameplay_database, build_similarity_index,
+    build_approximate_similarity_index
+)
+
+LOADERS = {'ontology': load_gamesage_ontology_database, 'gameplay': load_gamesage_gameplay_database}
+
+
+def compute_recall(approximate_results, exact_results):
+    """Return the fraction of the exact results' games that are among the approximate results' games."""
+    exact_indices = set(index for index, _ in exact_results)
+    if not exact_indices:
+        return 1.0
+    return len(exact_indices.intersection(index for index, _ in approximate_results)) / float(len(exact_indices))
+
+
+def time_queries(similarity_index, query_vectors, k):
+    """Run each query against an index, returning the results and the mean latency in milliseconds."""
+    start_time = time.time()
+    results = [similarity_index.most_and_least_related(lsa_vector=query_vector, k=k) for query_vector in query_vectors]
+    return results, (time.time() - start_time) * 1000.0 / max(len(query_vectors), 1)
+
+
+def report_network(network, args):
+    """Build a network's approximate index, and print its recall and latency for each number of probes."""
+    database = LOADERS[network]()
+    exact_index = build_similarity_index(database=database, network=network)
+    number_of_clusters = args.clusters or max(int(numpy.sqrt(len(database))), 1)
+    start_time = time.time()
+    if args.save:
+        approximate_index = build_approximate_similarity_index(
+            similarity_index=exact_index, network=network, number_of_clusters=number_of_clusters,
+            number_of_iterations=args.iterations, sample_size=args.sample_size
+        )
+    else:
+        approximate_index = IVFSimilarityIndex.build(
+            exact_index=exact_index, number_of_clusters=number_of_clusters, number_of_iterations=args.iterations,
+            sample_size=args.sample_size
+        )
+    build_time = time.time() - start_time
+    random_state = numpy.random.RandomState(args.seed)
+    query_rows = random_state.choice(len(database), size=min(args.queries, len(database)), replace=False)
+    query_vectors = [numpy.asarray(database[int(row)].lsa_vector) for row in query_rows]
+    exact_results, exact_latency = time_queries(similarity_index=exact_index, query_vectors=query_vectors, k=args.k)
+    cluster_sizes = approximate_index.cluster_sizes
+    lines = [
+        "{} ({} games, {} clusters of {}-{} games, built in {:.1f} s{}):".format(
+            network, len(database), len(cluster_sizes), cluster_sizes.min(), cluster_sizes.max(), build_time,
+            ', saved' if args.save else ''
+        ),
+        "    exact search: {:.3f} ms/query".format(exact_latency),
+        "    {:>8} {:>12} {:>12} {:>10} {:>9}".format(
+            'probes', 'most r@{}'.format(args.k), 'least r@{}'.format(args.k), 'ms/query', 'speedup'
+        ),
+    ]
+    smallest_number_of_probes_on_target = None
+    for number_of_probes in sorted(args.probes):
+        approximate_index.number_of_probes = number_of_probes
+        approximate_results, approximate_latency = time_queries(
+            similarity_index=approximate_index, query_vectors=query_vectors, k=args.k
+        )
+        most_related_recall = numpy.mean([
+            compute_recall(approximate_results=approximate[0], exact_results=exact[0])
+            for approximate, exact in zip(approximate_results, exact_results)
+        ])
+        least_related_recall = numpy.mean([
+            compute_recall(approximate_results=approximate[1], exact_results=exact[1])
+            for approximate, exact in zip(approximate_results, exact_results)
+        ])
+        on_target = min(most_related_recall, least_related_recall) >= args.target_recall
+        if on_target and smallest_number_of_probes_on_target is None:
+            smallest_number_of_probes_on_target = number_of_probes
+        lines.append("    {:>8} {:>12.4f} {:>12.4f} {:>10.3f} {:>8.1f}x".format(
+            number_of_probes, most_related_recall, least_related_recall, approximate_latency,
+            exact_latency / max(approximate_latency, 1e-9)
+        ))
+    if smallest_number_of_probes_on_target is None:
+        lines.append("    No number of probes met the target recall of {}; keep using exact search".format(
+            args.target_recall
+        ))
+    else:
+        lines.append("    The target recall of {} takes {} probes".format(
+            args.target_recall, smallest_number_of_probes_on_target
+        ))
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the recall and latency of approximate GameSage search.")
+    parser.add_argument('--networks', nargs='+', choices=sorted(LOADERS), default=sorted(LOADERS))
+    parser.add_argument('--clusters', type=int, help="clusters per index (default: the square root of the games)")
+    parser.add_argument('--iterations', type=int, default=20, help="k-means iterations")
+    parser.add_argument('--sample-size', type=int, help="games to train the clusters on (default: all of them)")
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--target-recall', type=float, default=0.95)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', action='store_true', help="save each index, to be loaded at startup")
+    args = parser.parse_args()
+    for network in args.networks:
+        report_network(network=network, args=args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import numpy
+from similarity import LSASimilarityIndex
+
+
+class IVFSimilarityIndex(object):
+    """An approximate similarity index over the games in a GameSage database, for catalogs too big to scan per query.
+
+    The games' unit-length LSA vectors get clustered by cosine similarity (spherical k-means), and
+    stored grouped by cluster (an inverted file, or IVF). A query gets scored against the cluster
+    centroids, and then only against the games in the clusters whose centroids are most similar
+    to it (for its most related games) and least similar to it (for its least related games).
+    Probing more clusters trades latency for recall. The index is built offline (see
+    ann_report.py), saved as a snapshot, and loaded at startup over the exact index, which it
+    defers to for everything but the search itself.
+    """
+
+    def __init__(self, exact_index, centroids, permutation, offsets, clustered_matrix, number_of_probes=8):
+        """Initialize an IVFSimilarityIndex object."""
+        self.exact_index = exact_index
+        self.game_ids = exact_index.game_ids
+        self.index_of_game_id = exact_index.index_of_game_id
+        self.number_of_dimensions = exact_index.number_of_dimensions
+        self.matrix = exact_index.matrix
+        # The unit-length centroid of each cluster
+        self.centroids = centroids
+        # The database indices of the games, grouped by cluster, with the games of cluster c at
+        # positions offsets[c] to offsets[c+1]
+        self.permutation = permutation
+        self.offsets = offsets
+        self.cluster_sizes = numpy.diff(offsets)
+        # The rows of the exact index's matrix, in the order of the permutation, so that each
+        # cluster's games can be scored as one contiguous block
+        self.clustered_matrix = clustered_matrix
+        # How many clusters get searched per query (more get searched if these hold fewer than k games)
+        self.number_of_probes = number_of_probes
+
+    @classmethod
+    def build(cls, exact_index, number_of_clusters, number_of_iterations=20, sample_size=None, number_of_probes=8,
+              seed=0):
+        """Cluster the games of an exact index, and build an approximate index over it.
+
+        The centroids get trained on a random sample of sample_size games (or on all of them,
+        if it's None), and then every game gets assigned to its nearest centroid.
+        """
+        centroids = train_spherical_k_means(
+            matrix=exact_index.matrix, number_of_clusters=number_of_clusters,
+            number_of_iterations=number_of_iterations, sample_size=sample_size, seed=seed
+        )
+        assignments, _ = assign_to_clusters(matrix=exact_index.matrix, centroids=centroids)
+        permutation = numpy.argsort(assignments, kind='mergesort').astype(numpy.int32)
+        offsets = numpy.zeros(len(centroids) + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum(numpy.bincount(assignments, minlength=len(centroids)))
+        clustered_matrix = numpy.ascontiguousarray(exact_index.matrix[permutation])
+        return cls(
+            exact_index=exact_index, centroids=centroids, permutation=permutation, offsets=offsets,
+            clustered_matrix=clustered_matrix, number_of_probes=number_of_probes
+        )
+
+    def to_arrays(self):
+        """Return the arrays making up the index, to be saved as a snapshot."""
+        return {
+            'centroids': self.centroids, 'permutation': self.permutation, 'offsets': self.offsets,
+            'clustered_matrix': self.clustered_matrix,
+        }
+
+    @classmethod
+    def from_arrays(cls, exact_index, arrays, number_of_probes=8):
+        """Rebuild an index from its arrays, as saved in a snapshot."""
+        return cls(
+            exact_index=exact_index, centroids=arrays['centroids'], permutation=arrays['permutation'],
+            offsets=arrays['offsets'], clustered_matrix=arrays['clustered_matrix'], number_of_probes=number_of_probes
+        )
+
+    def vectorize(self, lsa_vector):
+        """Convert an LSA vector into a unit-length array."""
+        return self.exact_index.vectorize(lsa_vector)
+
+    def score(self, lsa_vector):
+        """Return the cosine similarity between an LSA vector and every game in the index (exactly)."""
+        return self.exact_index.score(lsa_vector)
+
+    def _select_clusters(self, ordered_clusters, k):
+        """Return the leading clusters of an ordering to search: the number of probes, or more to hold k games."""
+        cumulative_sizes = numpy.cumsum(self.cluster_sizes[ordered_clusters])
+        number_of_clusters = max(self.number_of_probes, int(numpy.searchsorted(cumulative_sizes, k)) + 1)
+        return ordered_clusters[:number_of_clusters]
+
+    def _search(self, query_vector, clusters, k, most_related):
+        """Score the games in the given clusters, returning the k most (or least) related as (index, score) tuples."""
+        candidate_indices = numpy.concatenate([
+            self.permutation[self.offsets[cluster]:self.offsets[cluster+1]] for cluster in clusters
+        ])
+        candidate_scores = numpy.concatenate([
+            numpy.dot(self.clustered_matrix[self.offsets[cluster]:self.offsets[cluster+1]], query_vector)
+            for cluster in clusters
+        ])
+        most_related_candidates, least_related_candidates = LSASimilarityIndex.select_extremes(
+            scores=candidate_scores, k=k
+        )
+        candidates = most_related_candidates if most_related else least_related_candidates
+        return [(int(candidate_indices[i]), score) for i, score in candidates]
+
+    def most_and_least_related(self, lsa_vector, k=50):
+        """Return the (approximately) k most related and k least related games to an LSA vector.
+
+        Each is a list of (database index, score) tuples, ordered as in the exact index's method.
+        """
+        query_vector = self.vectorize(lsa_vector)
+        centroid_scores = numpy.dot(self.centroids, query_vector)
+        ordered_clusters = numpy.argsort(-centroid_scores, kind='mergesort')
+        most_related = self._search(
+            query_vector=query_vector, clusters=self._select_clusters(ordered_clusters=ordered_clusters, k=k), k=k,
+            most_related=True
+        )
+        least_related = self._search(
+            query_vector=query_vector, clusters=self._select_clusters(ordered_clusters=ordered_clusters[::-1], k=k),
+            k=k, most_related=False
+        )
+        return most_related, least_related
+
+    def most_and_least_related_to_each(self, lsa_vectors, k=50):
+        """Return the (approximately) k most related and k least related games to each of a list of LSA vectors."""
+        return [self.most_and_least_related(lsa_vector=lsa_vector, k=k) for lsa_vector in lsa_vectors]
+
+
+def assign_to_clusters(matrix, centroids, chunk_size=65536):
+    """Return the cluster of each unit-length row (that of its most similar centroid), and its similarity to it."""
+    assignments = numpy.zeros(len(matrix), dtype=numpy.int32)
+    similarities = numpy.zeros(len(matrix), dtype=numpy.float32)
+    for chunk_start in xrange(0, len(matrix), chunk_size):
+        score_matrix = numpy.dot(matrix[chunk_start:chunk_start+chunk_size], centroids.T)
+        assignments[chunk_start:chunk_start+len(score_matrix)] = numpy.argmax(score_matrix, axis=1)
+        similarities[chunk_start:chunk_start+len(score_matrix)] = numpy.max(score_matrix, axis=1)
+    return assignments, similarities
+
+
+def train_spherical_k_means(matrix, number_of_clusters, number_of_iterations=20, sample_size=None, seed=0):
+    """Cluster unit-length rows by cosine similarity, returning the clusters' unit-length centroids."""
+    random_state = numpy.random.RandomState(seed)
+    if sample_size is not None and sample_size < len(matrix):
+        sample_rows = numpy.sort(random_state.choice(len(matrix), size=sample_size, replace=False))
+        sample = numpy.asarray(matrix[sample_rows], dtype=numpy.float32)
+    else:
+        sample = numpy.asarray(matrix, dtype=numpy.float32)
+    number_of_clusters = min(number_of_clusters, len(sample))
+    centroids = sample[random_state.choice(len(sample), size=number_of_clusters, replace=False)].copy()
+    for _ in xrange(number_of_iterations):
+        assignments, similarities = assign_to_clusters(matrix=sample, centroids=centroids)
+        cluster_sizes = numpy.bincount(assignments, minlength=number_of_clusters)
+        nonempty_clusters = numpy.flatnonzero(cluster_sizes)
+        # Sum each cluster's rows in one pass over the sample, sorted by cluster
+        order = numpy.argsort(assignments, kind='mergesort')
+        cluster_starts = (numpy.cumsum(cluster_sizes) - cluster_sizes)[nonempty_clusters]
+        sums = numpy.zeros_like(centroids)
+        sums[nonempty_clusters] = numpy.add.reduceat(sample[order], cluster_starts, axis=0)
+        # Reseed any empty clusters with the rows that fit their clusters worst
+        empty_clusters = numpy.flatnonzero(cluster_sizes == 0)
+        if len(empty_clusters):
+            sums[empty_clusters] = sample[numpy.argsort(similarities, kind='mergesort')[:len(empty_clusters)]]
+        centroids = LSASimilarityIndex.normalize_rows(sums)
+    return centroids
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+from flask import request, make_response
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The static files that pages link to (the static folder also holds the models and data files,
+# which aren't for browsers)
+ASSET_EXTENSIONS = ('.png', '.ico', '.jpg', '.gif', '.svg', '.js', '.css')
+# The assets worth compressing (images in compressed formats, e.g., PNGs, aren't)
+COMPRESSIBLE_EXTENSIONS = ('.ico', '.svg', '.js', '.css')
+# How long browsers and proxies may keep a fingerprinted asset, which never changes under its name
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# The content encodings that assets may be served with, in order of preference
+CONTENT_ENCODINGS = ('br', 'gzip')
+
+
+class StaticAsset(object):
+    """A static file, held in memory in each of the encodings that it may be served with."""
+
+    def __init__(self, filename, fingerprint, bodies):
+        """Initialize a StaticAsset object."""
+        self.filename = filename
+        self.fingerprint = fingerprint
+        # This maps each content encoding (or 'identity', for none) to the body in that encoding
+        self.bodies = bodies
+        self.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    @property
+    def fingerprinted_filename(self):
+        """Return the filename with the fingerprint inserted before its extension, e.g., 'logo.0123456789ab.png'."""
+        root, extension = os.path.splitext(self.filename)
+        return '{}.{}{}'.format(root, self.fingerprint, extension)
+
+
+class StaticAssetManifest(object):
+    """The fingerprinted names and precompressed variants of the static assets in a static folder.
+
+    Each asset's fingerprint is a hash of its contents, so a fingerprinted name always refers to
+    the same contents, and its responses can be cached forever. Everything gets read and
+    compressed once, when the manifest gets built (e.g., at startup).
+    """
+
+    def __init__(self, static_folder):
+        """Initialize a StaticAssetManifest object."""
+        self.static_folder = static_folder
+        self.assets_by_filename = {}
+        self.assets_by_fingerprinted_filename = {}
+        for filename in sorted(os.listdir(static_folder)):
+            if not filename.lower().endswith(ASSET_EXTENSIONS):
+                continue
+            with open(os.path.join(static_folder, filename), 'rb') as asset_file:
+                asset = self._build_asset(filename=filename, body=asset_file.read())
+            self.assets_by_filename[filename] = asset
+            self.assets_by_fingerprinted_filename[asset.fingerprinted_filename] = asset
+
+    @staticmethod
+    def _build_asset(filename, body):
+        """Fingerprint an asset, and compress it in each content encoding that makes it smaller."""
+        bodies = {'identity': body}
+        if filename.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            compressed_bodies = {'gzip': compress_with_gzip(body)}
+            if brotli is not None:
+                compressed_bodies['br'] = brotli.compress(body)
+            for content_encoding, compressed_body in compressed_bodies.iteritems():
+                if len(compressed_body) < len(body):
+                    bodies[content_encoding] = compressed_body
+        return StaticAsset(filename=filename, fingerprint=hashlib.sha1(body).hexdigest()[:12], bodies=bodies)
+
+    def get_fingerprinted_filename(self, filename):
+        """Return an asset's fingerprinted filename, or the filename as is if it isn't an asset."""
+        asset = self.assets_by_filename.get(filename)
+        if asset is None:
+            return filename
+        return asset.fingerprinted_filename
+
+    def serve(self, filename, fallback):
+        """Serve a fingerprinted asset in the best encoding that the request accepts, or else call the fallback."""
+        asset = self.assets_by_fingerprinted_filename.get(filename)
+        if asset is None:
+            return fallback(filename)
+        content_encoding = 'identity'
+        for candidate_content_encoding in CONTENT_ENCODINGS:
+            if candidate_content_encoding in asset.bodies and request.accept_encodings[candidate_content_encoding]:
+                content_encoding = candidate_content_encoding
+                break
+        response = make_response(asset.bodies[content_encoding])
+        response.mimetype = asset.mimetype
+        if content_encoding != 'identity':
+            response.headers['Content-Encoding'] = content_encoding
+        response.vary.add('Accept-Encoding')
+        # Each encoding of the asset is a different representation, which needs its own ETag
+        response.set_etag('{}-{}'.format(asset.fingerprint, content_encoding))
+        response.headers['Cache-Control'] = 'public, max-age={}, immutable'.format(IMMUTABLE_MAX_AGE)
+        return response.make_conditional(request)
+
+
+def compress_with_gzip(body):
+    """Compress a body as gzip, deterministically (i.e., with no timestamp in the header)."""
+    compressed_file = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed_file, mode='wb', compresslevel=9, mtime=0) as gzip_file:
+        gzip_file.write(body)
+    return compressed_file.getvalue()
+
+
+def install_static_asset_manifest(app):
+    """Have an app's url_for('static', ...) give fingerprinted URLs, and serve them with far-future caching.
+
+    URLs of static files that aren't fingerprinted assets still get served as before.
+    """
+    manifest = StaticAssetManifest(static_folder=app.static_folder)
+    send_static_file = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.get_fingerprinted_filename(values['filename'])
+
+    def serve_static_file(filename):
+        return manifest.serve(filename=filename, fallback=send_static_file)
+
+    app.view_functions['static'] = serve_static_file
+    return manifest
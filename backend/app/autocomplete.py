@@ -0,0 +1,78 @@
+import bisect
+import re
+import numpy
+
+
+class TitleAutocompleter(object):
+    """An in-memory prefix index over a GameNet network's titles, for completing what a user is typing.
+
+    There are two sorted arrays of case-folded keys, each searched by bisection: one of the whole
+    titles, and one of the suffixes of the titles that begin at each of their later words, so
+    that, e.g., both 'super' and 'mario k' complete to 'Super Mario Kart'. Matches of the whole
+    title come first, and each kind of match is ordered alphabetically, or else, if popularity
+    scores are given, by popularity. The games matching a prefix occupy a contiguous range of
+    each array, so ranking them by popularity takes a single numpy sort of that range.
+    """
+
+    WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+    def __init__(self, store):
+        """Initialize a TitleAutocompleter object."""
+        self.store = store
+        self.title_keys, self.title_rows = self._build_index(keys_and_rows=(
+            (store.casefold(title), row) for row, title in enumerate(store.columns['title'])
+        ))
+        self.word_start_keys, self.word_start_rows = self._build_index(keys_and_rows=(
+            (key[word.start():], row) for key, row in zip(self.title_keys, self.title_rows)
+            for word in self.WORD_PATTERN.finditer(key) if word.start() > 0
+        ))
+
+    @staticmethod
+    def _build_index(keys_and_rows):
+        """Sort (key, row) pairs, returning a list of the keys and a parallel array of the rows."""
+        keys_and_rows = sorted(keys_and_rows)
+        return [key for key, _ in keys_and_rows], numpy.array([row for _, row in keys_and_rows], dtype=numpy.int32)
+
+    @staticmethod
+    def _find_rows_with_prefix(keys, rows, prefix, popularity_scores=None):
+        """Yield the rows whose keys begin with the prefix, in key order or by popularity (lazily, to stop early)."""
+        start = bisect.bisect_left(keys, prefix)
+        if popularity_scores is None:
+            i = start
+            while i < len(keys) and keys[i].startswith(prefix):
+                yield rows[i]
+                i += 1
+            return
+        # The keys beginning with the prefix all sort before the prefix with its last character incremented
+        end = bisect.bisect_left(keys, prefix[:-1] + unichr(ord(prefix[-1]) + 1), start)
+        matching_rows = rows[start:end]
+        # A stable sort keeps equally popular games in alphabetical order
+        for row in matching_rows[numpy.argsort(-popularity_scores[matching_rows], kind='mergesort')]:
+            yield row
+
+    def complete(self, query, k=10, popularity_scores=None):
+        """Return up to k (title, game ID) pairs of the games whose titles, or any words in them, begin with the query.
+
+        If given, the popularity scores (an array indexed by store row) rank each kind of match.
+        """
+        prefix = self.store.casefold(query.strip())
+        if not prefix or k <= 0:
+            return []
+        matching_rows = []
+        seen_rows = set()
+        for keys, rows in ((self.title_keys, self.title_rows), (self.word_start_keys, self.word_start_rows)):
+            # A game might match both as a whole and at several of its words
+            for row in self._find_rows_with_prefix(
+                keys=keys, rows=rows, prefix=prefix, popularity_scores=popularity_scores
+            ):
+                row = int(row)
+                if row not in seen_rows:
+                    seen_rows.add(row)
+                    matching_rows.append(row)
+                    if len(matching_rows) == k:
+                        break
+            if len(matching_rows) == k:
+                break
+        titles = self.store.columns['title']
+        ids = self.store.columns['id']
+        return [(titles[row], ids[row]) for row in matching_rows]
@@ -0,0 +1,219 @@
+import collections
+import threading
+import time
+import uuid
+
+
+class GameSageResultCache(object):
+    """A bounded, thread-safe LRU cache of GameSage results, keyed on a preprocessed text's bag of words.
+
+    Many different raw texts reduce to the same bag of words, and for any of them, the cache
+    holds the folded-in LSA vector and, for the largest k that has been requested, the k most
+    and least related games (both as lists and as the strings that GameNet parses), which get
+    sliced for any smaller k, so that each entry holds one set of results at most.
+    """
+
+    def __init__(self, max_size=10000):
+        """Initialize a GameSageResultCache object."""
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        # The models that the cached results were computed with; if we're asked about
+        # results for any others (i.e., the models were reloaded), we start over
+        self.fold_in = None
+        self.similarity_index = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _check_models(self, fold_in, similarity_index):
+        """Empty the cache if the given models aren't the ones its results were computed with (hold the lock)."""
+        if fold_in is not self.fold_in or similarity_index is not self.similarity_index:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.fold_in = fold_in
+            self.similarity_index = similarity_index
+
+    def get(self, bag_of_words, k, fold_in, similarity_index):
+        """Return a (LSA vector, results) pair for the bag of words, where either may be None if not cached.
+
+        The results, if any, are a (most related games, least related games, most related games
+        string, least related games string) tuple for the given k.
+        """
+        with self.lock:
+            self._check_models(fold_in=fold_in, similarity_index=similarity_index)
+            try:
+                entry = self.entries.pop(bag_of_words)
+            except KeyError:
+                self.misses += 1
+                return None, None
+            # Reinsert the entry to mark it as the most recently used
+            self.entries[bag_of_words] = entry
+            lsa_vector, cached_k, results = entry
+            if k > cached_k:
+                self.misses += 1
+                return lsa_vector, None
+            self.hits += 1
+        return lsa_vector, self._slice_results(results=results, cached_k=cached_k, k=k)
+
+    @staticmethod
+    def _slice_results(results, cached_k, k):
+        """Cut a results tuple for a larger k down to that for k (the games are ordered most extreme first)."""
+        if k == cached_k:
+            return results
+        most_related_games, least_related_games, most_related_games_str, least_related_games_str = results
+        return (
+            most_related_games[:k], least_related_games[:k], ','.join(most_related_games_str.split(',')[:k]),
+            ','.join(least_related_games_str.split(',')[:k])
+        )
+
+    def set(self, bag_of_words, k, lsa_vector, results, fold_in, similarity_index):
+        """Cache the LSA vector for the bag of words, along with its results for the given k.
+
+        The results replace any cached for a smaller k, but not any cached for a larger k, which
+        already hold them.
+        """
+        with self.lock:
+            self._check_models(fold_in=fold_in, similarity_index=similarity_index)
+            entry = self.entries.pop(bag_of_words, None)
+            if entry is None or k > entry[1]:
+                entry = (lsa_vector, k, results)
+            self.entries[bag_of_words] = entry
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Empty the cache."""
+        with self.lock:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+
+    def stats(self):
+        """Return the cache's size and its hit, miss, eviction, and invalidation counts."""
+        with self.lock:
+            return {
+                'size': len(self.entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'invalidations': self.invalidations,
+            }
+
+
+class RenderedPageCache(object):
+    """A bounded, thread-safe LRU cache of rendered pages, each held as its encoded body and its ETag."""
+
+    def __init__(self, max_size=1000):
+        """Initialize a RenderedPageCache object."""
+        self.max_size = max_size
+        self.pages = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    def get(self, key):
+        """Return the (body, ETag) pair of the page cached under the key, or None if there isn't one."""
+        with self.lock:
+            try:
+                page = self.pages.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            # Reinsert the page to mark it as the most recently used
+            self.pages[key] = page
+            self.hits += 1
+            return page
+
+    def set(self, key, body, etag):
+        """Cache a page's body and ETag under the key."""
+        with self.lock:
+            self.pages.pop(key, None)
+            self.pages[key] = (body, etag)
+            while len(self.pages) > self.max_size:
+                self.pages.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Return the cache's size and its hit, miss, and eviction counts."""
+        with self.lock:
+            return {
+                'size': len(self.pages), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class RefinementSessionStore(object):
+    """A bounded, thread-safe LRU store of GameSage refinement sessions, each under a random handle.
+
+    A session expires once it has gone unused for its time to live (in seconds). Sessions live
+    in the memory of the worker process that started them, so with several workers, requests
+    for a session must reach the same worker (e.g., via sticky sessions), or else get told
+    that it's expired.
+    """
+
+    def __init__(self, max_size=10000, time_to_live=3600):
+        """Initialize a RefinementSessionStore object."""
+        self.max_size = max_size
+        self.time_to_live = time_to_live
+        # Each is a [session, last use time] list
+        self.sessions = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, session):
+        """Store a session, returning its handle."""
+        handle = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[handle] = [session, time.time()]
+            self._expire_sessions()
+            while len(self.sessions) > self.max_size:
+                self.sessions.popitem(last=False)
+                self.evictions += 1
+        return handle
+
+    def get(self, handle):
+        """Return the session stored under the handle, or None if there isn't one (or it has expired)."""
+        with self.lock:
+            self._expire_sessions()
+            try:
+                entry = self.sessions.pop(handle)
+            except KeyError:
+                self.misses += 1
+                return None
+            # Reinsert the entry to mark it as the most recently used
+            entry[1] = time.time()
+            self.sessions[handle] = entry
+            self.hits += 1
+            return entry[0]
+
+    def _expire_sessions(self):
+        """Drop the sessions that have gone unused for too long, which are the least recently used (hold the lock)."""
+        expiration_time = time.time() - self.time_to_live
+        while self.sessions:
+            handle, (_, last_use_time) = next(self.sessions.iteritems())
+            if last_use_time > expiration_time:
+                break
+            del self.sessions[handle]
+            self.expirations += 1
+
+    def stats(self):
+        """Return the store's size and its hit, miss, eviction, and expiration counts."""
+        with self.lock:
+            return {
+                'size': len(self.sessions), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'expirations': self.expirations,
+            }
@@ -0,0 +1,113 @@
+import numpy
+
+
+class LSAFoldIn(object):
+    """A fast path for folding text into an LSA model, precomputed from a network's dictionary and models."""
+
+    # The fast path must agree with chaining gensim's transformations to within this absolute
+    # difference along every LSA dimension; until verify() has confirmed this, the gensim chain
+    # gets used instead
+    TOLERANCE = 1e-6
+
+    def __init__(self, term_id_dictionary, tf_idf_model, lsa_model):
+        """Initialize an LSAFoldIn object."""
+        self.term_id_dictionary = term_id_dictionary
+        self.tf_idf_model = tf_idf_model
+        self.lsa_model = lsa_model
+        self.token2id = term_id_dictionary.token2id
+        self.idfs = self._build_idf_array()
+        # gensim's LSA transformation projects a tf-idf vector onto the left singular vectors
+        # (unscaled by the singular values); slicing gives a view of those vectors with the first
+        # dimension excluded, without copying the (large) matrix
+        self.projection = lsa_model.projection.u[:, 1:lsa_model.num_topics]
+        self.number_of_dimensions = self.projection.shape[1]
+        self.verified = False
+
+    def _build_idf_array(self):
+        """Build a dense array of the tf-idf model's per-term idf weights, indexed by term ID."""
+        number_of_terms = max(len(self.token2id), self.lsa_model.num_terms)
+        idfs = numpy.zeros(number_of_terms, dtype=numpy.float64)
+        for term_id, idf in self.tf_idf_model.idfs.iteritems():
+            if term_id < number_of_terms:
+                idfs[term_id] = idf
+        return idfs
+
+    def bag_of_words(self, tokens):
+        """Return the bag of words for a preprocessed text, as the term-ID dictionary's doc2bow() would.
+
+        This is a tuple of (term ID, count) pairs, sorted by term ID, which makes it hashable.
+        """
+        term_counts = {}
+        for token in tokens:
+            term_id = self.token2id.get(token)
+            if term_id is not None:
+                term_counts[term_id] = term_counts.get(term_id, 0) + 1
+        return tuple(sorted(term_counts.iteritems()))
+
+    def fold_in(self, tokens):
+        """Return the LSA vector for a preprocessed text, given as a list of tokens, as a dense array."""
+        return self.fold_in_bag_of_words(bag_of_words=self.bag_of_words(tokens=tokens))
+
+    def fold_in_bag_of_words(self, bag_of_words):
+        """Return the LSA vector for a bag of words, as a dense array."""
+        if self.verified:
+            return self._fold_in_fast(bag_of_words=bag_of_words)
+        return self._fold_in_via_gensim(bag_of_words=bag_of_words)
+
+    def _fold_in_fast(self, bag_of_words):
+        """Return the LSA vector for a bag of words by gathering and summing rows of the projection."""
+        lsa_vector = numpy.zeros(self.number_of_dimensions, dtype=numpy.float64)
+        if not bag_of_words:
+            return lsa_vector
+        term_ids = numpy.array([term_id for term_id, _ in bag_of_words], dtype=numpy.int64)
+        counts = numpy.array([count for _, count in bag_of_words], dtype=numpy.float64)
+        tf_idf_weights = counts * self.idfs[term_ids]
+        # The tf-idf model normalizes its vectors to unit length
+        norm = numpy.sqrt(numpy.dot(tf_idf_weights, tf_idf_weights))
+        if not norm:
+            return lsa_vector
+        tf_idf_weights /= norm
+        numpy.dot(tf_idf_weights, self.projection[term_ids], out=lsa_vector)
+        return lsa_vector
+
+    def _fold_in_via_gensim(self, bag_of_words):
+        """Return the LSA vector for a bag of words, as a dense array, by chaining gensim's transformations."""
+        tf_idf_vector = self.tf_idf_model[list(bag_of_words)]
+        document_lsa_vector = self.lsa_model[tf_idf_vector]
+        lsa_vector = numpy.zeros(self.number_of_dimensions, dtype=numpy.float64)
+        # Exclude first dimension, as we've already done with the existing LSA vectors
+        for dimension_index, value in document_lsa_vector:
+            if 0 < dimension_index <= self.number_of_dimensions:
+                lsa_vector[dimension_index-1] = value
+        return lsa_vector
+
+    def verify(self, sample_token_lists=None):
+        """Check that the fast path agrees with gensim's transformations on sample texts, enabling it if so."""
+        if sample_token_lists is None:
+            sample_token_lists = self._build_sample_token_lists()
+        for tokens in sample_token_lists:
+            # Check our bag of words against the dictionary's own, too
+            bag_of_words = self.bag_of_words(tokens=tokens)
+            if list(bag_of_words) != self.term_id_dictionary.doc2bow(tokens):
+                self.verified = False
+                return False
+            deviation = numpy.max(numpy.abs(
+                self._fold_in_fast(bag_of_words=bag_of_words) - self._fold_in_via_gensim(bag_of_words=bag_of_words)
+            ))
+            if deviation > self.TOLERANCE:
+                self.verified = False
+                return False
+        self.verified = True
+        return True
+
+    def _build_sample_token_lists(self, number_of_samples=20, tokens_per_sample=40):
+        """Build sample texts, with repeated tokens, from terms spread evenly across the dictionary."""
+        tokens = sorted(self.token2id, key=self.token2id.get)
+        stride = max(1, len(tokens) // (number_of_samples * tokens_per_sample))
+        tokens = tokens[::stride]
+        sample_token_lists = []
+        for i in xrange(number_of_samples):
+            sample = tokens[i*tokens_per_sample:(i+1)*tokens_per_sample]
+            # Repeat some tokens, so that term frequencies other than one get checked too
+            sample_token_lists.append(sample + sample[:i])
+        return sample_token_lists
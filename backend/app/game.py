@@ -1,8 +1,40 @@
+import operator
+import numpy
+
+# The background colors of un/related-games entries: an entry gets the color of the first of
+# these buckets whose comparison its score satisfies, and otherwise the default color
+BACKGROUND_COLOR_BUCKETS = (
+    # Related-game background colors
+    (operator.gt, 0.95, "#E64C00"),
+    (operator.gt, 0.9, "#FF6D00"),
+    (operator.gt, 0.8, "#FF7900"),
+    (operator.gt, 0.7, "#FF8500"),
+    (operator.gt, 0.6, "#FF9100"),
+    (operator.gt, 0.5, "#FF9D00"),
+    (operator.gt, 0.4, "#FFA900"),
+    (operator.gt, 0.3, "#FFB500"),
+    (operator.gt, 0.2, "#FFC100"),
+    (operator.gt, 0.1, "#FFCD00"),
+    (operator.ge, 0.05, "#FDE171"),
+    # Unrelated-game background colors
+    (operator.lt, -0.3, "#004CE6"),
+    (operator.lt, -0.265, "#3389F9"),
+    (operator.lt, -0.23, "#33A1F9"),
+    (operator.lt, -0.195, "#33ADF9"),
+    (operator.lt, -0.16, "#33B9F9"),
+    (operator.lt, -0.125, "#33C5F9"),
+    (operator.lt, -0.09, "#33D1F9"),
+    (operator.lt, -0.055, "#33DDF9"),
+    (operator.lt, -0.02, "#33E9F9"),
+    (operator.lt, 0.015, "#33F5F9"),
+)
+DEFAULT_BACKGROUND_COLOR = "#3300F9"
+
+
 class GameNetGame(object):
     """A game representation for GameNet's purposes."""
 
-    def __init__(self, game_id, title, year, platform, wiki_url, wiki_summary,
-                 related_games_str, unrelated_games_str):
+    def __init__(self, game_id, title, year, platform, wiki_url, wiki_summary):
         """Initialize a Game object."""
         self.id = game_id
         self.title = title.decode('utf-8')
@@ -13,22 +45,10 @@ class GameNetGame(object):
         # Replace newline characters with linebreaks -- otherwise they get
         # rendered as empty strings
         self.wiki_summary = self.wiki_summary.replace('\n', '<br>')
-        self.related_games = self.parse_related_games_str(related_games_str)
-        self.unrelated_games = self.parse_related_games_str(unrelated_games_str)
         self.multiline_title = self.generate_multiline_title(self.title)
         self.google_images_query = self.generate_google_images_query(self.title, platform)
         self.youtube_query = self.generate_youtube_query(self.title, platform)
 
-    @staticmethod
-    def parse_related_games_str(related_games_str):
-        """Parse a formatted string representation of a game's un/related games."""
-        game_entries = []
-        entry_strings = related_games_str.split(',')
-        for entry in entry_strings:
-            game_id, score = entry.split('&')
-            game_entries.append(RelatedGamesEntry(game_id=game_id, score=score))
-        return game_entries
-
     @staticmethod
     def generate_multiline_title(title):
         """Generate a multiline title for long titles that have a subtitle."""
@@ -110,8 +130,7 @@ class RelatedGamesEntry(object):
         self.game_id = game_id
         self.score = float(score)
         self.background_color = self.get_background_color(self.score)
-        # These get set when load_database() in routes.py calls
-        # set_game_title_and_year()
+        # These get set when the GameNet routes call set_game_title_and_year()
         self.game_title = None
         self.game_year = None
 
@@ -123,53 +142,10 @@ class RelatedGamesEntry(object):
     @staticmethod
     def get_background_color(score):
         """Set the background color for this entry depending on its score."""
-        # Related-game background colors
-        if score > 0.95:
-            background_color = "#E64C00"
-        elif score > 0.9:
-            background_color = "#FF6D00"
-        elif score > 0.8:
-            background_color = "#FF7900"
-        elif score > 0.7:
-            background_color = "#FF8500"
-        elif score > 0.6:
-            background_color = "#FF9100"
-        elif score > 0.5:
-            background_color = "#FF9D00"
-        elif score > 0.4:
-            background_color = "#FFA900"
-        elif score > 0.3:
-            background_color = "#FFB500"
-        elif score > 0.2:
-            background_color = "#FFC100"
-        elif score > 0.1:
-            background_color = "#FFCD00"
-        elif score >= 0.05:
-            background_color = "#FDE171"
-        # Unrelated-game background colors
-        elif score < -0.3:
-            background_color = "#004CE6"
-        elif score < -0.265:
-            background_color = "#3389F9"
-        elif score < -0.23:
-            background_color = "#33A1F9"
-        elif score < -0.195:
-            background_color = "#33ADF9"
-        elif score < -0.16:
-            background_color = "#33B9F9"
-        elif score < -0.125:
-            background_color = "#33C5F9"
-        elif score < -0.09:
-            background_color = "#33D1F9"
-        elif score < -0.055:
-            background_color = "#33DDF9"
-        elif score < -0.02:
-            background_color = "#33E9F9"
-        elif score < 0.015:
-            background_color = "#33F5F9"
-        else:
-            background_color = "#3300F9"
-        return background_color
+        for comparison, threshold, background_color in BACKGROUND_COLOR_BUCKETS:
+            if comparison(score, threshold):
+                return background_color
+        return DEFAULT_BACKGROUND_COLOR
 
 
 class GameSageGame(object):
@@ -184,15 +160,12 @@ class GameSageGame(object):
 
     @staticmethod
     def parse_lsa_vector_str(lsa_vector_str):
-        """Parse a string specifying an LSA vector to return a list representation of it."""
-        lsa_vector = [float(i) for i in lsa_vector_str.split(',')[1:]]  # Exclude first dimension
-        # Add in the dimension indices -- these are needed for folding in
-        lsa_vector_with_indices = []
-        for i in xrange(len(lsa_vector)):
-            index_of_this_dimension = i+1
-            value_along_this_dimension = lsa_vector[i]
-            lsa_vector_with_indices.append((index_of_this_dimension, value_along_this_dimension))
-        return lsa_vector_with_indices
+        """Parse a string specifying an LSA vector to return an array representation of it.
+
+        The first dimension is excluded, so the value along LSA dimension i is at index i-1.
+        """
+        lsa_vector = numpy.array([float(i) for i in lsa_vector_str.split(',')[1:]], dtype=numpy.float64)
+        return lsa_vector
 
     @staticmethod
     def get_link_to_gamenet_entry(game_id, title):
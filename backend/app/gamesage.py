@@ -1,335 +1,196 @@
-import string
-import gensim
-from nltk import WordNetLemmatizer
-from nltk import word_tokenize
-from nltk import HunposTagger
+from multiprocessing.pool import ThreadPool
+import numpy
 
 
 class GameSage(object):
     """An anthropomorphization of the procedure in LSA called 'folding in'."""
 
-    def __init__(self, network, database, term_id_dictionary, tf_idf_model, lsa_model, user_submitted_text):
+    def __init__(self, network, fold_in, similarity_index, text_preprocessor, user_submitted_text, result_cache=None):
         """Initialize a GameSage object."""
         self.network = network
-        self.database = database
-        self.term_id_dictionary = term_id_dictionary
-        self.tf_idf_model = tf_idf_model
-        self.lsa_model = lsa_model
-        if self.network == 'ontology':
-            preprocessed_text = self._preprocess_text_in_ontology_network_style(text=user_submitted_text)
-        else:  # 'gameplay'
-            preprocessed_text = self._preprocess_text_in_gameplay_network_style(text=user_submitted_text)
-        lsa_vector_for_user_submitted_text = self._fold_in_user_submitted_text(text=preprocessed_text)
-        self.most_related_games, self.least_related_games = self._get_most_related_games_to_user_submitted_text(
-            lsa_vector_for_user_submitted_text=lsa_vector_for_user_submitted_text
+        self.fold_in = fold_in
+        self.similarity_index = similarity_index
+        self.text_preprocessor = text_preprocessor
+        self.result_cache = result_cache
+        preprocessed_text = self.text_preprocessor.preprocess(text=user_submitted_text)
+        bag_of_words = self.fold_in.bag_of_words(tokens=preprocessed_text.split())
+        # Many texts reduce to the same bag of words, so we may already have results for this one
+        lsa_vector_for_user_submitted_text, cached_results = self._look_up_cached_results(bag_of_words=bag_of_words)
+        # This gets kept, so that the query can be refined later without preprocessing the text again
+        self.lsa_vector = lsa_vector_for_user_submitted_text
+        if cached_results:
+            (self.most_related_games, self.least_related_games,
+             self.most_related_games_str, self.least_related_games_str) = cached_results
+        else:
+            if lsa_vector_for_user_submitted_text is None:
+                lsa_vector_for_user_submitted_text = self._fold_in_user_submitted_text(bag_of_words=bag_of_words)
+                self.lsa_vector = lsa_vector_for_user_submitted_text
+            self.most_related_games, self.least_related_games = self._get_most_related_games_to_user_submitted_text(
+                lsa_vector_for_user_submitted_text=lsa_vector_for_user_submitted_text
+            )
+            self.most_related_games_str, self.least_related_games_str = (
+                self._generate_related_games_strings()
+            )
+            self._cache_results(
+                bag_of_words=bag_of_words, lsa_vector=lsa_vector_for_user_submitted_text,
+                results=(self.most_related_games, self.least_related_games,
+                         self.most_related_games_str, self.least_related_games_str)
+            )
+
+    def _look_up_cached_results(self, bag_of_words):
+        """Return the cached (LSA vector, results) pair for a bag of words, where either may be None."""
+        if self.result_cache is None:
+            return None, None
+        return self.result_cache.get(
+            bag_of_words=bag_of_words, k=50, fold_in=self.fold_in, similarity_index=self.similarity_index
+        )
+
+    def _cache_results(self, bag_of_words, lsa_vector, results):
+        """Cache the LSA vector and results for a bag of words."""
+        if self.result_cache is not None:
+            self.result_cache.set(
+                bag_of_words=bag_of_words, k=50, lsa_vector=lsa_vector, results=results,
+                fold_in=self.fold_in, similarity_index=self.similarity_index
+            )
+
+    @classmethod
+    def get_related_games_for_texts(cls, network, fold_in, similarity_index, text_preprocessor,
+                                    user_submitted_texts, k=50, number_of_threads=4, result_cache=None):
+        """Return strings representing the k most and least related games to each of a list of texts.
+
+        The texts are preprocessed concurrently, then folded in, and then compared against every
+        game all at once, with a single matrix-matrix product.
+        """
+        if not user_submitted_texts:
+            return []
+        thread_pool = ThreadPool(processes=min(number_of_threads, len(user_submitted_texts)))
+        try:
+            preprocessed_texts = thread_pool.map(text_preprocessor.preprocess, user_submitted_texts)
+        finally:
+            thread_pool.close()
+        bags_of_words = [fold_in.bag_of_words(tokens=text.split()) for text in preprocessed_texts]
+        results = [None] * len(bags_of_words)
+        lsa_vectors = [None] * len(bags_of_words)
+        if result_cache is not None:
+            for i, bag_of_words in enumerate(bags_of_words):
+                lsa_vectors[i], results[i] = result_cache.get(
+                    bag_of_words=bag_of_words, k=k, fold_in=fold_in, similarity_index=similarity_index
+                )
+        # Fold in, and compare against every game, only the texts whose results weren't cached
+        uncached_indices = [i for i in xrange(len(results)) if results[i] is None]
+        for i in uncached_indices:
+            if lsa_vectors[i] is None:
+                lsa_vectors[i] = fold_in.fold_in_bag_of_words(bag_of_words=bags_of_words[i])
+        related_games = similarity_index.most_and_least_related_to_each(
+            lsa_vectors=[lsa_vectors[i] for i in uncached_indices], k=k
+        )
+        for i, (most_related_games, least_related_games) in zip(uncached_indices, related_games):
+            most_related_games_str, least_related_games_str = cls._build_related_games_strings(
+                network=network, similarity_index=similarity_index,
+                most_related_games=most_related_games, least_related_games=least_related_games
+            )
+            results[i] = (most_related_games, least_related_games, most_related_games_str, least_related_games_str)
+            if result_cache is not None:
+                result_cache.set(
+                    bag_of_words=bags_of_words[i], k=k, lsa_vector=lsa_vectors[i], results=results[i],
+                    fold_in=fold_in, similarity_index=similarity_index
+                )
+        return [(most_related_games_str, least_related_games_str) for _, _, most_related_games_str,
+                least_related_games_str in results]
+
+    @classmethod
+    def get_related_games_for_seed_games(cls, network, similarity_index, game_ids, negative_game_ids=(),
+                                         negative_weight=0.5, k=50):
+        """Return strings representing the k most and least related games to a set of seed games.
+
+        The query is the centroid of the seed games' (unit-length) LSA vectors, minus the given
+        weight times the centroid of the negative seed games' vectors, if any, so that no text
+        needs to be preprocessed or folded in. The seed games themselves are left out of the
+        results. Raises a ValueError if there are no seed games, or any of them is unknown.
+        """
+        if not game_ids:
+            raise ValueError("At least one seed game must be given")
+        seed_indices = cls.get_database_indices(similarity_index=similarity_index, game_ids=game_ids)
+        negative_seed_indices = cls.get_database_indices(similarity_index=similarity_index, game_ids=negative_game_ids)
+        centroid = cls.compute_centroid(similarity_index=similarity_index, indices=seed_indices)
+        if negative_seed_indices:
+            centroid -= negative_weight * cls.compute_centroid(
+                similarity_index=similarity_index, indices=negative_seed_indices
+            )
+        return cls.get_related_games_strings_excluding(
+            network=network, similarity_index=similarity_index, lsa_vector=centroid,
+            excluded_indices=set(seed_indices + negative_seed_indices), k=k
         )
-        self.most_related_games_str, self.least_related_games_str = (
-            self._generate_related_games_strings()
+
+    @staticmethod
+    def get_database_indices(similarity_index, game_ids):
+        """Return the database indices of the games with the given IDs, raising a ValueError if any are unknown."""
+        unknown_game_ids = [game_id for game_id in game_ids if game_id not in similarity_index.index_of_game_id]
+        if unknown_game_ids:
+            raise ValueError("Unknown games: {}".format(', '.join(unknown_game_ids)))
+        return [similarity_index.index_of_game_id[game_id] for game_id in game_ids]
+
+    @staticmethod
+    def compute_centroid(similarity_index, indices):
+        """Return the mean of the (unit-length) LSA vectors of the games at the given database indices."""
+        return numpy.asarray(similarity_index.matrix[sorted(indices)], dtype=numpy.float32).mean(axis=0)
+
+    @classmethod
+    def get_related_games_strings_excluding(cls, network, similarity_index, lsa_vector, excluded_indices, k=50):
+        """Return strings representing the k most and least related games to an LSA vector, less the excluded games."""
+        # Ask for enough extra games to make up for the excluded games being left out
+        most_related_games, least_related_games = similarity_index.most_and_least_related(
+            lsa_vector=lsa_vector, k=k+len(excluded_indices)
+        )
+        return cls._build_related_games_strings(
+            network=network, similarity_index=similarity_index,
+            most_related_games=[entry for entry in most_related_games if entry[0] not in excluded_indices][:k],
+            least_related_games=[entry for entry in least_related_games if entry[0] not in excluded_indices][:k]
         )
 
     def _generate_related_games_strings(self):
         """Generate strings representing the most and least related games, for GameNet to parse."""
-        if self.network == 'gameplay':
-            id_mapping = self._build_gameplay_database_indices_to_game_id_mapping()
+        return self._build_related_games_strings(
+            network=self.network, similarity_index=self.similarity_index,
+            most_related_games=self.most_related_games, least_related_games=self.least_related_games
+        )
+
+    @staticmethod
+    def _build_related_games_strings(network, similarity_index, most_related_games, least_related_games):
+        """Build strings representing lists of (database index, score) entries, for GameNet to parse."""
+        if network == 'gameplay':
+            # Gameplay database indices do not match game IDs, so look up the
+            # ID of the game at each index
+            game_ids = similarity_index.game_ids
             most_related_games_str = (
-                ','.join('{}&{}'.format(id_mapping[entry[0]], entry[1]) for entry in self.most_related_games)
+                ','.join('{}&{}'.format(game_ids[entry[0]], entry[1]) for entry in most_related_games)
             )
             least_related_games_str = (
-                ','.join('{}&{}'.format(id_mapping[entry[0]], entry[1]) for entry in self.least_related_games)
+                ','.join('{}&{}'.format(game_ids[entry[0]], entry[1]) for entry in least_related_games)
             )
         else:  # 'ontology'
             most_related_games_str = (
-                ','.join('{}&{}'.format(entry[0], entry[1]) for entry in self.most_related_games)
+                ','.join('{}&{}'.format(entry[0], entry[1]) for entry in most_related_games)
             )
             least_related_games_str = (
-                ','.join('{}&{}'.format(entry[0], entry[1]) for entry in self.least_related_games)
+                ','.join('{}&{}'.format(entry[0], entry[1]) for entry in least_related_games)
             )
         return most_related_games_str, least_related_games_str
 
-    @staticmethod
-    def _build_gameplay_database_indices_to_game_id_mapping():
-        """Build a mapping from 'gameplay' database indices to game IDs."""
-        gameplay_database_index_to_game_id = {}
-        with open('static/games_metadata-gameplay.tsv', 'r') as tsvfile:
-            metadata_entries = [line.split('\t') for line in tsvfile.readlines()]
-            for i in xrange(len(metadata_entries)):
-                game_id = metadata_entries[i][0]
-                gameplay_database_index_to_game_id[i] = game_id
-        return gameplay_database_index_to_game_id
-
     def _get_most_related_games_to_user_submitted_text(self, lsa_vector_for_user_submitted_text):
         """Get the 50 most related and unrelated games to the user-submitted text."""
-        # Reindex the LSA space to account for the folding in (ignore first dimension of
-        # the LSA vector for the user-submitted text)
-        corpus_including_new_lsa_vector = (
-            [game.lsa_vector for game in self.database] + [lsa_vector_for_user_submitted_text]
+        # The similarity index was built once, at startup, from the LSA vectors of all
+        # the games in the database; the most related games will be ordered most related
+        # first, and the least related games will be ordered least related first
+        most_related_games, least_related_games = self.similarity_index.most_and_least_related(
+            lsa_vector=lsa_vector_for_user_submitted_text, k=50
         )
-        reindexed_lsa_space = gensim.similarities.docsim.Similarity(
-            output_prefix="temp_gensim_lsa_file_that_can_be_deleted",
-            corpus=corpus_including_new_lsa_vector,
-            num_features=len(self.database[0].lsa_vector)+1, num_best=len(corpus_including_new_lsa_vector)
-        )
-        lsa_scores_for_all_games_relative_to_this_game = (
-            reindexed_lsa_space[lsa_vector_for_user_submitted_text]
-        )
-        most_related_games = lsa_scores_for_all_games_relative_to_this_game[1:51]  # [0] will be the text itself
-        least_related_games = lsa_scores_for_all_games_relative_to_this_game[-50:]
-        least_related_games.reverse()  # Order these with least related game first
         return most_related_games, least_related_games
 
-    def _fold_in_user_submitted_text(self, text):
+    def _fold_in_user_submitted_text(self, bag_of_words):
         """Fold user-submitted text into our LSA model, i.e., derive an LSA vector for the text."""
-        frequency_count_vector_for_user_submitted_text = (
-            (self.term_id_dictionary.doc2bow(text.split()))
-        )
-        tf_idf_vector_for_user_submitted_text = (
-            self.tf_idf_model[frequency_count_vector_for_user_submitted_text]
-        )
-        document_lsa_vector_for_user_submitted_text = (
-            self.lsa_model[tf_idf_vector_for_user_submitted_text]
-        )
-        # Exclude first dimension, as we've already done with the existing LSA vectors
-        lsa_vector_for_user_submitted_text = document_lsa_vector_for_user_submitted_text[1:]
+        # This precomputed fast path yields the same vector as chaining the tf-idf model and
+        # LSA model, with the first dimension already excluded (as we've already done with
+        # the existing LSA vectors)
+        lsa_vector_for_user_submitted_text = self.fold_in.fold_in_bag_of_words(bag_of_words=bag_of_words)
         return lsa_vector_for_user_submitted_text
-
-    def _preprocess_text_in_ontology_network_style(self, text):
-        """Preprocess user-submitted text in the same way we preprocessed the Wikipedia corpus."""
-        # Remove weird characters that could cause encoding issues
-        text = filter(lambda char: char in string.printable, text)
-        # Remove newline and tab characters
-        for special_char in ('\n', '\r', '\t'):
-            text = text.replace(special_char, ' ')
-        # Remove preliminary set of punctuation symbols
-        for punctuation_symbol in ('_', '.', ',', ';'):
-            text = text.replace(punctuation_symbol, ' ')
-        text = text.lower()
-        # Remove redundant whitespace
-        text = ' '.join(text.split())
-        # Tokenize multiword game titles
-        text = self._tokenize_multiword_titles(text=text)
-        # Tokenize multiword platform names
-        text = self._tokenize_multiword_platform_names(text=text)
-        # Remove punctuation and symbols (except underscores)
-        text = self._remove_punctuation_and_symbols(text=text)
-        # Again remove redundant whitespace
-        text = ' '.join(text.split())
-        # Remove stopwords
-        text = self._remove_stopwords_ontology(text=text)
-        # Lemmatize words
-        text = self._lemmatize_words(text=text)
-        # Remove stopwords again (some may have been reintroduced
-        # by lemmatization)
-        text = self._remove_stopwords_ontology(text=text)
-        return text
-
-    def _tokenize_multiword_titles(self, text):
-        """Tokenize occurrences of multiword titles."""
-        titles = [game.title.lower() for game in self.database if game.title]
-        multiword_titles = [title for title in titles if len(title.split()) > 1]
-        tokenized_multiword_titles = {}
-        for multiword_title in multiword_titles:
-            tokenized_multiword_titles[multiword_title] = '_'.join(multiword_title.split())
-        multiword_titles.sort(key=lambda t: len(t.split()), reverse=True)
-        titles_sorted_by_number_of_words = multiword_titles
-        text = ' {} '.format(text)
-        for title in titles_sorted_by_number_of_words:
-            tokenized_title = tokenized_multiword_titles[title]
-            try:
-                while ' {} '.format(title) in text:
-                    text = text.replace(
-                        ' {} '.format(title), ' {} '.format(tokenized_title)
-                    )
-            except UnicodeEncodeError:
-                pass  # Not worth struggling with game titles with weird encodings
-        text = ' '.join(text.split())
-        return text
-
-    @staticmethod
-    def _tokenize_multiword_platform_names(text):
-        """Tokenize occurrences of multiword platform names."""
-        f = open('./static/multiword_platform_names.txt', 'r')
-        multiword_platform_names = f.readlines()
-        multiword_platform_names = [name.strip('\n') for name in multiword_platform_names]
-        multiword_platform_names = [name.lower() for name in multiword_platform_names]
-        tokenized_multiword_names = {}
-        for multiword_name in multiword_platform_names:
-            tokenized_multiword_names[multiword_name] = '_'.join(multiword_name.split())
-        multiword_platform_names.sort(key=lambda t: len(t.split()), reverse=True)
-        platform_names_sorted_by_number_of_words = multiword_platform_names
-        text = ' {} '.format(text)
-        for platform_name in platform_names_sorted_by_number_of_words:
-            tokenized_title = tokenized_multiword_names[platform_name]
-            while ' {} '.format(platform_name) in text:
-                text = text.replace(
-                    ' {} '.format(platform_name), ' {} '.format(tokenized_title)
-                )
-        return text
-
-    @staticmethod
-    def _remove_punctuation_and_symbols(text):
-        """Remove punctuation and other symbols."""
-        for symbol in (
-            '[', ']', '\'', '&', '(', ')', '\\', '/', '*', '!',
-            '?', '$', '^', '~', '+', '=', '{', '}', '`', '|', '#'
-        ):
-            text = text.replace(symbol, ' ')
-        for symbol in ('"', ':'):
-            text = text.replace(symbol, '')
-        return text
-
-    @staticmethod
-    def _remove_stopwords_ontology(text):
-        """Remove all stopwords from the text."""
-        f = open('./static/stopwords.txt', 'r')
-        stopwords = f.readlines()
-        stopwords = [stopword.strip('\n') for stopword in stopwords]
-        tokens = [token.lower() for token in text.split()]
-        for i in xrange(len(tokens)):
-            if tokens[i] in stopwords:
-                tokens[i] = ''
-            elif len(tokens[i]) == 1:  # Remove single letters
-                tokens[i] = ''
-        text = ' '.join([token for token in tokens if token])
-        return text
-
-    @staticmethod
-    def _lemmatize_words(text):
-        """Lemmatize all words in the text."""
-        lemmatizer = WordNetLemmatizer()
-        lemmatizations = {}
-        tokens = text.split()
-        for word in tokens:
-            if word not in lemmatizations:
-                lemmatizations[word] = lemmatizer.lemmatize(word)
-        for i in xrange(5):  # Need to repeat several times to be safe
-            tokens = text.split()
-            for j in xrange(len(tokens)):
-                try:
-                    tokens[j] = lemmatizations[tokens[j]]
-                except KeyError:
-                    # During last pass, words were turned into their lemmas, which don't
-                    # have entries in lemmatizations
-                    pass
-        text = ' '.join(tokens)
-        return text
-
-    def _preprocess_text_in_gameplay_network_style(self, text):
-        """Preprocess user-submitted text in the same way we preprocessed the GameFAQs corpus."""
-        # Remove weird characters that could cause encoding issues
-        text = filter(lambda char: char in string.printable, text)
-        # Remove newline and tab characters
-        for special_char in ('\n', '\r', '\t'):
-            text = text.replace(special_char, '. ')
-        # Remove most punctuation and symbols
-        text = self._remove_punctuation_and_symbols(text=text)
-        # POS-tag the text
-        pos_tagged_text = self._pos_tag_text(text=text)
-        # Remove all tokens that aren't POS-tagged as a verb or common noun
-        pos_tagged_text = self._remove_everything_but_verbs_and_common_nouns(pos_tagged_text)
-        # Convert text to lowercase
-        for i in xrange(len(pos_tagged_text)):
-            pos_tagged_text[i][0] == pos_tagged_text[i][0].lower()
-        # Remove numbers and non-Latin characters
-        pos_tagged_text = self._remove_any_numbers_and_non_english_characters_from_text(
-            pos_tagged_text=pos_tagged_text
-        )
-        # Lemmatize, and remove stopwords
-        pos_tagged_text = self._lemmatize_and_remove_stopwords(
-            pos_tagged_text=pos_tagged_text
-        )
-        # Throw away the POS tags
-        text = [tag[0] for tag in pos_tagged_text]
-        text = ' '.join(text)
-        # Remove redundant whitespace
-        text = ' '.join(text.split())
-        return text
-
-    @staticmethod
-    def _pos_tag_text(text):
-        tokens = word_tokenize(text)
-        # Prepare the POS tagger
-        pos_tagger = HunposTagger('./static/en_wsj.model', './static/hunpos-tag')
-        # POS-tag the text
-        pos_tagged_text = pos_tagger.tag(tokens)
-        # Convert each word-tag tuple to a list, to support item assignment, which
-        # we need during lemmatization and stopword removal
-        pos_tagged_text = [list(t) for t in pos_tagged_text]
-        return pos_tagged_text
-
-    @staticmethod
-    def _remove_everything_but_verbs_and_common_nouns(pos_tagged_text):
-        """Remove everything but verbs and common nouns from the POS-tagged text."""
-        pos_tagged_text = [
-            word_and_tag_pair for word_and_tag_pair in pos_tagged_text if word_and_tag_pair[0] != '' and
-            word_and_tag_pair[1] in ('VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ', 'NN', 'NNS')
-        ]
-        return pos_tagged_text
-
-    @staticmethod
-    def _remove_any_numbers_and_non_english_characters_from_text(pos_tagged_text):
-        """Remove any digits from the POS-tagged text."""
-        for i in xrange(len(pos_tagged_text)):
-            word = pos_tagged_text[i][0]
-            # Remove numbers
-            for digit in string.digits:
-                word = word.replace(digit, '')
-            # Remove words with non-Latin characters
-            try:
-                word.decode('ascii')
-            except UnicodeDecodeError:
-                word = ''
-            # Write the preprocessed word back
-            pos_tagged_text[i][0] = word
-        return pos_tagged_text
-
-    @staticmethod
-    def _remove_all_other_punctuation(pos_tagged_text):
-        """Remove all remaining punctuation from POS-tagged text."""
-        for j in xrange(len(pos_tagged_text)):
-            word = pos_tagged_text[j][0]
-            for symbol in (',', '.', ';', '-'):
-                word = word.replace(symbol, ' ')
-            # Write the preprocessed word back
-            pos_tagged_text[j][0] = word
-        return pos_tagged_text
-
-    @staticmethod
-    def _lemmatize_and_remove_stopwords(pos_tagged_text):
-        """Lemmatize the pos_tagged_text and remove any stopwords."""
-        # Prepare lemmatizer
-        lemmatizer = WordNetLemmatizer()
-        lemmatizations_already_computed = {}
-        penn_to_wordnet_pos_tags = {
-            'NN': 'n', 'NNS': 'n', 'VB': 'v', 'VBD': 'v', 'VBG': 'v',  'VBN': 'v', 'VBP': 'v',
-            'VBZ': 'v', 'JJ': 'a', 'JJR': 'a', 'JJS': 'a', 'RB': 'r', 'RBR': 'r', 'RBS': 'r',
-        }
-        # Build stopwords list
-        f = open('./static/stopwords.txt', 'r')
-        stopwords = f.readlines()
-        stopwords = [stopword.strip('\n') for stopword in stopwords]
-        contractions_missed_because_of_punctuation_removal = [
-            'arent', 'cant', 'couldnt', 'didnt', 'doesnt', 'dont', 'hadnt', 'hasnt', 'havent',
-            'hed', 'hell', 'hes', 'id', 'ill', 'im', 'ive', 'isnt', 'its', 'lets', 'mightnt', 'mustnt',
-            'shant', 'shed', 'shell', 'shes', 'shouldnt', 'thats', 'theres', 'theyd', 'theyll', 'theyre',
-            'theyve', 'wed', 'were', 'weve', 'werent', 'whatll', 'whatre', 'whats', 'whatve', 'wheres',
-            'whod', 'wholl', 'whore', 'whos', 'whove', 'wont', 'wouldnt',  'youd', 'youll', 'youre', 'youve'
-        ]
-        stopwords += contractions_missed_because_of_punctuation_removal
-        # Run the lemmatization procedure multiple times to be safe (problem
-        # when, e.g., 'apples apples' shows up)
-        for i in xrange(5):
-            for j in xrange(len(pos_tagged_text)):
-                word, pos_tag = pos_tagged_text[j]
-                if word != '':
-                    # Lemmatize word
-                    if word in lemmatizations_already_computed:
-                        pos_tagged_text[j][0] = lemmatizations_already_computed[word]
-                    else:
-                        lemmatizations_already_computed[word] = lemmatizer.lemmatize(
-                            word=word, pos=penn_to_wordnet_pos_tags[pos_tag]
-                        )
-                        pos_tagged_text[j][0] = lemmatizations_already_computed[word]
-                    # If it's a stopword (or unicharacter symbol), remove it
-                    if pos_tagged_text[j][0] in stopwords or len(pos_tagged_text[j][0]) == 1:
-                        pos_tagged_text[j][0] = ''
-        return pos_tagged_text
@@ -0,0 +1,126 @@
+"""Run GameSage over a file (or stdin) of game ideas, outside of Flask, across a pool of processes.
+
+Run this from the directory containing routes.py, e.g.:
+
+    python gamesage_cli.py ontology game_ideas.txt > related_games.tsv
+    cat game_ideas.jsonl | python gamesage_cli.py gameplay --jsonl --processes 8 > related_games.tsv
+
+Input is either one game idea per line, or (with --jsonl) one JSON value per line: a string, or
+an object with a 'user_submitted_text' field and an optional 'id' field. Output is streamed as
+TSV rows of an idea's ID (its line number, unless the input gave one), its most related games,
+and its least related games, the latter two in the 'id&score' format that GameIdea parses.
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+from gamesage import GameSage
+from loading import (
+    load_gamesage_ontology_database, load_ontology_term_id_dictionary, load_ontology_tf_idf_model,
+    load_ontology_lsa_model, load_gamesage_gameplay_database, load_gameplay_term_id_dictionary,
+    load_gameplay_tf_idf_model, load_gameplay_lsa_model, build_fold_in, build_similarity_index,
+    build_text_preprocessor
+)
+
+LOADERS = {
+    'ontology': (
+        load_gamesage_ontology_database, load_ontology_term_id_dictionary, load_ontology_tf_idf_model,
+        load_ontology_lsa_model
+    ),
+    'gameplay': (
+        load_gamesage_gameplay_database, load_gameplay_term_id_dictionary, load_gameplay_tf_idf_model,
+        load_gameplay_lsa_model
+    ),
+}
+
+# The loaded network, which is set in the parent process before the pool gets created, so
+# that the worker processes inherit it via fork, rather than each loading their own copy
+network_resources = {}
+
+
+def load_network(network, tagger_pool_size):
+    """Load everything that GameSage needs to process text for a network."""
+    load_database, load_term_id_dictionary, load_tf_idf_model, load_lsa_model = LOADERS[network]
+    database = load_database()
+    fold_in = build_fold_in(
+        term_id_dictionary=load_term_id_dictionary(), tf_idf_model=load_tf_idf_model(),
+        lsa_model=load_lsa_model()
+    )
+    network_resources['network'] = network
+    network_resources['fold_in'] = fold_in
+    network_resources['similarity_index'] = build_similarity_index(database=database, network=network)
+    network_resources['text_preprocessor'] = build_text_preprocessor(
+        network=network, database=database, tagger_pool_size=tagger_pool_size
+    )
+
+
+def read_game_ideas(input_file, jsonl):
+    """Yield an (ID, text) pair for each game idea in the input file."""
+    for line_number, line in enumerate(input_file):
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        if not jsonl:
+            yield unicode(line_number), line.decode('utf-8')
+            continue
+        game_idea = json.loads(line)
+        if isinstance(game_idea, dict):
+            yield unicode(game_idea.get('id', line_number)), game_idea['user_submitted_text']
+        else:
+            yield unicode(line_number), game_idea
+
+
+def chunk_game_ideas(game_ideas, chunk_size):
+    """Group the game ideas into lists of at most chunk_size."""
+    chunk = []
+    for game_idea in game_ideas:
+        chunk.append(game_idea)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def process_chunk(chunk):
+    """Return the IDs and related-games strings for a chunk of (ID, text) pairs (runs in a worker process)."""
+    ids = [game_idea_id for game_idea_id, _ in chunk]
+    related_games_strings = GameSage.get_related_games_for_texts(
+        network=network_resources['network'], fold_in=network_resources['fold_in'],
+        similarity_index=network_resources['similarity_index'],
+        text_preprocessor=network_resources['text_preprocessor'],
+        user_submitted_texts=[text for _, text in chunk], number_of_threads=1
+    )
+    return zip(ids, related_games_strings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the most and least related games to many game ideas.")
+    parser.add_argument('network', choices=sorted(LOADERS))
+    parser.add_argument('input', nargs='?', default='-', help="file of game ideas, or '-' for stdin (default)")
+    parser.add_argument('--jsonl', action='store_true', help="read one JSON value per line")
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=64, help="game ideas handed to a worker at a time")
+    args = parser.parse_args()
+    # Load the network once, before forking, so that all the workers share it
+    load_network(network=args.network, tagger_pool_size=1)
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'r')
+    chunks = chunk_game_ideas(read_game_ideas(input_file=input_file, jsonl=args.jsonl), chunk_size=args.chunk_size)
+    pool = multiprocessing.Pool(processes=args.processes)
+    try:
+        # Results come back in input order, and get written as soon as each chunk is done
+        for results in pool.imap(process_chunk, chunks):
+            for game_idea_id, (most_related_games_str, least_related_games_str) in results:
+                row = u'{}\t{}\t{}\n'.format(game_idea_id, most_related_games_str, least_related_games_str)
+                sys.stdout.write(row.encode('utf-8'))
+            sys.stdout.flush()
+    finally:
+        pool.close()
+        pool.join()
+        if input_file is not sys.stdin:
+            input_file.close()
+
+
+if __name__ == '__main__':
+    main()
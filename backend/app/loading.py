@@ -0,0 +1,361 @@
+import atexit
+import csv
+import glob
+import os
+import warnings
+import gensim
+from game import GameNetGame, GameSageGame
+from adjacency import RelatedGamesAdjacency
+from store import GameStore
+from autocomplete import TitleAutocompleter
+from title_matching import FuzzyTitleMatcher
+from folding import LSAFoldIn
+from similarity import LSASimilarityIndex
+from approximate_similarity import IVFSimilarityIndex
+from quantization import QuantizedSimilarityIndex
+from preprocessing import MultiwordPhraseMatcher, TextPreprocessor
+from tagging import HunposTaggerPool
+from snapshot import (
+    SNAPSHOT_DIRECTORY, hash_source_file, load_database_via_snapshot, read_snapshot, write_snapshot,
+    serialize_gamenet_store, deserialize_gamenet_store, serialize_gamesage_database, deserialize_gamesage_database
+)
+
+
+def load_gamenet_ontology_store(rebuild_snapshot=False, mmap_mode='r'):
+    """Load the store of GameNet game representations, from its snapshot unless its TSV file has changed."""
+    store = load_database_via_snapshot(
+        snapshot_name='gamenet_store-ontology', source_path='static/games_metadata-ontology.tsv',
+        parse_database=parse_gamenet_ontology_store, serialize_database=serialize_gamenet_store,
+        deserialize_database=deserialize_gamenet_store, rebuild=rebuild_snapshot, mmap_mode=mmap_mode
+    )
+    return store
+
+
+def parse_gamenet_ontology_store(path):
+    """Parse the store of GameNet game representations from a TSV file."""
+    games = []
+    related_games_strs = []
+    unrelated_games_strs = []
+    with open(path, 'r') as tsvfile:
+        reader = csv.reader(tsvfile, delimiter='\t')
+        for row in reader:
+            game_id, title, year, platform, wiki_url, wiki_summary, related_games_str, unrelated_games_str = row
+            game_object = GameNetGame(game_id, title, year, platform, wiki_url, wiki_summary)
+            games.append(game_object)
+            related_games_strs.append(related_games_str)
+            unrelated_games_strs.append(unrelated_games_str)
+    store = build_gamenet_store(
+        games=games, related_games_strs=related_games_strs, unrelated_games_strs=unrelated_games_strs
+    )
+    return store
+
+
+def build_gamenet_store(games, related_games_strs, unrelated_games_strs):
+    """Build the store of a GameNet network's games, along with its un/related-games structures.
+
+    The un/related-games structures get built once the store holds all the games, since their
+    entries get their titles and years via lookup into it.
+    """
+    store = GameStore.from_games(games=games)
+    store.related_games = RelatedGamesAdjacency.from_related_games_strs(
+        related_games_strs=related_games_strs, store=store
+    )
+    store.unrelated_games = RelatedGamesAdjacency.from_related_games_strs(
+        related_games_strs=unrelated_games_strs, store=store
+    )
+    return store
+
+
+def build_title_autocompleter(store):
+    """Build the prefix index for autocompleting the titles of the games in a GameNet network's store."""
+    title_autocompleter = TitleAutocompleter(store=store)
+    return title_autocompleter
+
+
+def build_fuzzy_title_matcher(store):
+    """Build the trigram index for resolving misspelled titles of the games in a GameNet network's store."""
+    fuzzy_title_matcher = FuzzyTitleMatcher(store=store)
+    return fuzzy_title_matcher
+
+
+def load_gamesage_ontology_database(rebuild_snapshot=False, mmap_mode='r'):
+    """Load the database of GameSage game representations, from its snapshot unless its TSV file has changed."""
+    database = load_database_via_snapshot(
+        snapshot_name='gamesage_database-ontology', source_path='static/game_lsa_vectors-ontology.tsv',
+        parse_database=parse_gamesage_ontology_database, serialize_database=serialize_gamesage_database,
+        deserialize_database=deserialize_gamesage_database, rebuild=rebuild_snapshot, mmap_mode=mmap_mode
+    )
+    return database
+
+
+def parse_gamesage_ontology_database(path):
+    """Parse the database of GameSage game representations from a TSV file."""
+    database = []
+    with open(path, 'r') as tsv_file:
+        reader = csv.reader(tsv_file, delimiter='\t')
+        for row in reader:
+            game_id, title, year, lsa_vector_str = row
+            game_object = GameSageGame(game_id, title, lsa_vector_str)
+            database.append(game_object)
+    return database
+
+
+def load_ontology_term_id_dictionary():
+    """Load the term-ID dictionary for our corpus."""
+    term_id_dictionary = gensim.corpora.Dictionary.load('./static/ontology-id2term.dict')
+    return term_id_dictionary
+
+
+def load_ontology_tf_idf_model():
+    """Load our tf-idf model."""
+    tf_idf_model = (
+        gensim.models.TfidfModel.load('./static/ontology-tfidf_model')
+    )
+    return tf_idf_model
+
+
+def load_ontology_lsa_model(mmap='r'):
+    """Load our LSA model, with its (large) projection matrix opened read-only with mmap by default."""
+    lsa_model = gensim.models.LsiModel.load('./static/ontology-model_207.lsi', mmap=mmap)
+    return lsa_model
+
+
+def load_gamenet_gameplay_store(rebuild_snapshot=False, mmap_mode='r'):
+    """Load the store of GameNet game representations, from its snapshot unless its TSV file has changed."""
+    store = load_database_via_snapshot(
+        snapshot_name='gamenet_store-gameplay', source_path='static/games_metadata-gameplay.tsv',
+        parse_database=parse_gamenet_gameplay_store, serialize_database=serialize_gamenet_store,
+        deserialize_database=deserialize_gamenet_store, rebuild=rebuild_snapshot, mmap_mode=mmap_mode
+    )
+    return store
+
+
+def parse_gamenet_gameplay_store(path):
+    """Parse the store of GameNet game representations from a TSV file."""
+    games = []
+    related_games_strs = []
+    unrelated_games_strs = []
+    with open(path, 'r') as tsvfile:
+        reader = csv.reader(tsvfile, delimiter='\t')
+        for row in reader:
+            game_id, title, year, platform, wiki_url, wiki_summary, related_games_str, unrelated_games_str = row
+            game_object = GameNetGame(game_id, title, year, platform, wiki_url, wiki_summary)
+            games.append(game_object)
+            related_games_strs.append(related_games_str)
+            unrelated_games_strs.append(unrelated_games_str)
+    store = build_gamenet_store(
+        games=games, related_games_strs=related_games_strs, unrelated_games_strs=unrelated_games_strs
+    )
+    return store
+
+
+def load_gamesage_gameplay_database(rebuild_snapshot=False, mmap_mode='r'):
+    """Load the database of GameSage game representations, from its snapshot unless its TSV file has changed."""
+    database = load_database_via_snapshot(
+        snapshot_name='gamesage_database-gameplay', source_path='static/game_lsa_vectors-gameplay.tsv',
+        parse_database=parse_gamesage_gameplay_database, serialize_database=serialize_gamesage_database,
+        deserialize_database=deserialize_gamesage_database, rebuild=rebuild_snapshot, mmap_mode=mmap_mode
+    )
+    return database
+
+
+def parse_gamesage_gameplay_database(path):
+    """Parse the database of GameSage game representations from a TSV file."""
+    database = []
+    with open(path, 'r') as tsv_file:
+        reader = csv.reader(tsv_file, delimiter='\t')
+        for row in reader:
+            game_id, title, year, lsa_vector_str = row
+            game_object = GameSageGame(game_id, title, lsa_vector_str)
+            database.append(game_object)
+    return database
+
+
+def load_gameplay_term_id_dictionary():
+    """Load the term-ID dictionary for our corpus."""
+    term_id_dictionary = gensim.corpora.Dictionary.load('./static/gameplay-id2term.dict')
+    return term_id_dictionary
+
+
+def load_gameplay_tf_idf_model():
+    """Load our tf-idf model."""
+    tf_idf_model = (
+        gensim.models.TfidfModel.load('./static/gameplay-tfidf_model')
+    )
+    return tf_idf_model
+
+
+def load_gameplay_lsa_model(mmap='r'):
+    """Load our LSA model, with its (large) projection matrix opened read-only with mmap by default."""
+    lsa_model = gensim.models.LsiModel.load('./static/gameplay-model_334.lsi', mmap=mmap)
+    return lsa_model
+
+
+def build_fold_in(term_id_dictionary, tf_idf_model, lsa_model):
+    """Build the fast path for folding text into an LSA model, enabling it once it checks out against gensim."""
+    fold_in = LSAFoldIn(term_id_dictionary=term_id_dictionary, tf_idf_model=tf_idf_model, lsa_model=lsa_model)
+    if not fold_in.verify():
+        # Fall back to chaining gensim's transformations
+        warnings.warn("The fast fold-in path disagrees with gensim's transformations, so it has been disabled")
+    return fold_in
+
+
+def build_similarity_index(database, network=None, mmap_mode='r', quantization=None, rescoring_factor=4,
+                           number_of_probes=None):
+    """Build an index for computing similarities between folded-in text and all the games in a GameSage database.
+
+    If the network is given, the index's matrix gets saved alongside the database snapshots and
+    opened with mmap, so that all the worker processes on a machine share one copy of it. If a
+    quantization ('float16' or 'int8') is given too, searches use a quantized copy of the matrix
+    (rescoring the most promising rescoring_factor * k games exactly, unless that's None), and if
+    the number of probes is given too, the network's approximate similarity index gets loaded over it.
+    """
+    if network is None:
+        similarity_index = LSASimilarityIndex(database=database)
+        return similarity_index
+    # Name the matrix after the TSV file that the database was loaded from, so that a changed
+    # file gets a new matrix, rather than an old one of the same shape
+    source_hash = hash_source_file('static/game_lsa_vectors-{}.tsv'.format(network))
+    matrix_path = os.path.join(SNAPSHOT_DIRECTORY, 'similarity_matrix-{}-{}.npy'.format(network, source_hash))
+    similarity_index = LSASimilarityIndex(database=database, matrix_path=matrix_path, mmap_mode=mmap_mode)
+    # Clear away the matrices built from previous versions of the file
+    for stale_matrix_path in glob.glob(os.path.join(SNAPSHOT_DIRECTORY, 'similarity_matrix-{}-*.npy'.format(network))):
+        if stale_matrix_path != matrix_path:
+            try:
+                os.remove(stale_matrix_path)
+            except OSError:
+                pass  # Another worker got to it first
+    if quantization is not None:
+        similarity_index = build_quantized_similarity_index(
+            similarity_index=similarity_index, network=network, quantization=quantization,
+            rescoring_factor=rescoring_factor, source_hash=source_hash, mmap_mode=mmap_mode
+        )
+    if number_of_probes is not None:
+        return load_approximate_similarity_index(
+            similarity_index=similarity_index, network=network, number_of_probes=number_of_probes, mmap_mode=mmap_mode
+        )
+    return similarity_index
+
+
+def build_quantized_similarity_index(similarity_index, network, quantization, rescoring_factor, source_hash,
+                                     mmap_mode='r'):
+    """Build a quantized index over a network's similarity index, from its snapshot if it's up to date."""
+    snapshot_path = os.path.join(
+        SNAPSHOT_DIRECTORY, 'quantized_similarity_matrix-{}-{}.npz'.format(network, quantization)
+    )
+    arrays = read_snapshot(path=snapshot_path, source_hash=source_hash, mmap_mode=mmap_mode)
+    if arrays is not None:
+        return QuantizedSimilarityIndex.from_arrays(
+            exact_index=similarity_index, quantization=quantization, arrays=arrays, rescoring_factor=rescoring_factor
+        )
+    quantized_similarity_index = QuantizedSimilarityIndex.build(
+        exact_index=similarity_index, quantization=quantization, rescoring_factor=rescoring_factor
+    )
+    try:
+        write_snapshot(path=snapshot_path, arrays=quantized_similarity_index.to_arrays(), source_hash=source_hash)
+    except (IOError, OSError) as error:
+        warnings.warn("Could not save the quantized similarity matrix {}: {}".format(snapshot_path, error))
+        return quantized_similarity_index
+    if mmap_mode is None:
+        return quantized_similarity_index
+    # Reopen the matrix just saved, so that even the worker that built it shares it with the others
+    return QuantizedSimilarityIndex.from_arrays(
+        exact_index=similarity_index, quantization=quantization,
+        arrays=read_snapshot(path=snapshot_path, source_hash=source_hash, mmap_mode=mmap_mode),
+        rescoring_factor=rescoring_factor
+    )
+
+
+def get_approximate_similarity_index_path(network):
+    """Return the path to the snapshot of a network's approximate similarity index."""
+    return os.path.join(SNAPSHOT_DIRECTORY, 'approximate_similarity_index-{}.npz'.format(network))
+
+
+def build_approximate_similarity_index(similarity_index, network, number_of_clusters, number_of_iterations=20,
+                                       sample_size=None, number_of_probes=8):
+    """Build (offline) an approximate index over a network's similarity index, and save it as a snapshot."""
+    approximate_similarity_index = IVFSimilarityIndex.build(
+        exact_index=similarity_index, number_of_clusters=number_of_clusters,
+        number_of_iterations=number_of_iterations, sample_size=sample_size, number_of_probes=number_of_probes
+    )
+    write_snapshot(
+        path=get_approximate_similarity_index_path(network=network), arrays=approximate_similarity_index.to_arrays(),
+        source_hash=hash_source_file('static/game_lsa_vectors-{}.tsv'.format(network))
+    )
+    return approximate_similarity_index
+
+
+def load_approximate_similarity_index(similarity_index, network, number_of_probes=8, mmap_mode='r'):
+    """Load the approximate index over a network's similarity index, or else fall back to the exact index.
+
+    Clustering a large catalog takes too long to do at startup, so the approximate index must
+    have been built (from the network's current LSA vectors) beforehand, with ann_report.py.
+    """
+    arrays = read_snapshot(
+        path=get_approximate_similarity_index_path(network=network),
+        source_hash=hash_source_file('static/game_lsa_vectors-{}.tsv'.format(network)), mmap_mode=mmap_mode
+    )
+    if arrays is None:
+        warnings.warn(
+            "No approximate similarity index has been built from the {} network's current LSA vectors, "
+            "so it will use exact search".format(network)
+        )
+        return similarity_index
+    approximate_similarity_index = IVFSimilarityIndex.from_arrays(
+        exact_index=similarity_index, arrays=arrays, number_of_probes=number_of_probes
+    )
+    return approximate_similarity_index
+
+
+def build_title_matcher(database):
+    """Build a matcher for tokenizing the multiword titles of the games in a GameSage database."""
+    titles = [game.title.lower() for game in database if game.title]
+    title_matcher = MultiwordPhraseMatcher(phrases=titles)
+    return title_matcher
+
+
+def load_platform_name_matcher():
+    """Load a matcher for tokenizing multiword platform names."""
+    with open('./static/multiword_platform_names.txt', 'r') as f:
+        multiword_platform_names = [name.strip('\n').lower() for name in f.readlines()]
+    platform_name_matcher = MultiwordPhraseMatcher(phrases=multiword_platform_names)
+    return platform_name_matcher
+
+
+def load_stopwords():
+    """Load the list of stopwords used during preprocessing."""
+    with open('./static/stopwords.txt', 'r') as f:
+        stopwords = [stopword.strip('\n') for stopword in f.readlines()]
+    return stopwords
+
+
+def build_pos_tagger_pool(size, timeout):
+    """Build the pool of long-lived HunPos taggers used to preprocess text for the gameplay network."""
+    pos_tagger_pool = HunposTaggerPool(
+        path_to_model='./static/en_wsj.model', path_to_binary='./static/hunpos-tag', size=size, timeout=timeout
+    )
+    atexit.register(pos_tagger_pool.close)
+    return pos_tagger_pool
+
+
+def build_text_preprocessor(network, database, lemma_cache_directory=None, tagger_pool_size=4, tagger_timeout=10.0):
+    """Build the preprocessor that prepares user-submitted text for folding into a network's LSA model."""
+    if lemma_cache_directory:
+        lemma_cache_path = os.path.join(lemma_cache_directory, 'gamesage_lemma_cache-{}.tsv'.format(network))
+    else:
+        lemma_cache_path = None
+    if network == 'ontology':
+        text_preprocessor = TextPreprocessor(
+            network=network, stopwords=load_stopwords(), title_matcher=build_title_matcher(database=database),
+            platform_name_matcher=load_platform_name_matcher(), lemma_cache_path=lemma_cache_path
+        )
+    else:  # 'gameplay'
+        text_preprocessor = TextPreprocessor(
+            network=network, stopwords=load_stopwords(), pos_tagger_pool=build_pos_tagger_pool(
+                size=tagger_pool_size, timeout=tagger_timeout
+            ),
+            lemma_cache_path=lemma_cache_path
+        )
+    # Save the lemma cache on shutdown, so that the next startup can be warm
+    atexit.register(text_preprocessor.save_lemma_cache)
+    return text_preprocessor
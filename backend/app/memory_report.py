@@ -0,0 +1,122 @@
+"""Report how much memory each worker process uses to load the networks, with and without mmap.
+
+Run this from the directory containing routes.py (on Linux, which it reads /proc on), e.g.:
+
+    python memory_report.py --workers 4
+
+For each mode, it starts the given number of worker processes, each of which loads everything
+that GameNet and GameSage need for both networks, just as a web worker does, and then reports
+each worker's resident set size (RSS) before and after loading. Since RSS counts shared pages in
+full in every process that maps them, it also reports each worker's proportional set size (PSS),
+which splits shared pages between the processes sharing them, measured while all the workers are
+still running; summing PSS across the workers gives the memory that they really take up together.
+"""
+
+import argparse
+import multiprocessing
+import sys
+from loading import (
+    load_gamenet_ontology_store, load_gamesage_ontology_database, load_ontology_term_id_dictionary,
+    load_ontology_tf_idf_model, load_ontology_lsa_model, load_gamenet_gameplay_store,
+    load_gamesage_gameplay_database, load_gameplay_term_id_dictionary, load_gameplay_tf_idf_model,
+    load_gameplay_lsa_model, build_fold_in, build_similarity_index
+)
+
+MODES = (('copied', None), ('mapped', 'r'))
+
+
+def read_memory_usage(pid='self'):
+    """Return a process's resident and proportional set sizes, in kB, as read from /proc."""
+    memory_usage = {}
+    with open('/proc/{}/status'.format(pid), 'r') as status_file:
+        for line in status_file:
+            if line.startswith(('VmRSS:', 'RssAnon:', 'RssFile:')):
+                name, value = line.split(':')
+                memory_usage[name] = int(value.split()[0])
+    try:
+        with open('/proc/{}/smaps_rollup'.format(pid), 'r') as smaps_file:
+            for line in smaps_file:
+                if line.startswith('Pss:'):
+                    memory_usage['Pss'] = int(line.split()[1])
+    except IOError:
+        pass  # Kernels older than 4.14 don't provide this
+    return memory_usage
+
+
+def load_networks(mmap_mode):
+    """Load both networks, as a web worker does, returning everything loaded so that it stays resident."""
+    loaded = []
+    for (load_gamenet_store, load_gamesage_database, load_term_id_dictionary, load_tf_idf_model,
+         load_lsa_model, network) in (
+        (load_gamenet_ontology_store, load_gamesage_ontology_database, load_ontology_term_id_dictionary,
+         load_ontology_tf_idf_model, load_ontology_lsa_model, 'ontology'),
+        (load_gamenet_gameplay_store, load_gamesage_gameplay_database, load_gameplay_term_id_dictionary,
+         load_gameplay_tf_idf_model, load_gameplay_lsa_model, 'gameplay'),
+    ):
+        gamesage_database = load_gamesage_database(mmap_mode=mmap_mode)
+        fold_in = build_fold_in(
+            term_id_dictionary=load_term_id_dictionary(), tf_idf_model=load_tf_idf_model(),
+            lsa_model=load_lsa_model(mmap=mmap_mode)
+        )
+        similarity_index = build_similarity_index(database=gamesage_database, network=network, mmap_mode=mmap_mode)
+        loaded.append((load_gamenet_store(mmap_mode=mmap_mode), gamesage_database, fold_in, similarity_index))
+    return loaded
+
+
+def run_worker(mmap_mode, reports, finished):
+    """Load the networks, report memory usage, and stay alive until every worker has reported."""
+    memory_usage_before_loading = read_memory_usage()
+    loaded = load_networks(mmap_mode=mmap_mode)
+    reports.put((multiprocessing.current_process().pid, memory_usage_before_loading, read_memory_usage()))
+    finished.wait()
+    return loaded
+
+
+def report_mode(mode, mmap_mode, number_of_workers):
+    """Start the workers for a mode and print their memory usage."""
+    reports = multiprocessing.Queue()
+    finished = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(mmap_mode, reports, finished))
+        for _ in xrange(number_of_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        rows = []
+        for _ in xrange(number_of_workers):
+            pid, memory_usage_before_loading, memory_usage_after_loading = reports.get()
+            rows.append((pid, memory_usage_before_loading, memory_usage_after_loading))
+        # Only now that all the workers have loaded do their shared pages get split between them
+        lines = [
+            "{} ({} workers):".format(mode, number_of_workers),
+            "    {:>8} {:>12} {:>12} {:>12} {:>12}".format('pid', 'RSS before', 'RSS after', 'RssAnon', 'PSS'),
+        ]
+        total_pss = 0
+        for pid, memory_usage_before_loading, memory_usage_after_loading in sorted(rows):
+            pss = read_memory_usage(pid=pid).get('Pss', 0)
+            total_pss += pss
+            lines.append("    {:>8} {:>9} kB {:>9} kB {:>9} kB {:>9} kB".format(
+                pid, memory_usage_before_loading['VmRSS'], memory_usage_after_loading['VmRSS'],
+                memory_usage_after_loading.get('RssAnon', 0), pss
+            ))
+        lines.append("    total PSS: {} kB".format(total_pss))
+        sys.stdout.write('\n'.join(lines) + '\n')
+    finally:
+        finished.set()
+        for worker in workers:
+            worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the memory that worker processes use to load the networks.")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=[mode for mode, _ in MODES], help="report only this mode")
+    args = parser.parse_args()
+    for mode, mmap_mode in MODES:
+        if args.mode in (None, mode):
+            report_mode(mode=mode, mmap_mode=mmap_mode, number_of_workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import collections
+import threading
+import time
+import numpy
+from sqlalchemy import and_, bindparam
+from store import GameNetGameView
+
+SECONDS_PER_DAY = 86400
+# Views get rolled up by the hour, which is short enough next to a half-life for each hour's views to
+# be decayed as one
+SECONDS_PER_ROLLUP_PERIOD = 3600
+
+
+class PopularityTracker(object):
+    """Time-decayed popularity scores of the games in a GameNet network, kept up to date as views get recorded.
+
+    A game's score is the number of times its page was viewed, with each view's weight halving
+    every half-life. The views recorded by this process since its last checkpoint are tallied
+    in an array by store row, using forward decay (i.e., a view at time t adds 2^((t-L)/h) for a
+    landmark time L), so that recording a view never needs to decay any other scores. Every
+    checkpoint adds those views to a rollup table of the views of each game in each hour, which
+    all processes share, and then reloads every game's decayed score from that table, which
+    thus includes the views recorded by other processes too.
+    """
+
+    def __init__(self, app, db, rollup_model, network, store, counted_event_types, half_life=3*SECONDS_PER_DAY,
+                 retention=30*SECONDS_PER_DAY):
+        """Initialize a PopularityTracker object."""
+        self.app = app
+        self.db = db
+        # The model of the rollup table, which must have network, game_id, hour, and views columns
+        self.rollup_model = rollup_model
+        self.network = network
+        self.store = store
+        # The model types (e.g., GameNetGameRequest) of the analytics events that count as views
+        self.counted_event_types = counted_event_types
+        self.half_life = half_life
+        # How long views are kept in the rollup table, by which time they should weigh next to nothing
+        self.retention = retention
+        self.lock = threading.Lock()
+        self.baseline_scores = numpy.zeros(len(store), dtype=numpy.float64)
+        self.baseline_time = time.time()
+        self.pending_scores = numpy.zeros(len(store), dtype=numpy.float64)
+        self.pending_landmark = self.baseline_time
+        # The pending views, as counts keyed by (game ID, hour), to be added to the rollup table
+        self.pending_views = collections.Counter()
+        # While a checkpoint is in progress, the views being added to the rollup table are held here
+        self.checkpointing_scores = None
+        self.checkpointing_landmark = None
+
+    def _decay(self, elapsed_time):
+        """Return the factor that a score decays by over the given time (in seconds)."""
+        return 2.0 ** (-float(elapsed_time) / self.half_life)
+
+    def load(self):
+        """Load the scores from the rollup table, creating the table if it doesn't exist yet."""
+        with self.app.app_context():
+            self.rollup_model.__table__.create(bind=self.db.engine, checkfirst=True)
+            now = time.time()
+            baseline_scores = self._read_scores(now=now)
+            self.db.session.remove()
+        with self.lock:
+            self.baseline_scores = baseline_scores
+            self.baseline_time = now
+
+    def _read_scores(self, now):
+        """Read every game's score as of the given time from the rollup table (within an app context)."""
+        model = self.rollup_model
+        first_hour = int((now - self.retention) // SECONDS_PER_ROLLUP_PERIOD)
+        rollups = self.db.session.query(model.game_id, model.hour, model.views).filter(
+            model.network == self.network, model.hour >= first_hour
+        ).all()
+        scores = numpy.zeros(len(self.store), dtype=numpy.float64)
+        if not rollups:
+            return scores
+        game_ids, hours, views = (numpy.array(column) for column in zip(*rollups))
+        # Skip any games that are no longer in the network
+        game_ids = game_ids.astype(numpy.int64)
+        in_range = (game_ids >= 0) & (game_ids < len(self.store.row_of_id))
+        rows = numpy.full(len(game_ids), -1, dtype=numpy.int64)
+        rows[in_range] = self.store.row_of_id[game_ids[in_range]]
+        known = rows >= 0
+        # Each hour's views get decayed from the middle of the hour (but not beyond now)
+        ages = numpy.maximum(now - (hours[known].astype(numpy.float64) + 0.5) * SECONDS_PER_ROLLUP_PERIOD, 0.0)
+        weights = views[known].astype(numpy.float64) * 2.0 ** (-ages / self.half_life)
+        scores += numpy.bincount(rows[known], weights=weights, minlength=len(scores))
+        return scores
+
+    def observe(self, analytics_events):
+        """Count the views among newly recorded analytics events."""
+        now = time.time()
+        hour = int(now // SECONDS_PER_ROLLUP_PERIOD)
+        for analytics_event in analytics_events:
+            if not isinstance(analytics_event, self.counted_event_types) or analytics_event.network != self.network:
+                continue
+            if analytics_event.game_id is None:
+                continue
+            row = self.store.get_row(analytics_event.game_id)
+            if row is None:
+                continue
+            with self.lock:
+                self.pending_scores[row] += 2.0 ** ((now - self.pending_landmark) / self.half_life)
+                self.pending_views[(int(self.store.ids[row]), hour)] += 1
+
+    def get_scores(self):
+        """Return every game's current score, in an array indexed by store row."""
+        now = time.time()
+        with self.lock:
+            scores = self.baseline_scores * self._decay(now - self.baseline_time)
+            scores += self.pending_scores * self._decay(now - self.pending_landmark)
+            if self.checkpointing_scores is not None:
+                scores += self.checkpointing_scores * self._decay(now - self.checkpointing_landmark)
+        return scores
+
+    def get_trending(self, k=10):
+        """Return up to k (game view, score) pairs of the games with the highest scores, highest first."""
+        scores = self.get_scores()
+        k = min(k, numpy.count_nonzero(scores))
+        if k <= 0:
+            return []
+        rows = numpy.argpartition(-scores, k-1)[:k]
+        rows = rows[numpy.argsort(-scores[rows], kind='mergesort')]
+        return [(GameNetGameView(store=self.store, row=int(row)), float(scores[row])) for row in rows]
+
+    def checkpoint(self):
+        """Add the pending views to the rollup table, and reload every game's score from it (within an app context)."""
+        now = time.time()
+        with self.lock:
+            pending_views = self.pending_views
+            self.pending_views = collections.Counter()
+            self.checkpointing_scores, self.checkpointing_landmark = self.pending_scores, self.pending_landmark
+            self.pending_scores = numpy.zeros(len(self.store), dtype=numpy.float64)
+            self.pending_landmark = now
+        session = self.db.session
+        try:
+            if pending_views:
+                self._add_views(session=session, pending_views=pending_views, now=now)
+        except Exception:
+            session.rollback()
+            # Put the views back, to be added at the next checkpoint
+            with self.lock:
+                self.pending_views.update(pending_views)
+            self._restore_checkpointing_scores()
+            raise
+        try:
+            baseline_scores = self._read_scores(now=now)
+        except Exception:
+            # The views are in the rollup table now, but keep counting them until it can be read
+            self._restore_checkpointing_scores()
+            raise
+        with self.lock:
+            self.baseline_scores = baseline_scores
+            self.baseline_time = now
+            self.checkpointing_scores = self.checkpointing_landmark = None
+
+    def _restore_checkpointing_scores(self):
+        """Fold the scores of a failed checkpoint's views back into the pending scores."""
+        with self.lock:
+            self.pending_scores += self.checkpointing_scores * 2.0 ** (
+                (self.checkpointing_landmark - self.pending_landmark) / self.half_life
+            )
+            self.checkpointing_scores = self.checkpointing_landmark = None
+
+    def _add_views(self, session, pending_views, now):
+        """Add views to the rollup table, and delete the rollups older than the retention period, in one transaction."""
+        table = self.rollup_model.__table__
+        rollups = [
+            {'b_network': self.network, 'b_game_id': game_id, 'b_hour': hour, 'b_views': views}
+            for (game_id, hour), views in pending_views.iteritems()
+        ]
+        # Adding to the counts in place, rather than reading and then writing them, keeps
+        # processes checkpointing at the same time from losing each other's views
+        session.execute(
+            table.insert().prefix_with('OR IGNORE').values(
+                network=bindparam('b_network'), game_id=bindparam('b_game_id'), hour=bindparam('b_hour'), views=0
+            ),
+            rollups
+        )
+        session.execute(
+            table.update().where(and_(
+                table.c.network == bindparam('b_network'), table.c.game_id == bindparam('b_game_id'),
+                table.c.hour == bindparam('b_hour')
+            )).values(views=table.c.views + bindparam('b_views')),
+            rollups
+        )
+        first_hour = int((now - self.retention) // SECONDS_PER_ROLLUP_PERIOD)
+        session.execute(table.delete().where(and_(table.c.network == self.network, table.c.hour < first_hour)))
+        session.commit()
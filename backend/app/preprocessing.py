@@ -0,0 +1,434 @@
+import collections
+import io
+import os
+import string
+import threading
+from nltk import WordNetLemmatizer
+from nltk import word_tokenize
+
+
+class MultiwordPhraseMatcher(object):
+    """A token-level trie that tokenizes multiword phrases (e.g., game titles) in a single pass over a text."""
+
+    # Key under which a trie node stores the phrase that ends at it (tokens are
+    # always strings, so this can never collide with a token)
+    PHRASE_END = None
+
+    def __init__(self, phrases):
+        """Initialize a MultiwordPhraseMatcher object."""
+        # A list of (trie, maximum phrase length) stages, each of which gets matched against
+        # the text's tokens as tokenized by the stages before it
+        self.stages = []
+        self._build_stages(phrases=phrases)
+
+    def _build_stages(self, phrases):
+        """Build tries over the phrases, each of which is keyed by its sequence of words, split into stages.
+
+        A phrase containing an underscore can match the tokens that a phrase replaced before it
+        produces (e.g., 'a_b c' matches once 'a b' has become 'a_b'), so each such phrase gets
+        a stage of its own, after the phrases that take priority over it; the phrases between
+        such phrases can share a stage, since none can match another's tokenized form.
+        """
+        # Only phrases with normalized whitespace can ever match a whitespace-normalized
+        # text, and tokenizing a single-word phrase would leave it unchanged
+        multiword_phrases = [
+            phrase for phrase in phrases if phrase == ' '.join(phrase.split()) and len(phrase.split()) > 1
+        ]
+        # Phrases with more words take priority over phrases with fewer words, with ties
+        # broken by the order in which the phrases were given (the sort is stable)
+        multiword_phrases.sort(key=lambda p: len(p.split()), reverse=True)
+        trie = None
+        seen_phrases = set()
+        for priority, phrase in enumerate(multiword_phrases):
+            # A repeated phrase has nothing left to tokenize
+            if phrase in seen_phrases:
+                continue
+            seen_phrases.add(phrase)
+            words = phrase.split()
+            if trie is None or '_' in phrase:
+                trie = {}
+                self.stages.append([trie, 0])
+            node = trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node[self.PHRASE_END] = (priority, '_'.join(words))
+            self.stages[-1][1] = max(self.stages[-1][1], len(words))
+            if '_' in phrase:
+                # The phrases after it must see its tokenized form, so they start a new stage
+                trie = None
+
+    def tokenize(self, text):
+        """Join the words of each phrase occurring in the text with underscores.
+
+        This produces the same result as replacing the phrases one at a time, from the
+        phrase with the most words to the one with the fewest, but requires only one
+        pass over the text's tokens per stage, regardless of how many phrases there are.
+        """
+        tokens = text.split()
+        for trie, max_phrase_length in self.stages:
+            tokens = self._tokenize_stage(tokens=tokens, trie=trie, max_phrase_length=max_phrase_length)
+        return ' '.join(tokens)
+
+    def _tokenize_stage(self, tokens, trie, max_phrase_length):
+        """Join the words of each occurrence of a stage's phrases in the tokens, returning the new tokens."""
+        matches = self._find_all_matches(tokens=tokens, trie=trie, max_phrase_length=max_phrase_length)
+        if not matches:
+            return tokens
+        # Group the phrase occurrences by phrase, in priority order
+        matches.sort()
+        occurrences_by_priority = {}
+        for priority, start, end, tokenized_phrase in matches:
+            occurrences_by_priority.setdefault(priority, []).append((start, end, tokenized_phrase))
+        claimed = [False] * len(tokens)
+        accepted_matches = {}
+        for priority in sorted(occurrences_by_priority):
+            for start, end, tokenized_phrase in self._select_occurrences_of_phrase(
+                occurrences=occurrences_by_priority[priority], claimed=claimed
+            ):
+                accepted_matches[start] = (end, tokenized_phrase)
+        tokenized_tokens = []
+        i = 0
+        while i < len(tokens):
+            if i in accepted_matches:
+                end, tokenized_phrase = accepted_matches[i]
+                tokenized_tokens.append(tokenized_phrase)
+                i = end
+            else:
+                tokenized_tokens.append(tokens[i])
+                i += 1
+        return tokenized_tokens
+
+    @staticmethod
+    def _select_occurrences_of_phrase(occurrences, claimed):
+        """Select which occurrences of a single phrase get tokenized, and claim their tokens.
+
+        This mirrors repeatedly calling str.replace() on ' {phrase} ' until the phrase no
+        longer occurs: each call consumes the space that follows a replaced occurrence,
+        so an occurrence starting right where the last one ended has to wait for the next
+        call, and occurrences overlapping an already-tokenized one never get tokenized.
+        """
+        selected_occurrences = []
+        pending_occurrences = occurrences
+        while pending_occurrences:
+            deferred_occurrences = []
+            end_of_last_selected_occurrence = None
+            for start, end, tokenized_phrase in pending_occurrences:
+                if any(claimed[start:end]):
+                    continue
+                if end_of_last_selected_occurrence is not None and start < end_of_last_selected_occurrence:
+                    continue
+                if start == end_of_last_selected_occurrence:
+                    deferred_occurrences.append((start, end, tokenized_phrase))
+                    continue
+                selected_occurrences.append((start, end, tokenized_phrase))
+                end_of_last_selected_occurrence = end
+            for start, end, _ in selected_occurrences:
+                for i in xrange(start, end):
+                    claimed[i] = True
+            pending_occurrences = deferred_occurrences
+        return selected_occurrences
+
+    def _find_all_matches(self, tokens, trie, max_phrase_length):
+        """Return a (priority, start, end, tokenized phrase) tuple for every occurrence of a trie's phrases."""
+        matches = []
+        for start in xrange(len(tokens)):
+            node = trie
+            for end in xrange(start, min(len(tokens), start+max_phrase_length)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if self.PHRASE_END in node:
+                    priority, tokenized_phrase = node[self.PHRASE_END]
+                    matches.append((priority, start, end+1, tokenized_phrase))
+        return matches
+
+
+class LemmaCache(object):
+    """A bounded, thread-safe cache mapping (word, WordNet POS tag) pairs to lemmas, evicting least recently used."""
+
+    def __init__(self, max_size=100000):
+        """Initialize a LemmaCache object."""
+        self.max_size = max_size
+        self.lemmas = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def get(self, word, pos):
+        """Return the cached lemma for the word with this POS, or None if it has not been cached."""
+        with self.lock:
+            try:
+                lemma = self.lemmas.pop((word, pos))
+            except KeyError:
+                return None
+            # Reinsert the entry to mark it as the most recently used
+            self.lemmas[(word, pos)] = lemma
+            return lemma
+
+    def set(self, word, pos, lemma):
+        """Cache the lemma for the word with this POS."""
+        with self.lock:
+            self.lemmas.pop((word, pos), None)
+            self.lemmas[(word, pos)] = lemma
+            while len(self.lemmas) > self.max_size:
+                self.lemmas.popitem(last=False)
+
+    def load(self, path):
+        """Load cache entries from a TSV file of word, POS, lemma triples, if there is one."""
+        if not os.path.exists(path):
+            return
+        with io.open(path, 'r', encoding='utf-8') as tsv_file:
+            for line in tsv_file:
+                try:
+                    word, pos, lemma = line.rstrip('\n').split('\t')
+                except ValueError:
+                    continue  # Skip any malformed (e.g., truncated) lines
+                self.set(word=word, pos=pos, lemma=lemma)
+
+    def save(self, path):
+        """Save the cache entries to a TSV file of word, POS, lemma triples, least recently used first."""
+        with self.lock:
+            entries = list(self.lemmas.items())
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with io.open(temporary_path, 'w', encoding='utf-8') as tsv_file:
+            for (word, pos), lemma in entries:
+                tsv_file.write(u'{}\t{}\t{}\n'.format(word, pos, lemma))
+        # Swap the new file in atomically, so that a crash mid-write can't clobber the old one
+        os.rename(temporary_path, path)
+
+
+class TextPreprocessor(object):
+    """A long-lived preprocessor that prepares user-submitted text for folding into a network's LSA model."""
+
+    # Mapping from Penn Treebank POS tags to the WordNet POS tags that the lemmatizer expects
+    PENN_TO_WORDNET_POS_TAGS = {
+        'NN': 'n', 'NNS': 'n', 'VB': 'v', 'VBD': 'v', 'VBG': 'v',  'VBN': 'v', 'VBP': 'v',
+        'VBZ': 'v', 'JJ': 'a', 'JJR': 'a', 'JJS': 'a', 'RB': 'r', 'RBR': 'r', 'RBS': 'r',
+    }
+    # Stopwords that are missed in the 'gameplay' network because punctuation gets removed
+    # before stopword removal
+    CONTRACTIONS_MISSED_BECAUSE_OF_PUNCTUATION_REMOVAL = (
+        'arent', 'cant', 'couldnt', 'didnt', 'doesnt', 'dont', 'hadnt', 'hasnt', 'havent',
+        'hed', 'hell', 'hes', 'id', 'ill', 'im', 'ive', 'isnt', 'its', 'lets', 'mightnt', 'mustnt',
+        'shant', 'shed', 'shell', 'shes', 'shouldnt', 'thats', 'theres', 'theyd', 'theyll', 'theyre',
+        'theyve', 'wed', 'were', 'weve', 'werent', 'whatll', 'whatre', 'whats', 'whatve', 'wheres',
+        'whod', 'wholl', 'whore', 'whos', 'whove', 'wont', 'wouldnt',  'youd', 'youll', 'youre', 'youve'
+    )
+
+    def __init__(self, network, stopwords, title_matcher=None, platform_name_matcher=None, pos_tagger_pool=None,
+                 lemma_cache_size=100000, lemma_cache_path=None):
+        """Initialize a TextPreprocessor object."""
+        self.network = network
+        if self.network == 'gameplay':
+            stopwords = list(stopwords) + list(self.CONTRACTIONS_MISSED_BECAUSE_OF_PUNCTUATION_REMOVAL)
+        self.stopwords = frozenset(stopwords)
+        # These are only used to preprocess text in the 'ontology' network style
+        self.title_matcher = title_matcher
+        self.platform_name_matcher = platform_name_matcher
+        # This is only used to preprocess text in the 'gameplay' network style
+        self.pos_tagger_pool = pos_tagger_pool
+        self.lemmatizer = WordNetLemmatizer()
+        # WordNet is loaded lazily, and not in a thread-safe way, so force it to load now
+        self.lemmatizer.lemmatize('games')
+        self.lemma_cache = LemmaCache(max_size=lemma_cache_size)
+        # If we were given a path to a saved lemma cache, warm up the cache from it
+        self.lemma_cache_path = lemma_cache_path
+        if self.lemma_cache_path:
+            self.lemma_cache.load(path=self.lemma_cache_path)
+
+    def save_lemma_cache(self):
+        """Save the lemma cache to disk, so that it can be warmed up from there on the next startup."""
+        if self.lemma_cache_path:
+            self.lemma_cache.save(path=self.lemma_cache_path)
+
+    def preprocess(self, text):
+        """Preprocess user-submitted text in the same way we preprocessed this network's corpus."""
+        if self.network == 'ontology':
+            return self._preprocess_text_in_ontology_network_style(text=text)
+        else:  # 'gameplay'
+            return self._preprocess_text_in_gameplay_network_style(text=text)
+
+    def _lemmatize(self, word, pos):
+        """Return the lemma for the word with this WordNet POS tag, consulting the lemma cache first."""
+        lemma = self.lemma_cache.get(word=word, pos=pos)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(word, pos=pos)
+            self.lemma_cache.set(word=word, pos=pos, lemma=lemma)
+        return lemma
+
+    def _preprocess_text_in_ontology_network_style(self, text):
+        """Preprocess user-submitted text in the same way we preprocessed the Wikipedia corpus."""
+        # Remove weird characters that could cause encoding issues
+        text = filter(lambda char: char in string.printable, text)
+        # Remove newline and tab characters
+        for special_char in ('\n', '\r', '\t'):
+            text = text.replace(special_char, ' ')
+        # Remove preliminary set of punctuation symbols
+        for punctuation_symbol in ('_', '.', ',', ';'):
+            text = text.replace(punctuation_symbol, ' ')
+        text = text.lower()
+        # Remove redundant whitespace
+        text = ' '.join(text.split())
+        # Tokenize multiword game titles
+        text = self._tokenize_multiword_titles(text=text)
+        # Tokenize multiword platform names
+        text = self._tokenize_multiword_platform_names(text=text)
+        # Remove punctuation and symbols (except underscores)
+        text = self._remove_punctuation_and_symbols(text=text)
+        # Again remove redundant whitespace
+        text = ' '.join(text.split())
+        # Remove stopwords
+        text = self._remove_stopwords_ontology(text=text)
+        # Lemmatize words
+        text = self._lemmatize_words(text=text)
+        # Remove stopwords again (some may have been reintroduced
+        # by lemmatization)
+        text = self._remove_stopwords_ontology(text=text)
+        return text
+
+    def _tokenize_multiword_titles(self, text):
+        """Tokenize occurrences of multiword titles."""
+        # The matcher was built once, at startup, from the titles of all the games in
+        # the database, and tokenizes longer titles before shorter ones
+        text = self.title_matcher.tokenize(text=text)
+        return text
+
+    def _tokenize_multiword_platform_names(self, text):
+        """Tokenize occurrences of multiword platform names."""
+        text = self.platform_name_matcher.tokenize(text=text)
+        return text
+
+    @staticmethod
+    def _remove_punctuation_and_symbols(text):
+        """Remove punctuation and other symbols."""
+        for symbol in (
+            '[', ']', '\'', '&', '(', ')', '\\', '/', '*', '!',
+            '?', '$', '^', '~', '+', '=', '{', '}', '`', '|', '#'
+        ):
+            text = text.replace(symbol, ' ')
+        for symbol in ('"', ':'):
+            text = text.replace(symbol, '')
+        return text
+
+    def _remove_stopwords_ontology(self, text):
+        """Remove all stopwords from the text."""
+        tokens = [token.lower() for token in text.split()]
+        for i in xrange(len(tokens)):
+            if tokens[i] in self.stopwords:
+                tokens[i] = ''
+            elif len(tokens[i]) == 1:  # Remove single letters
+                tokens[i] = ''
+        text = ' '.join([token for token in tokens if token])
+        return text
+
+    def _lemmatize_words(self, text):
+        """Lemmatize all words in the text."""
+        tokens = [self._lemmatize(word=word, pos='n') for word in text.split()]
+        text = ' '.join(tokens)
+        return text
+
+    def _preprocess_text_in_gameplay_network_style(self, text):
+        """Preprocess user-submitted text in the same way we preprocessed the GameFAQs corpus."""
+        # Remove weird characters that could cause encoding issues
+        text = filter(lambda char: char in string.printable, text)
+        # Remove newline and tab characters
+        for special_char in ('\n', '\r', '\t'):
+            text = text.replace(special_char, '. ')
+        # Remove most punctuation and symbols
+        text = self._remove_punctuation_and_symbols(text=text)
+        # POS-tag the text
+        pos_tagged_text = self._pos_tag_text(text=text)
+        # Remove all tokens that aren't POS-tagged as a verb or common noun
+        pos_tagged_text = self._remove_everything_but_verbs_and_common_nouns(pos_tagged_text)
+        # Convert text to lowercase
+        for i in xrange(len(pos_tagged_text)):
+            pos_tagged_text[i][0] == pos_tagged_text[i][0].lower()
+        # Remove numbers and non-Latin characters
+        pos_tagged_text = self._remove_any_numbers_and_non_english_characters_from_text(
+            pos_tagged_text=pos_tagged_text
+        )
+        # Lemmatize, and remove stopwords
+        pos_tagged_text = self._lemmatize_and_remove_stopwords(
+            pos_tagged_text=pos_tagged_text
+        )
+        # Throw away the POS tags
+        text = [tag[0] for tag in pos_tagged_text]
+        text = ' '.join(text)
+        # Remove redundant whitespace
+        text = ' '.join(text.split())
+        return text
+
+    def _pos_tag_text(self, text):
+        tokens = word_tokenize(text)
+        # POS-tag the text, using one of the long-lived taggers in the pool
+        pos_tagged_text = self.pos_tagger_pool.tag(tokens)
+        # Convert each word-tag tuple to a list, to support item assignment, which
+        # we need during lemmatization and stopword removal
+        pos_tagged_text = [list(t) for t in pos_tagged_text]
+        return pos_tagged_text
+
+    @staticmethod
+    def _remove_everything_but_verbs_and_common_nouns(pos_tagged_text):
+        """Remove everything but verbs and common nouns from the POS-tagged text."""
+        pos_tagged_text = [
+            word_and_tag_pair for word_and_tag_pair in pos_tagged_text if word_and_tag_pair[0] != '' and
+            word_and_tag_pair[1] in ('VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ', 'NN', 'NNS')
+        ]
+        return pos_tagged_text
+
+    @staticmethod
+    def _remove_any_numbers_and_non_english_characters_from_text(pos_tagged_text):
+        """Remove any digits from the POS-tagged text."""
+        for i in xrange(len(pos_tagged_text)):
+            word = pos_tagged_text[i][0]
+            # Remove numbers
+            for digit in string.digits:
+                word = word.replace(digit, '')
+            # Remove words with non-Latin characters
+            try:
+                word.decode('ascii')
+            except UnicodeDecodeError:
+                word = ''
+            # Write the preprocessed word back
+            pos_tagged_text[i][0] = word
+        return pos_tagged_text
+
+    @staticmethod
+    def _remove_all_other_punctuation(pos_tagged_text):
+        """Remove all remaining punctuation from POS-tagged text."""
+        for j in xrange(len(pos_tagged_text)):
+            word = pos_tagged_text[j][0]
+            for symbol in (',', '.', ';', '-'):
+                word = word.replace(symbol, ' ')
+            # Write the preprocessed word back
+            pos_tagged_text[j][0] = word
+        return pos_tagged_text
+
+    def _lemmatize_and_remove_stopwords(self, pos_tagged_text):
+        """Lemmatize the pos_tagged_text and remove any stopwords."""
+        # Within a single text, a word keeps the first lemma computed for it, regardless
+        # of the POS tag attached to any later occurrence of it
+        lemmatizations_already_computed = {}
+        # Run the lemmatization procedure multiple times to be safe (problem
+        # when, e.g., 'apples apples' shows up)
+        for i in xrange(5):
+            changed_during_this_pass = False
+            for j in xrange(len(pos_tagged_text)):
+                word, pos_tag = pos_tagged_text[j]
+                if word != '':
+                    # Lemmatize word
+                    if word not in lemmatizations_already_computed:
+                        lemmatizations_already_computed[word] = self._lemmatize(
+                            word=word, pos=self.PENN_TO_WORDNET_POS_TAGS[pos_tag]
+                        )
+                    pos_tagged_text[j][0] = lemmatizations_already_computed[word]
+                    # If it's a stopword (or unicharacter symbol), remove it
+                    if pos_tagged_text[j][0] in self.stopwords or len(pos_tagged_text[j][0]) == 1:
+                        pos_tagged_text[j][0] = ''
+                    if pos_tagged_text[j][0] != word:
+                        changed_during_this_pass = True
+            # Once a pass changes nothing, further passes can't either
+            if not changed_during_this_pass:
+                break
+        return pos_tagged_text
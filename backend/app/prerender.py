@@ -0,0 +1,192 @@
+"""Render every page of the GameNet site to static files, across a pool of processes, for a web server to serve.
+
+Run this from the directory containing routes.py, e.g.:
+
+    python prerender.py ./prerendered --processes 8
+
+Every game's entry in both networks, along with the GameNet home, network, about, and FAQ
+pages, gets rendered as an anonymous visitor would see it, and written to the output directory
+at its URL's path plus '.html' (e.g., gamenet/ontology/games/42.html), next to gzip- and (if the
+brotli module is installed) brotli-compressed copies, so that the server needn't compress them.
+Files whose contents haven't changed are left alone, so that their modification times (and thus
+the server's ETags for them) stay the same. With nginx (and its brotli module), e.g.:
+
+    location /gamenet {
+        root /path/to/prerendered;
+        gzip_static on;
+        brotli_static on;
+        default_type text/html;
+        try_files $uri.html @app;
+    }
+
+The pages link to fingerprinted static assets (see assets.py), which get written, with their
+compressed variants, under static/ in the output directory, to be served with, e.g.:
+
+    location /static {
+        root /path/to/prerendered;
+        gzip_static on;
+        brotli_static on;
+        expires max;
+        add_header Cache-Control immutable;
+        try_files $uri @app;
+    }
+
+Pre-rendered game pages report their views through the /gamenet/events beacon, since they
+never reach the app.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import warnings
+from flask import Flask, render_template
+from flask.ext.login import AnonymousUserMixin
+from assets import install_static_asset_manifest, compress_with_gzip, brotli
+from loading import load_gamenet_ontology_store, load_gamenet_gameplay_store
+
+LOADERS = {'ontology': load_gamenet_ontology_store, 'gameplay': load_gamenet_gameplay_store}
+
+# The pages other than game entries, as (URL path, template, context) triples
+SITE_PAGES = (
+    ('gamenet', 'gamenet_index.html', {'entered_unknown_game': False}),
+    ('gamenet/ontology', 'gamenet_index-ontology.html', {'entered_unknown_game': False}),
+    ('gamenet/gameplay', 'gamenet_index-gameplay.html', {'entered_unknown_game': False}),
+    ('gamenet/about', 'gamenet_about.html', {}),
+    ('gamenet/faq', 'gamenet_faq.html', {}),
+)
+
+# Rendering only needs the templates and url_for(), not anything that routes.py sets up
+render_app = Flask(__name__, static_folder='static')
+static_asset_manifest = install_static_asset_manifest(app=render_app)
+
+# The loaded stores and the output directory, which are set in the parent process before the
+# pool gets created, so that the worker processes inherit them via fork
+render_resources = {}
+
+
+def load_stores(networks):
+    """Load the GameNet store of each network."""
+    render_resources['stores'] = dict((network, LOADERS[network]()) for network in networks)
+
+
+def render_page(template_name, **context):
+    """Render a template as an anonymous visitor would see it, returning the encoded page."""
+    with render_app.test_request_context():
+        return render_template(template_name, current_user=AnonymousUserMixin(), **context).encode('utf-8')
+
+
+def write_file_if_changed(path, contents):
+    """Write a file (via a temporary file, so that it never gets served half-written), unless it's unchanged.
+
+    Returns whether the file was written.
+    """
+    if os.path.exists(path):
+        with open(path, 'rb') as existing_file:
+            if existing_file.read() == contents:
+                return False
+    temporary_path = '{}.tmp-{}'.format(path, os.getpid())
+    with open(temporary_path, 'wb') as temporary_file:
+        temporary_file.write(contents)
+    os.rename(temporary_path, path)
+    return True
+
+
+def make_parent_directory(path):
+    """Make the directory that a file is to be written in, if it doesn't exist yet."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Another worker might have just made it
+            if not os.path.isdir(directory):
+                raise
+
+
+def write_page(url_path, body):
+    """Write a page, and its compressed copies, at its URL's path in the output directory.
+
+    Returns the number of files written.
+    """
+    path = os.path.join(render_resources['output_directory'], *url_path.split('/')) + '.html'
+    make_parent_directory(path)
+    number_of_files_written = int(write_file_if_changed(path=path, contents=body))
+    number_of_files_written += write_file_if_changed(path=path + '.gz', contents=compress_with_gzip(body))
+    if brotli is not None:
+        number_of_files_written += write_file_if_changed(
+            path=path + '.br', contents=brotli.compress(body, mode=brotli.MODE_TEXT)
+        )
+    return number_of_files_written
+
+
+def write_static_assets():
+    """Write each fingerprinted static asset, and its compressed variants, under static/ in the output directory.
+
+    Returns the number of assets and the number of files written.
+    """
+    number_of_files_written = 0
+    for asset in static_asset_manifest.assets_by_filename.itervalues():
+        path = os.path.join(render_resources['output_directory'], 'static', asset.fingerprinted_filename)
+        make_parent_directory(path)
+        for content_encoding, body in asset.bodies.iteritems():
+            extension = {'identity': '', 'gzip': '.gz', 'br': '.br'}[content_encoding]
+            number_of_files_written += write_file_if_changed(path=path + extension, contents=body)
+    return len(static_asset_manifest.assets_by_filename), number_of_files_written
+
+
+def render_site_pages():
+    """Render and write the pages other than game entries."""
+    number_of_files_written = 0
+    for url_path, template_name, context in SITE_PAGES:
+        number_of_files_written += write_page(url_path=url_path, body=render_page(template_name, **context))
+    return len(SITE_PAGES), number_of_files_written
+
+
+def render_games(task):
+    """Render and write the entries of a network's games in a range of store rows (runs in a worker process)."""
+    network, start_row, end_row = task
+    store = render_resources['stores'][network]
+    number_of_files_written = 0
+    for row in xrange(start_row, end_row):
+        game = store.get(store.ids[row])
+        body = render_page('game.html', network=network, game=game, prerendered=True)
+        number_of_files_written += write_page(url_path='gamenet/{}/games/{}'.format(network, game.id), body=body)
+    return end_row - start_row, number_of_files_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render every page of the GameNet site to static files.")
+    parser.add_argument('output_directory')
+    parser.add_argument('--networks', nargs='+', choices=sorted(LOADERS), default=sorted(LOADERS))
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=200, help="game entries handed to a worker at a time")
+    args = parser.parse_args()
+    if brotli is None:
+        warnings.warn("The brotli module isn't installed, so only gzip-compressed copies will be written")
+    # Load the stores once, before forking, so that all the workers share them
+    load_stores(networks=args.networks)
+    render_resources['output_directory'] = args.output_directory
+    tasks = [
+        (network, start_row, min(start_row + args.chunk_size, len(store)))
+        for network, store in sorted(render_resources['stores'].iteritems())
+        for start_row in xrange(0, len(store), args.chunk_size)
+    ]
+    pool = multiprocessing.Pool(processes=args.processes)
+    try:
+        number_of_assets, number_of_files_written = write_static_assets()
+        number_of_pages, number_of_page_files_written = render_site_pages()
+        number_of_files_written += number_of_page_files_written
+        for number_of_games, number_of_game_files_written in pool.imap_unordered(render_games, tasks):
+            number_of_pages += number_of_games
+            number_of_files_written += number_of_game_files_written
+    finally:
+        pool.close()
+        pool.join()
+    sys.stdout.write("Rendered {} pages and {} static assets into {} ({} files written or updated)\n".format(
+        number_of_pages, number_of_assets, args.output_directory, number_of_files_written
+    ))
+
+
+if __name__ == '__main__':
+    main()
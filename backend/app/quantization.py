@@ -0,0 +1,216 @@
+"""Compact (float16 or int8) copies of GameSage's similarity matrices, and a comparison of them against float32.
+
+A quantized matrix takes a half (float16) or a quarter (int8) of the memory of the float32
+matrix, so that more of it stays in cache, and more worker processes fit on a machine. Since
+numpy has no fast products of such matrices, the quantized matrix gets scored a block of rows at
+a time, each block converted to float32 (while it's in cache) for a BLAS product; this makes
+int8 search faster than float32 search, but float16 search slower, since numpy converts float16
+values without hardware support. Int8 matrices are quantized per dimension, i.e., each
+dimension (column) gets its own scale, which gets folded into the query instead of the matrix.
+With rescoring, the quantized scores only pick a shortlist of candidates for the most and least
+related games, which then get scored exactly against their float32 vectors, so that the
+results' scores are exact.
+
+To compare each quantization against float32 search (its memory, speed, and top-k overlap),
+run this from the directory containing routes.py:
+
+    python quantization.py --networks ontology gameplay --queries 1000
+"""
+
+import argparse
+import sys
+import time
+import numpy
+from similarity import LSASimilarityIndex
+
+QUANTIZATIONS = ('float16', 'int8')
+
+
+class QuantizedSimilarityIndex(object):
+    """A similarity index that searches a quantized copy of an exact index's matrix, optionally rescoring exactly."""
+
+    def __init__(self, exact_index, quantization, quantized_matrix, scales, rescoring_factor=4, block_size=1024):
+        """Initialize a QuantizedSimilarityIndex object."""
+        self.exact_index = exact_index
+        self.game_ids = exact_index.game_ids
+        self.index_of_game_id = exact_index.index_of_game_id
+        self.number_of_dimensions = exact_index.number_of_dimensions
+        self.matrix = exact_index.matrix
+        self.quantization = quantization
+        self.quantized_matrix = quantized_matrix
+        # The factor by which each dimension's quantized values get multiplied to approximate its float32 values
+        self.scales = scales
+        # Searches shortlist this many times k candidates, to be rescored exactly (or, if None, none get rescored)
+        self.rescoring_factor = rescoring_factor
+        # How many rows of the quantized matrix get converted to float32 at a time
+        self.block_size = block_size
+
+    @staticmethod
+    def quantize(matrix, quantization):
+        """Quantize a float32 matrix, returning the quantized matrix and its per-dimension scales."""
+        if quantization == 'float16':
+            return matrix.astype(numpy.float16), numpy.ones(matrix.shape[1], dtype=numpy.float32)
+        if quantization == 'int8':
+            scales = numpy.abs(matrix).max(axis=0).astype(numpy.float32) / 127.0
+            scales[scales == 0] = 1.0
+            quantized_matrix = numpy.clip(numpy.rint(matrix / scales), -127, 127).astype(numpy.int8)
+            return quantized_matrix, scales
+        raise ValueError("Unknown quantization: {}".format(quantization))
+
+    @classmethod
+    def build(cls, exact_index, quantization, rescoring_factor=4):
+        """Build a quantized index over an exact index."""
+        quantized_matrix, scales = cls.quantize(matrix=exact_index.matrix, quantization=quantization)
+        return cls(
+            exact_index=exact_index, quantization=quantization, quantized_matrix=quantized_matrix, scales=scales,
+            rescoring_factor=rescoring_factor
+        )
+
+    def to_arrays(self):
+        """Return the arrays making up the index, to be saved as a snapshot."""
+        return {'quantized_matrix': self.quantized_matrix, 'scales': self.scales}
+
+    @classmethod
+    def from_arrays(cls, exact_index, quantization, arrays, rescoring_factor=4):
+        """Rebuild an index from its arrays, as saved in a snapshot."""
+        return cls(
+            exact_index=exact_index, quantization=quantization, quantized_matrix=arrays['quantized_matrix'],
+            scales=arrays['scales'], rescoring_factor=rescoring_factor
+        )
+
+    def vectorize(self, lsa_vector):
+        """Convert an LSA vector into a unit-length array."""
+        return self.exact_index.vectorize(lsa_vector)
+
+    def score(self, lsa_vector):
+        """Return the cosine similarity between an LSA vector and every game in the index (exactly)."""
+        return self.exact_index.score(lsa_vector)
+
+    def score_approximately(self, query_matrix):
+        """Return the approximate cosine similarities between each row of a query matrix and every game."""
+        scaled_query_matrix = (query_matrix * self.scales).T
+        score_matrix = numpy.empty((len(query_matrix), len(self.quantized_matrix)), dtype=numpy.float32)
+        for block_start in xrange(0, len(self.quantized_matrix), self.block_size):
+            block = self.quantized_matrix[block_start:block_start+self.block_size].astype(numpy.float32)
+            score_matrix[:, block_start:block_start+len(block)] = numpy.dot(block, scaled_query_matrix).T
+        return score_matrix
+
+    def _rescore(self, query_vector, approximate_scores, k):
+        """Rescore a query's shortlisted candidates exactly, returning its k most and least related games."""
+        shortlist_size = min(self.rescoring_factor * k, len(approximate_scores))
+        if shortlist_size == 0:
+            return [], []
+        if shortlist_size < len(approximate_scores):
+            shortlists = (
+                numpy.argpartition(-approximate_scores, shortlist_size-1)[:shortlist_size],
+                numpy.argpartition(approximate_scores, shortlist_size-1)[:shortlist_size],
+            )
+        else:
+            shortlists = (numpy.arange(len(approximate_scores)),) * 2
+        results = []
+        for shortlist, most_related in zip(shortlists, (True, False)):
+            shortlist = numpy.sort(shortlist)
+            exact_scores = numpy.dot(self.matrix[shortlist], query_vector)
+            candidates = LSASimilarityIndex.select_extremes(scores=exact_scores, k=k)[0 if most_related else 1]
+            results.append([(int(shortlist[i]), score) for i, score in candidates])
+        return tuple(results)
+
+    def most_and_least_related(self, lsa_vector, k=50):
+        """Return the k most related and k least related games to an LSA vector, as the exact index does."""
+        return self.most_and_least_related_to_each(lsa_vectors=[lsa_vector], k=k)[0]
+
+    def most_and_least_related_to_each(self, lsa_vectors, k=50, chunk_size=256):
+        """Return the k most related and k least related games to each of a list of LSA vectors."""
+        results = []
+        for chunk_start in xrange(0, len(lsa_vectors), chunk_size):
+            chunk = lsa_vectors[chunk_start:chunk_start+chunk_size]
+            query_matrix = numpy.vstack([self.vectorize(lsa_vector) for lsa_vector in chunk])
+            score_matrix = self.score_approximately(query_matrix=query_matrix)
+            if self.rescoring_factor is None:
+                results += LSASimilarityIndex.select_extremes_of_each_row(score_matrix=score_matrix, k=k)
+            else:
+                results += [
+                    self._rescore(query_vector=query_vector, approximate_scores=approximate_scores, k=k)
+                    for query_vector, approximate_scores in zip(query_matrix, score_matrix)
+                ]
+        return results
+
+
+def compute_overlap(results, exact_results):
+    """Return the fraction of the exact results' games that are among the results' games."""
+    exact_indices = set(index for index, _ in exact_results)
+    if not exact_indices:
+        return 1.0
+    return len(exact_indices.intersection(index for index, _ in results)) / float(len(exact_indices))
+
+
+def compare_with_exact(quantized_index, query_vectors, k=50):
+    """Compare a quantized index's search against its exact index's, over the given queries.
+
+    Returns a dict of the two matrices' sizes (in bytes), the mean per-query latency of each
+    search (in milliseconds), and the mean overlap between their k most (and least) related games.
+    """
+    comparison = {
+        'float32_bytes': quantized_index.matrix.nbytes, 'quantized_bytes': quantized_index.quantized_matrix.nbytes,
+    }
+    timed_results = {}
+    for name, similarity_index in (('float32', quantized_index.exact_index), ('quantized', quantized_index)):
+        start_time = time.time()
+        timed_results[name] = [
+            similarity_index.most_and_least_related(lsa_vector=query_vector, k=k) for query_vector in query_vectors
+        ]
+        comparison['{}_latency'.format(name)] = (time.time() - start_time) * 1000.0 / max(len(query_vectors), 1)
+    for i, name in enumerate(('most_related_overlap', 'least_related_overlap')):
+        comparison[name] = numpy.mean([
+            compute_overlap(results=results[i], exact_results=exact_results[i])
+            for results, exact_results in zip(timed_results['quantized'], timed_results['float32'])
+        ])
+    return comparison
+
+
+def main():
+    # Imported here, since the loaders themselves import this module
+    from loading import load_gamesage_ontology_database, load_gamesage_gameplay_database, build_similarity_index
+    loaders = {'ontology': load_gamesage_ontology_database, 'gameplay': load_gamesage_gameplay_database}
+    parser = argparse.ArgumentParser(description="Compare quantized GameSage search against float32 search.")
+    parser.add_argument('--networks', nargs='+', choices=sorted(loaders), default=sorted(loaders))
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--rescoring-factor', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for network in args.networks:
+        database = loaders[network]()
+        exact_index = build_similarity_index(database=database, network=network)
+        random_state = numpy.random.RandomState(args.seed)
+        query_rows = random_state.choice(len(database), size=min(args.queries, len(database)), replace=False)
+        query_vectors = [numpy.asarray(database[int(row)].lsa_vector) for row in query_rows]
+        lines = [
+            "{} ({} games, {} dimensions):".format(network, len(database), exact_index.number_of_dimensions),
+            "    {:<20} {:>10} {:>7} {:>10} {:>8} {:>12} {:>12}".format(
+                'quantization', 'MB', 'saved', 'ms/query', 'speedup', 'most o@{}'.format(args.k),
+                'least o@{}'.format(args.k)
+            ),
+        ]
+        for quantization in QUANTIZATIONS:
+            for rescoring_factor in (None, args.rescoring_factor):
+                quantized_index = QuantizedSimilarityIndex.build(
+                    exact_index=exact_index, quantization=quantization, rescoring_factor=rescoring_factor
+                )
+                comparison = compare_with_exact(quantized_index=quantized_index, query_vectors=query_vectors, k=args.k)
+                lines.append("    {:<20} {:>10.1f} {:>6.0f}% {:>10.3f} {:>7.2f}x {:>12.4f} {:>12.4f}".format(
+                    quantization + (' + rescoring' if rescoring_factor else ''),
+                    comparison['quantized_bytes'] / 1e6,
+                    100.0 * (1 - float(comparison['quantized_bytes']) / comparison['float32_bytes']),
+                    comparison['quantized_latency'],
+                    comparison['float32_latency'] / max(comparison['quantized_latency'], 1e-9),
+                    comparison['most_related_overlap'], comparison['least_related_overlap']
+                ))
+        lines.insert(2, "    {:<20} {:>10.1f} {:>7} {:>10.3f}".format(
+            'float32', comparison['float32_bytes'] / 1e6, '', comparison['float32_latency']
+        ))
+        sys.stdout.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import threading
+import numpy
+from gamesage import GameSage
+
+
+class RefinementSession(object):
+    """A GameSage query being refined by relevance feedback, i.e., by games that the user wants more or less like.
+
+    The text's folded-in LSA vector gets kept, so that each refinement only has to update the
+    query vector and rank the games against it again, rather than preprocess and fold in the
+    text again. The query vector is a Rocchio update of the text's vector: its original vector,
+    plus a weight times the centroid of the games wanted more like, minus a (smaller) weight
+    times the centroid of the games wanted less like, with all the feedback given so far counted.
+    Games that have been given as feedback are left out of the results, and since each search
+    asks the index for that many more games, at most max_judged_games may be given in all.
+    """
+
+    def __init__(self, network, similarity_index, lsa_vector, original_weight=1.0, relevant_weight=0.75,
+                 nonrelevant_weight=0.15, max_judged_games=100):
+        """Initialize a RefinementSession object."""
+        self.network = network
+        self.similarity_index = similarity_index
+        self.original_vector = similarity_index.vectorize(lsa_vector)
+        self.query_vector = self.original_vector
+        self.original_weight = original_weight
+        self.relevant_weight = relevant_weight
+        self.nonrelevant_weight = nonrelevant_weight
+        self.max_judged_games = max_judged_games
+        # The database indices of the games that the user wants more like, and less like
+        self.relevant_indices = set()
+        self.nonrelevant_indices = set()
+        self.lock = threading.Lock()
+
+    def refine(self, more_like_game_ids=(), less_like_game_ids=()):
+        """Add feedback about games, and update the query vector accordingly.
+
+        A game given as feedback for the opposite of what it was given for before switches over.
+        Raises a ValueError if any of the games is unknown, or if the feedback would bring the
+        games given in all past the maximum (in which case none of it is added).
+        """
+        more_like_indices = GameSage.get_database_indices(
+            similarity_index=self.similarity_index, game_ids=more_like_game_ids
+        )
+        less_like_indices = GameSage.get_database_indices(
+            similarity_index=self.similarity_index, game_ids=less_like_game_ids
+        )
+        with self.lock:
+            relevant_indices = (self.relevant_indices - set(less_like_indices)) | set(more_like_indices)
+            nonrelevant_indices = (self.nonrelevant_indices - set(more_like_indices)) | set(less_like_indices)
+            if len(relevant_indices) + len(nonrelevant_indices) > self.max_judged_games:
+                raise ValueError("At most {} games may be given as feedback in a refinement session".format(
+                    self.max_judged_games
+                ))
+            self.relevant_indices, self.nonrelevant_indices = relevant_indices, nonrelevant_indices
+            query_vector = self.original_weight * self.original_vector
+            if self.relevant_indices:
+                query_vector = query_vector + self.relevant_weight * GameSage.compute_centroid(
+                    similarity_index=self.similarity_index, indices=self.relevant_indices
+                )
+            if self.nonrelevant_indices:
+                query_vector = query_vector - self.nonrelevant_weight * GameSage.compute_centroid(
+                    similarity_index=self.similarity_index, indices=self.nonrelevant_indices
+                )
+            self.query_vector = query_vector.astype(numpy.float32)
+
+    def get_related_games_strings(self, k=50):
+        """Return strings representing the k most and least related games to the refined query, for GameNet to parse."""
+        with self.lock:
+            query_vector = self.query_vector
+            excluded_indices = self.relevant_indices | self.nonrelevant_indices
+        return GameSage.get_related_games_strings_excluding(
+            network=self.network, similarity_index=self.similarity_index, lsa_vector=query_vector,
+            excluded_indices=excluded_indices, k=k
+        )
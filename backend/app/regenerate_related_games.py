@@ -0,0 +1,186 @@
+"""Regenerate the related- and unrelated-games columns of a GameNet network's metadata TSV file from its LSA vectors.
+
+Run this from the directory containing routes.py, e.g.:
+
+    python regenerate_related_games.py ontology --processes 8
+
+Every game's k most related and k least related other games are found by computing the cosine
+similarity between all pairs of games, in blocks: each worker process takes a block of rows
+(games) at a time, scores it against the whole matrix one cache-sized block of columns at a
+time, and after each block of columns, keeps only the k highest and k lowest scores of each
+row seen so far (via partial selection, i.e., argpartition), so that the full N x N matrix
+never gets held at once. The results then get written, in the same 'id&score,id&score,...'
+format that GameSage produces, into the last two columns of the metadata TSV file (via a
+temporary file, so that it's never read half-written), whose other columns are kept as they
+are. Since the file's hash changes, its snapshot gets rebuilt at the next startup.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+import numpy
+from loading import load_gamesage_ontology_database, load_gamesage_gameplay_database, build_similarity_index
+
+LOADERS = {'ontology': load_gamesage_ontology_database, 'gameplay': load_gamesage_gameplay_database}
+
+# The similarity matrix and search parameters, which are set in the parent process before the
+# pool gets created, so that the worker processes inherit them via fork
+regeneration_resources = {}
+
+
+def keep_extremes(scores, indices, k, highest):
+    """Keep the k highest (or lowest) scores of each row of a score matrix, along with their column indices.
+
+    The indices may be a matrix of the same shape as the scores, or a single row of indices
+    shared by every row. NaN scores (which mark the games' own scores) sort last either way.
+    """
+    if scores.shape[1] <= k:
+        return scores, indices if indices.ndim == 2 else numpy.tile(indices, (len(scores), 1))
+    selected = numpy.argpartition(-scores if highest else scores, k-1, axis=1)[:, :k]
+    rows = numpy.arange(len(scores))[:, numpy.newaxis]
+    return scores[rows, selected], indices[selected] if indices.ndim == 1 else indices[rows, selected]
+
+
+def find_extremes_of_rows(start_row, end_row):
+    """Find the k most and k least related other games to each game in a range of rows (runs in a worker process).
+
+    Returns the start row, and the (rows x k) matrices of the indices and scores of the most
+    related games and of the least related games, each row ordered most (or least) related
+    first, and padded with an index of -1 if there are no more than k games.
+    """
+    matrix = regeneration_resources['matrix']
+    k = regeneration_resources['k']
+    column_block_size = regeneration_resources['column_block_size']
+    block_matrix = numpy.asarray(matrix[start_row:end_row])
+    rows = numpy.arange(end_row - start_row)
+    top_scores = bottom_scores = numpy.zeros((len(rows), 0), dtype=numpy.float32)
+    top_indices = bottom_indices = numpy.zeros((len(rows), 0), dtype=numpy.int32)
+    for column_start in xrange(0, len(matrix), column_block_size):
+        scores = numpy.dot(block_matrix, numpy.asarray(matrix[column_start:column_start+column_block_size]).T)
+        column_indices = numpy.arange(column_start, column_start + scores.shape[1], dtype=numpy.int32)
+        # Leave each game out of its own lists
+        own_columns = start_row + rows - column_start
+        in_block = (own_columns >= 0) & (own_columns < scores.shape[1])
+        scores[rows[in_block], own_columns[in_block]] = numpy.nan
+        block_top_scores, block_top_indices = keep_extremes(scores=scores, indices=column_indices, k=k, highest=True)
+        top_scores, top_indices = keep_extremes(
+            scores=numpy.hstack([top_scores, block_top_scores]), indices=numpy.hstack([top_indices, block_top_indices]),
+            k=k, highest=True
+        )
+        block_bottom_scores, block_bottom_indices = keep_extremes(
+            scores=scores, indices=column_indices, k=k, highest=False
+        )
+        bottom_scores, bottom_indices = keep_extremes(
+            scores=numpy.hstack([bottom_scores, block_bottom_scores]),
+            indices=numpy.hstack([bottom_indices, block_bottom_indices]), k=k, highest=False
+        )
+    results = [start_row]
+    for scores, indices, highest in ((top_scores, top_indices, True), (bottom_scores, bottom_indices, False)):
+        # NaNs sort last, whichever way the scores are ordered
+        order = numpy.argsort(-scores if highest else scores, axis=1, kind='mergesort')
+        scores, indices = scores[rows[:, numpy.newaxis], order], indices[rows[:, numpy.newaxis], order]
+        indices[numpy.isnan(scores)] = -1
+        padding = k - scores.shape[1]
+        results += [
+            numpy.pad(indices, ((0, 0), (0, padding)), 'constant', constant_values=-1),
+            numpy.pad(scores, ((0, 0), (0, padding)), 'constant')
+        ]
+    return tuple(results)
+
+
+def find_extremes_of_rows_task(task):
+    """Unpack a (start row, end row) task for find_extremes_of_rows()."""
+    start_row, end_row = task
+    return find_extremes_of_rows(start_row=start_row, end_row=end_row)
+
+
+def build_related_games_str(game_ids, indices, scores):
+    """Build a game's un/related-games string, formatted 'id&score,id&score,...'."""
+    return ','.join(
+        '{}&{}'.format(game_ids[index], float(score)) for index, score in zip(indices, scores) if index >= 0
+    )
+
+
+def write_metadata(metadata_path, output_path, game_ids, top_indices, top_scores, bottom_indices, bottom_scores):
+    """Rewrite a metadata TSV file with regenerated un/related-games columns, returning the number of rows updated."""
+    row_of_game_id = dict((game_id, row) for row, game_id in enumerate(game_ids))
+    number_of_rows_updated = 0
+    number_of_rows_skipped = 0
+    temporary_path = '{}.{}.tmp'.format(output_path, os.getpid())
+    with open(metadata_path, 'r') as metadata_file, open(temporary_path, 'wb') as temporary_file:
+        reader = csv.reader(metadata_file, delimiter='\t')
+        writer = csv.writer(temporary_file, delimiter='\t', lineterminator='\n')
+        for metadata_row in reader:
+            row = row_of_game_id.get(metadata_row[0])
+            if row is None:
+                number_of_rows_skipped += 1
+            else:
+                metadata_row[-2] = build_related_games_str(
+                    game_ids=game_ids, indices=top_indices[row], scores=top_scores[row]
+                )
+                metadata_row[-1] = build_related_games_str(
+                    game_ids=game_ids, indices=bottom_indices[row], scores=bottom_scores[row]
+                )
+                number_of_rows_updated += 1
+            writer.writerow(metadata_row)
+    os.rename(temporary_path, output_path)
+    if number_of_rows_skipped:
+        warnings.warn("{} games have no LSA vectors, so their un/related games were left as they were".format(
+            number_of_rows_skipped
+        ))
+    return number_of_rows_updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate a network's un/related games from its LSA vectors.")
+    parser.add_argument('network', choices=sorted(LOADERS))
+    parser.add_argument('--output', help="where to write the metadata TSV file (default: over the original)")
+    parser.add_argument('--k', type=int, default=50, help="related and unrelated games per game")
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--row-block-size', type=int, default=256, help="games handed to a worker at a time")
+    parser.add_argument('--column-block-size', type=int, default=4096, help="games scored against at a time")
+    args = parser.parse_args()
+    metadata_path = 'static/games_metadata-{}.tsv'.format(args.network)
+    start_time = time.time()
+    database = LOADERS[args.network]()
+    game_ids = [game.id for game in database]
+    # Load the (mmapped) matrix once, before forking, so that all the workers share it
+    regeneration_resources['matrix'] = build_similarity_index(database=database, network=args.network).matrix
+    regeneration_resources['k'] = args.k
+    regeneration_resources['column_block_size'] = args.column_block_size
+    number_of_games = len(game_ids)
+    top_indices, bottom_indices = (numpy.full((number_of_games, args.k), -1, dtype=numpy.int32) for _ in xrange(2))
+    top_scores, bottom_scores = (numpy.zeros((number_of_games, args.k), dtype=numpy.float32) for _ in xrange(2))
+    tasks = [
+        (start_row, min(start_row + args.row_block_size, number_of_games))
+        for start_row in xrange(0, number_of_games, args.row_block_size)
+    ]
+    pool = multiprocessing.Pool(processes=args.processes)
+    try:
+        for (start_row, block_top_indices, block_top_scores, block_bottom_indices,
+             block_bottom_scores) in pool.imap_unordered(find_extremes_of_rows_task, tasks):
+            end_row = start_row + len(block_top_indices)
+            top_indices[start_row:end_row], top_scores[start_row:end_row] = block_top_indices, block_top_scores
+            bottom_indices[start_row:end_row] = block_bottom_indices
+            bottom_scores[start_row:end_row] = block_bottom_scores
+    finally:
+        pool.close()
+        pool.join()
+    search_time = time.time() - start_time
+    number_of_rows_updated = write_metadata(
+        metadata_path=metadata_path, output_path=args.output or metadata_path, game_ids=game_ids,
+        top_indices=top_indices, top_scores=top_scores, bottom_indices=bottom_indices, bottom_scores=bottom_scores
+    )
+    sys.stdout.write(
+        "Found the {} most and least related games to each of {} games in {:.1f} s, and updated {} rows of {}\n".format(
+            args.k, number_of_games, search_time, number_of_rows_updated, args.output or metadata_path
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,139 @@
-import csv
+import atexit
+import hashlib
 import os
-import gensim
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request, redirect, g, send_from_directory
+from flask import (
+    Flask, render_template, jsonify, request, redirect, g, send_from_directory, abort, make_response
+)
 from flask.ext.sqlalchemy import SQLAlchemy
 from flask.ext.login import LoginManager, login_user, logout_user, current_user, login_required
 from flask_wtf import Form
 from wtforms import StringField
 from wtforms.validators import DataRequired
 from gamesage import GameSage
-from game import GameNetGame, GameSageGame, GameIdea
+from tagging import TaggerTimeoutError
+from refinement import RefinementSession
+from game import GameIdea
+from caching import GameSageResultCache, RenderedPageCache, RefinementSessionStore
+from analytics import AnalyticsEventQueue, enable_write_ahead_logging
+from assets import install_static_asset_manifest
+from popularity import PopularityTracker
+from loading import (
+    load_gamenet_ontology_store, load_gamesage_ontology_database, load_ontology_term_id_dictionary,
+    load_ontology_tf_idf_model, load_ontology_lsa_model, load_gamenet_gameplay_store,
+    load_gamesage_gameplay_database, load_gameplay_term_id_dictionary, load_gameplay_tf_idf_model,
+    load_gameplay_lsa_model, build_fold_in, build_similarity_index, build_text_preprocessor, build_title_autocompleter,
+    build_fuzzy_title_matcher
+)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 app = Flask(__name__, static_folder='static')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'gamenet.db')
+# Where GameSage's lemma caches get saved on shutdown and warmed up from on startup (set
+# this to None to always start with cold caches)
+app.config['GAMESAGE_LEMMA_CACHE_DIRECTORY'] = basedir
+# How many HunPos tagger subprocesses each worker process may keep running, and how many seconds
+# a request may spend waiting for and using one. The pool is sized per worker process rather than
+# for the whole server, since preforked workers can't share taggers' pipes, so this should match
+# the number of threads that each worker serves requests with (the server as a whole then runs
+# up to this many taggers per worker)
+app.config['GAMESAGE_TAGGER_POOL_SIZE'] = 4
+app.config['GAMESAGE_TAGGER_TIMEOUT'] = 10.0
+# The most texts that may be submitted to GameSage in a single batch, and how many threads
+# preprocess a batch's texts
+app.config['GAMESAGE_MAX_BATCH_SIZE'] = 1000
+app.config['GAMESAGE_BATCH_THREADS'] = 4
+# The most related (and unrelated) games that a GameSage query given as JSON may ask for (a
+# larger 'k' gets clamped to this)
+app.config['GAMESAGE_MAX_RESULTS'] = 200
+# Whether each network's GameSage searches a quantized copy of its similarity matrix ('int8', which
+# takes a quarter of the memory, or 'float16', which takes half, though searches it more slowly),
+# or None to search the float32 matrix, and how many times k of the most promising games (as
+# quantized) get rescored exactly (None to rescore none); quantization.py compares their results
+app.config['GAMESAGE_QUANTIZATION'] = {'ontology': None, 'gameplay': None}
+app.config['GAMESAGE_QUANTIZED_RESCORING_FACTOR'] = 4
+# How many clusters of games each network's GameSage searches per text, with an approximate
+# similarity index (which must be built offline, with ann_report.py), or None for exact search;
+# approximate search should only be enabled for a network once ann_report.py shows its recall
+# to be on target
+app.config['GAMESAGE_APPROXIMATE_SEARCH_PROBES'] = {'ontology': None, 'gameplay': None}
+# The most seed games (positive and negative together) that a "more like these games" query may
+# give, and the default weight of its negative seed games against its positive ones; this also
+# limits the games that a refinement session may be given as feedback, per refinement and in all
+app.config['GAMESAGE_MAX_SEED_GAMES'] = 100
+app.config['GAMESAGE_NEGATIVE_SEED_WEIGHT'] = 0.5
+# How many refinement sessions each network's GameSage keeps (per worker process), and how many
+# seconds one may go unused before it expires
+app.config['GAMESAGE_REFINEMENT_SESSION_STORE_SIZE'] = 10000
+app.config['GAMESAGE_REFINEMENT_SESSION_TIME_TO_LIVE'] = 3600
+# The Rocchio weights of a refined query's original text, of the games wanted more like, and of
+# the games wanted less like
+app.config['GAMESAGE_ROCCHIO_WEIGHTS'] = (1.0, 0.75, 0.15)
+# How many distinct (preprocessed) texts' results each network's GameSage result cache holds
+app.config['GAMESAGE_RESULT_CACHE_SIZE'] = 10000
+# The most titles that GameNet's autocomplete endpoint returns for a query
+app.config['GAMENET_AUTOCOMPLETE_MAX_RESULTS'] = 50
+# How many seconds GameNet may spend reranking the candidate matches of a title that doesn't match
+# any game exactly, and the most matches that it then suggests
+app.config['GAMENET_FUZZY_MATCH_TIME_BUDGET'] = 0.02
+app.config['GAMENET_DID_YOU_MEAN_MAX_RESULTS'] = 5
+# How many analytics events (e.g., icon clicks), or batches of them, may be queued to be saved to
+# the database in the background, about how many get saved per transaction, and how many seconds a request may wait for
+# space in a full queue before its event gets dropped
+app.config['ANALYTICS_QUEUE_SIZE'] = 10000
+app.config['ANALYTICS_BATCH_SIZE'] = 500
+app.config['ANALYTICS_ENQUEUE_TIMEOUT'] = 0.0
+# The most events (e.g., clicks) that a page may send to GameNet in a single batch
+app.config['GAMENET_MAX_EVENT_BATCH_SIZE'] = 100
+# How many seconds it takes for the weight of a view of a game's page in the game's popularity
+# score to halve, and how often each worker process adds its views to the shared rollup table
+app.config['GAMENET_POPULARITY_HALF_LIFE'] = 3 * 24 * 60 * 60
+app.config['GAMENET_POPULARITY_CHECKPOINT_INTERVAL'] = 60
+# The most games that GameNet's trending endpoint returns
+app.config['GAMENET_TRENDING_MAX_RESULTS'] = 100
+# How many rendered GameNet game pages each worker process keeps
+app.config['GAMENET_PAGE_CACHE_SIZE'] = 1000
 # These get set below
-app.gamenet_ontology_database = None
+app.gamenet_ontology_store = None
+app.gamenet_ontology_title_autocompleter = None
+app.gamenet_ontology_fuzzy_title_matcher = None
+app.gamenet_ontology_popularity_tracker = None
 app.gamesage_ontology_database = None
 app.ontology_term_id_dictionary = None
 app.ontology_tf_idf_model = None
 app.ontology_lsa_model = None
-app.gamenet_gameplay_database = None
+app.ontology_fold_in = None
+app.ontology_similarity_index = None
+app.ontology_text_preprocessor = None
+app.ontology_result_cache = None
+app.ontology_refinement_session_store = None
+app.gamenet_gameplay_store = None
+app.gamenet_gameplay_title_autocompleter = None
+app.gamenet_gameplay_fuzzy_title_matcher = None
+app.gamenet_gameplay_popularity_tracker = None
 app.gamesage_gameplay_database = None
 app.gameplay_term_id_dictionary = None
 app.gameplay_tf_idf_model = None
 app.gameplay_lsa_model = None
+app.gameplay_fold_in = None
+app.gameplay_similarity_index = None
+app.gameplay_text_preprocessor = None
+app.gameplay_result_cache = None
+app.gameplay_refinement_session_store = None
 
 db = SQLAlchemy(app)
+with app.app_context():
+    enable_write_ahead_logging(engine=db.engine)
+app.analytics_queue = AnalyticsEventQueue(
+    app=app, db=db, max_size=app.config['ANALYTICS_QUEUE_SIZE'], batch_size=app.config['ANALYTICS_BATCH_SIZE'],
+    enqueue_timeout=app.config['ANALYTICS_ENQUEUE_TIMEOUT']
+)
+# Save any events still queued on shutdown
+atexit.register(app.analytics_queue.close)
+app.gamenet_page_cache = RenderedPageCache(max_size=app.config['GAMENET_PAGE_CACHE_SIZE'])
+# Static assets linked via url_for() get fingerprinted URLs, which are served precompressed and cached forever
+app.static_asset_manifest = install_static_asset_manifest(app=app)
 lm = LoginManager()
 lm.init_app(app)
 
@@ -67,6 +173,15 @@ def logout():
 @app.before_request
 def before_request():
     g.user = current_user
+    # Each (forked) worker needs its own analytics flusher, which runs the popularity checkpoints
+    # that refresh its trending games and autocompletion ordering, even if it records no events
+    app.analytics_queue.start()
+
+
+@app.errorhandler(TaggerTimeoutError)
+def gamesage_busy(error):
+    """Tell the client that GameSage is too busy to preprocess its text (all its taggers are in use), for now."""
+    return jsonify(error="GameSage is busy right now; please try again in a moment"), 503, {'Retry-After': '5'}
 
 
 class LoginForm(Form):
@@ -175,22 +290,46 @@ class GameSageQuery(db.Model):
                                                                      self.game_sage_query, self.network)
 
 
+class GamePopularity(db.Model):
+    # This rolls up the views of a game's page in an hour (counted in hours since the Unix epoch)
+    __table_args__ = (db.UniqueConstraint('network', 'game_id', 'hour'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    network = db.Column(db.String)
+    game_id = db.Column(db.Integer)
+    hour = db.Column(db.Integer)
+    views = db.Column(db.Integer)
+
+    def __repr__(self):
+        return "<GamePopularity {} | {} | {} | {} | {} >".format(self.id, self.network, self.game_id, self.hour,
+                                                                 self.views)
+
+
+def build_popularity_tracker(network, store):
+    """Build the tracker of a network's game popularity scores, which counts views as they get recorded."""
+    popularity_tracker = PopularityTracker(
+        app=app, db=db, rollup_model=GamePopularity, network=network, store=store,
+        counted_event_types=(GameNetGameRequest, GameNetQuery), half_life=app.config['GAMENET_POPULARITY_HALF_LIFE']
+    )
+    popularity_tracker.load()
+    app.analytics_queue.add_listener(popularity_tracker.observe)
+    app.analytics_queue.add_periodic_task(
+        popularity_tracker.checkpoint, interval=app.config['GAMENET_POPULARITY_CHECKPOINT_INTERVAL']
+    )
+    return popularity_tracker
+
+
 @app.route('/gamenet/icon_click', methods=['POST'])
 def icon_click():
     if current_user.is_authenticated():
-        ic = IconClick(user=current_user, ip=request.remote_addr, timestamp=datetime.now(),
+        ic = IconClick(user_id=current_user.id, ip=request.remote_addr, timestamp=datetime.now(),
                        icon_type=request.form['icon_type'], game_id=request.form['game_id'],
                        network=request.form['network'])
     else:
-        ic = IconClick(user=None, ip=request.remote_addr, timestamp=datetime.now(), icon_type=request.form['icon_type'],
-                       game_id=request.form['game_id'], network=request.form['network'])
-    db.session.add(ic)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(ic)
-    except NameError:
-        pass
+        ic = IconClick(user_id=None, ip=request.remote_addr, timestamp=datetime.now(),
+                       icon_type=request.form['icon_type'], game_id=request.form['game_id'],
+                       network=request.form['network'])
+    app.analytics_queue.record(ic)
 
     return "OK"
 
@@ -198,30 +337,96 @@ def icon_click():
 @app.route('/gamenet/gamenet_link_click', methods=['POST'])
 def game_link_click():
     if current_user.is_authenticated():
-        gl = GameNetLinkClick(user=current_user,
+        gl = GameNetLinkClick(user_id=current_user.id,
                               ip=request.remote_addr,
                               timestamp=datetime.now(),
                               game_source_id=request.form['game_source_id'],
                               game_dest_id=request.form['game_dest_id'],
                               network=request.form['network'])
     else:
-        gl = GameNetLinkClick(user=None,
+        gl = GameNetLinkClick(user_id=None,
                               ip=request.remote_addr,
                               timestamp=datetime.now(),
                               game_source_id=request.form['game_source_id'],
                               game_dest_id=request.form['game_dest_id'],
                               network=request.form['network'])
 
-    db.session.add(gl)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(gl)
-    except NameError:
-        pass
+    app.analytics_queue.record(gl)
     return "OK"
 
 
+def build_page_event(page_event, user_id, ip, timestamp):
+    """Build the model object for an event sent by a page (e.g., an IconClick), or raise ValueError if it's invalid."""
+    if not isinstance(page_event, dict):
+        raise ValueError("each event must be an object")
+    network = page_event.get('network')
+    if network not in ('ontology', 'gameplay'):
+        raise ValueError("unknown network: {!r}".format(network))
+    store = getattr(app, 'gamenet_{}_store'.format(network))
+    event_type = page_event.get('type')
+    if event_type in ('icon_click', 'game_view'):
+        game_ids = [page_event.get('game_id')]
+    elif event_type == 'game_link_click':
+        game_ids = [page_event.get('game_source_id'), page_event.get('game_dest_id')]
+    else:
+        raise ValueError("unknown event type: {!r}".format(event_type))
+    for game_id in game_ids:
+        try:
+            if int(game_id) in store:
+                continue
+        except (TypeError, ValueError):
+            pass
+        raise ValueError("unknown game ID: {!r}".format(game_id))
+    if event_type == 'game_view':
+        return GameNetGameRequest(
+            user_id=user_id, ip=ip, timestamp=timestamp, game_id=int(game_ids[0]), network=network
+        )
+    if event_type == 'icon_click':
+        icon_type = page_event.get('icon_type')
+        if icon_type not in (IconClick.WIKI, IconClick.YOUTUBE, IconClick.GOOGLE):
+            raise ValueError("unknown icon type: {!r}".format(icon_type))
+        return IconClick(
+            user_id=user_id, ip=ip, timestamp=timestamp, icon_type=icon_type, game_id=int(game_ids[0]),
+            network=network
+        )
+    return GameNetLinkClick(
+        user_id=user_id, ip=ip, timestamp=timestamp, game_source_id=int(game_ids[0]),
+        game_dest_id=int(game_ids[1]), network=network
+    )
+
+
+@app.route('/gamenet/events', methods=['POST'])
+def record_page_events():
+    """Record a batch of events (e.g., icon clicks) that a page buffered, all or none of them.
+
+    The request body is a JSON object whose 'events' array holds the events, each of which is an
+    object with a 'type' of 'icon_click' (with 'game_id', 'icon_type', and 'network'),
+    'game_link_click' (with 'game_source_id', 'game_dest_id', and 'network'), or 'game_view' (with
+    'game_id' and 'network', which pre-rendered game pages send). Since pages send these with
+    navigator.sendBeacon(), the body's content type isn't relied on.
+    """
+    request_json = request.get_json(force=True, silent=True)
+    if not isinstance(request_json, dict) or not isinstance(request_json.get('events'), list):
+        return jsonify(error="The request body must be a JSON object with an 'events' array"), 400
+    page_events = request_json['events']
+    if len(page_events) > app.config['GAMENET_MAX_EVENT_BATCH_SIZE']:
+        return jsonify(
+            error="At most {} events may be sent at once".format(app.config['GAMENET_MAX_EVENT_BATCH_SIZE'])
+        ), 400
+    user_id = current_user.id if current_user.is_authenticated() else None
+    timestamp = datetime.now()
+    analytics_events = []
+    for i, page_event in enumerate(page_events):
+        try:
+            analytics_events.append(
+                build_page_event(page_event=page_event, user_id=user_id, ip=request.remote_addr, timestamp=timestamp)
+            )
+        except ValueError as error:
+            return jsonify(error="Event {}: {}".format(i, error)), 400
+    app.analytics_queue.record_all(analytics_events=analytics_events)
+    return jsonify(recorded=len(analytics_events))
+
+
 @app.route('/')
 def gamecip_project_home():
     if current_user.is_authenticated():
@@ -259,6 +464,79 @@ def gamenet_faq():
     return render_template('gamenet_faq.html')
 
 
+@app.route('/gamenet/<network>/autocomplete')
+def autocomplete_gamenet_title(network):
+    """Return the titles and IDs of the games whose titles, or any words in them, begin with a query."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    query = request.args.get('q', u'')
+    try:
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        return jsonify(error="'k' must be an integer"), 400
+    k = max(0, min(k, app.config['GAMENET_AUTOCOMPLETE_MAX_RESULTS']))
+    title_autocompleter = getattr(app, 'gamenet_{}_title_autocompleter'.format(network))
+    popularity_scores = getattr(app, 'gamenet_{}_popularity_tracker'.format(network)).get_scores()
+    # These are formatted as jQuery UI's autocomplete widget expects its items to be
+    return jsonify(results=[
+        {'label': title, 'id': game_id}
+        for title, game_id in title_autocompleter.complete(query=query, k=k, popularity_scores=popularity_scores)
+    ])
+
+
+@app.route('/gamenet/<network>/trending')
+def trending_gamenet_games(network):
+    """Return the games whose pages have been viewed the most lately, with their time-decayed view counts."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    try:
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        return jsonify(error="'k' must be an integer"), 400
+    k = max(0, min(k, app.config['GAMENET_TRENDING_MAX_RESULTS']))
+    popularity_tracker = getattr(app, 'gamenet_{}_popularity_tracker'.format(network))
+    return jsonify(games=[
+        {'id': game.id, 'title': game.title, 'year': game.year, 'score': score}
+        for game, score in popularity_tracker.get_trending(k=k)
+    ])
+
+
+def render_gamenet_entry(network, game):
+    """Render a game's GameNet entry, from the rendered-page cache if possible, as a conditional response.
+
+    A game's page only changes when its network's data gets rebuilt (or for whoever is logged in),
+    so it gets rendered once per store version and user. Its ETag is a hash of its body, and
+    browsers and proxies may keep it but must revalidate it on every view, which lets the view
+    still be logged and usually costs a 304 response with no body.
+    """
+    store = getattr(app, 'gamenet_{}_store'.format(network))
+    user_id = current_user.id if current_user.is_authenticated() else None
+    key = (network, game.id, store.version, user_id)
+    page = app.gamenet_page_cache.get(key)
+    if page is None:
+        body = render_template('game.html', network=network, game=game).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+        app.gamenet_page_cache.set(key, body=body, etag=etag)
+    else:
+        body, etag = page
+    response = make_response(body)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    if user_id is None:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    # Pages differ by who's logged in, which the session cookie tells
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+@app.route('/gamenet/pageCacheStats')
+def gamenet_page_cache_stats():
+    """Report the hit, miss, and eviction counts for the cache of rendered GameNet game pages."""
+    return jsonify(**app.gamenet_page_cache.stats())
+
+
 @app.route('/gamenet/ontology')
 def gamenet_home_ontology():
     """Render the home page of the ontology network."""
@@ -267,73 +545,64 @@ def gamenet_home_ontology():
 
 @app.route('/gamenet/ontology/findByTitle=<selected_game_title>')
 def render_gamenet_entry_given_game_title_ontology(selected_game_title):
-    if any(game for game in app.gamenet_ontology_database if game.title.lower() == selected_game_title.lower()):
-        selected_game = next(
-            game for game in app.gamenet_ontology_database if game.title.lower() == selected_game_title.lower()
+    selected_game = app.gamenet_ontology_store.find_by_title(selected_game_title)
+    did_you_mean_games = []
+    if not selected_game:
+        # Resolve a misspelled title, if it's unambiguous, or else find the games that the user might have meant
+        selected_game, did_you_mean_games = app.gamenet_ontology_fuzzy_title_matcher.resolve(
+            query=selected_game_title, k=app.config['GAMENET_DID_YOU_MEAN_MAX_RESULTS'],
+            time_budget=app.config['GAMENET_FUZZY_MATCH_TIME_BUDGET']
         )
+    if selected_game:
         if current_user.is_authenticated():
             gamenet_query = GameNetQuery(
-                user=current_user, ip=request.remote_addr, game_query=selected_game_title,
+                user_id=current_user.id, ip=request.remote_addr, game_query=selected_game_title,
                 game_id=selected_game.id, timestamp=datetime.now(), network='ontology'
             )
         else:
             gamenet_query = GameNetQuery(
-                user=None, ip=request.remote_addr, game_query=selected_game_title,
+                user_id=None, ip=request.remote_addr, game_query=selected_game_title,
                 game_id=selected_game.id, timestamp=datetime.now(), network='ontology'
             )
-        db.session.add(gamenet_query)
-        db.session.commit()
-        try:
-            if logger:
-                logger.debug(gamenet_query)
-        except NameError:
-            pass
-        return render_template('game.html', network='ontology', game=selected_game)
+        app.analytics_queue.record(gamenet_query)
+        return render_gamenet_entry(network='ontology', game=selected_game)
     else:
         # The game title/arbitrary query that the user typed in does not match
         # any game in our database, so keep displaying the home page, but express this
         if current_user.is_authenticated():
             gamenet_query = GameNetQuery(
-                user=current_user, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
-                network='ontology'
+                user_id=current_user.id, ip=request.remote_addr, game_query=selected_game_title,
+                timestamp=datetime.now(), network='ontology'
             )
         else:
             gamenet_query = GameNetQuery(
-                user=None, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
+                user_id=None, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
                 network='ontology'
             )
-        db.session.add(gamenet_query)
-        db.session.commit()
-        try:
-            if logger:
-                logger.debug(gamenet_query)
-        except NameError:
-            pass
-        return render_template('gamenet_index-ontology.html', entered_unknown_game=True)
+        app.analytics_queue.record(gamenet_query)
+        return render_template(
+            'gamenet_index-ontology.html', entered_unknown_game=True, did_you_mean_games=did_you_mean_games
+        )
 
 
 @app.route('/gamenet/ontology/games/<selected_game_id>')
 def render_gamenet_entry_given_game_id_ontology(selected_game_id):
     """Render the GameNet entry for a user-selected game."""
-    selected_game = app.gamenet_ontology_database[int(selected_game_id)]
+    selected_game = app.gamenet_ontology_store.get(selected_game_id)
+    if selected_game is None:
+        abort(404)
     if current_user.is_authenticated():
         gamenet_game_request = GameNetGameRequest(
-            user=current_user, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
+            user_id=current_user.id, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
             network='ontology'
         )
     else:
         gamenet_game_request = GameNetGameRequest(
-            user=None, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
+            user_id=None, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
             network='ontology'
         )
-    db.session.add(gamenet_game_request)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(gamenet_game_request)
-    except NameError:
-        pass
-    return render_template('game.html', network='ontology', game=selected_game)
+    app.analytics_queue.record(gamenet_game_request)
+    return render_gamenet_entry(network='ontology', game=selected_game)
 
 
 @app.route('/gamenet/gameplay')
@@ -344,78 +613,66 @@ def gamenet_home_gameplay():
 
 @app.route('/gamenet/gameplay/findByTitle=<selected_game_title>')
 def render_gamenet_entry_given_game_title_gameplay(selected_game_title):
-    if any(game for game in app.gamenet_gameplay_database if game and
-            # Have to watch out for all the None filler entries in gameplay database
-            game.title.lower() == selected_game_title.lower()):
-        selected_game = next(
-            game for game in app.gamenet_gameplay_database if game and
-            game.title.lower() == selected_game_title.lower()
+    selected_game = app.gamenet_gameplay_store.find_by_title(selected_game_title)
+    did_you_mean_games = []
+    if not selected_game:
+        # Resolve a misspelled title, if it's unambiguous, or else find the games that the user might have meant
+        selected_game, did_you_mean_games = app.gamenet_gameplay_fuzzy_title_matcher.resolve(
+            query=selected_game_title, k=app.config['GAMENET_DID_YOU_MEAN_MAX_RESULTS'],
+            time_budget=app.config['GAMENET_FUZZY_MATCH_TIME_BUDGET']
         )
+    if selected_game:
         if current_user.is_authenticated():
             gamenet_query = GameNetQuery(
-                user=current_user, ip=request.remote_addr, game_query=selected_game_title,
+                user_id=current_user.id, ip=request.remote_addr, game_query=selected_game_title,
                 game_id=selected_game.id, timestamp=datetime.now(), network='gameplay'
             )
         else:
             gamenet_query = GameNetQuery(
-                user=None, ip=request.remote_addr, game_query=selected_game_title,
+                user_id=None, ip=request.remote_addr, game_query=selected_game_title,
                 game_id=selected_game.id, timestamp=datetime.now(), network='gameplay'
             )
-        db.session.add(gamenet_query)
-        db.session.commit()
-        try:
-            if logger:
-                logger.debug(gamenet_query)
-        except NameError:
-            pass
-        return render_template('game.html', network='gameplay', game=selected_game)
+        app.analytics_queue.record(gamenet_query)
+        return render_gamenet_entry(network='gameplay', game=selected_game)
     else:
         # The game title/arbitrary query that the user typed in does not match
         # any game in our database, so keep displaying the home page, but express this
         if current_user.is_authenticated():
             gamenet_query = GameNetQuery(
-                user=current_user, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
-                network='gameplay'
+                user_id=current_user.id, ip=request.remote_addr, game_query=selected_game_title,
+                timestamp=datetime.now(), network='gameplay'
             )
         else:
             gamenet_query = GameNetQuery(
-                user=None, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
+                user_id=None, ip=request.remote_addr, game_query=selected_game_title, timestamp=datetime.now(),
                 network='gameplay'
             )
-        db.session.add(gamenet_query)
-        db.session.commit()
-        try:
-            if logger:
-                logger.debug(gamenet_query)
-        except NameError:
-            pass
-        return render_template('gamenet_index-gameplay.html', entered_unknown_game=True)
+        app.analytics_queue.record(gamenet_query)
+        return render_template(
+            'gamenet_index-gameplay.html', entered_unknown_game=True, did_you_mean_games=did_you_mean_games
+        )
 
 
 @app.route('/gamenet/gameplay/games/<selected_game_id>')
 def render_gamenet_entry_given_game_id_gameplay(selected_game_id):
     """Render the GameNet entry for a user-selected game."""
-    # Because we have gaps in the IDs held by all games (unlike in the ontology network,
-    # which has all IDs in the range 0-11828), we have to find the selected game differently
-    selected_game = app.gamenet_gameplay_database[int(selected_game_id)]
+    # We have gaps in the IDs held by all games (unlike in the ontology network, which has all
+    # IDs in the range 0-11828), but the store maps IDs to games either way
+    selected_game = app.gamenet_gameplay_store.get(selected_game_id)
+    if selected_game is None:
+        abort(404)
     if current_user.is_authenticated():
         gamenet_game_request = GameNetGameRequest(
-            user=current_user, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
+            user_id=current_user.id, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
             network='gameplay'
         )
     else:
         gamenet_game_request = GameNetGameRequest(
-            user=None, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
+            user_id=None, ip=request.remote_addr, game_id=selected_game_id, timestamp=datetime.now(),
             network='gameplay'
         )
-    db.session.add(gamenet_game_request)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(gamenet_game_request)
-    except NameError:
-        pass
-    return render_template('game.html', network='gameplay', game=selected_game)
+    app.analytics_queue.record(gamenet_game_request)
+    return render_gamenet_entry(network='gameplay', game=selected_game)
 
 
 @app.route('/gamenet/ontology/game_idea', methods=['POST'])
@@ -426,28 +683,26 @@ def generate_gamenet_ontology_entry_for_game_idea_from_gamesage():
     unrelated_games_str = request.form['least_related_games_str']
     if current_user.is_authenticated():
         gsq = GameSageQuery(
-            user=current_user, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
+            user_id=current_user.id, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
             network='ontology'
         )
     else:
         gsq = GameSageQuery(
-            user=None, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
+            user_id=None, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
             network='ontology'
         )
-    db.session.add(gsq)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(gsq)
-    except NameError:
-        pass
+    app.analytics_queue.record(gsq)
     game_idea = GameIdea(
         idea_text=idea_text, related_games_str=related_games_str, unrelated_games_str=unrelated_games_str
     )
-    # Set the title and year of each entry in the game idea's un/related games listings
+    # Set the title and year of each entry in the game idea's un/related games listings (which
+    # come from the client, so any unknown game in them is a bad request)
     for entry in game_idea.related_games+game_idea.unrelated_games:
-        title = app.gamenet_ontology_database[int(entry.game_id)].title
-        year = app.gamenet_ontology_database[int(entry.game_id)].year
+        try:
+            title = app.gamenet_ontology_store.get_field(entry.game_id, 'title')
+            year = app.gamenet_ontology_store.get_field(entry.game_id, 'year')
+        except KeyError:
+            abort(400)
         entry.set_game_title_and_year(title=title, year=year)
     return render_template('game_idea.html', network='ontology', game_idea=game_idea)
 
@@ -459,28 +714,26 @@ def generate_gamenet_gameplay_entry_for_game_idea_from_gamesage():
     unrelated_games_str = request.form['least_related_games_str']
     if current_user.is_authenticated():
         gsq = GameSageQuery(
-            user=current_user, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
+            user_id=current_user.id, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
             network='gameplay'
         )
     else:
         gsq = GameSageQuery(
-            user=None, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
+            user_id=None, game_sage_query=idea_text, ip=request.remote_addr, timestamp=datetime.now(),
             network='gameplay'
         )
-    db.session.add(gsq)
-    db.session.commit()
-    try:
-        if logger:
-            logger.debug(gsq)
-    except NameError:
-        pass
+    app.analytics_queue.record(gsq)
     game_idea = GameIdea(
         idea_text=idea_text, related_games_str=related_games_str, unrelated_games_str=unrelated_games_str
     )
-    # Set the title and year of each entry in the game idea's un/related games listings
+    # Set the title and year of each entry in the game idea's un/related games listings (which
+    # come from the client, so any unknown game in them is a bad request)
     for entry in game_idea.related_games+game_idea.unrelated_games:
-        title = app.gamenet_gameplay_database[int(entry.game_id)].title
-        year = app.gamenet_gameplay_database[int(entry.game_id)].year
+        try:
+            title = app.gamenet_gameplay_store.get_field(entry.game_id, 'title')
+            year = app.gamenet_gameplay_store.get_field(entry.game_id, 'year')
+        except KeyError:
+            abort(400)
         entry.set_game_title_and_year(title=title, year=year)
     return render_template('game_idea.html', network='gameplay', game_idea=game_idea)
 
@@ -543,10 +796,9 @@ def generate_gamenet_ontology_query_for_game_idea():
     """Generate a query for GameNet."""
     user_submitted_text = request.form['user_submitted_text']
     gamesage = GameSage(
-        network='ontology', database=app.gamesage_ontology_database,
-        term_id_dictionary=app.ontology_term_id_dictionary,
-        tf_idf_model=app.ontology_tf_idf_model, lsa_model=app.ontology_lsa_model,
-        user_submitted_text=user_submitted_text
+        network='ontology', fold_in=app.ontology_fold_in,
+        similarity_index=app.ontology_similarity_index, text_preprocessor=app.ontology_text_preprocessor,
+        user_submitted_text=user_submitted_text, result_cache=app.ontology_result_cache
     )
     return jsonify(
         user_submitted_text=user_submitted_text,
@@ -560,10 +812,9 @@ def generate_gamenet_gameplay_query_for_game_idea():
     """Generate a query for GameNet."""
     user_submitted_text = request.form['user_submitted_text']
     gamesage = GameSage(
-        network='gameplay', database=app.gamesage_gameplay_database,
-        term_id_dictionary=app.gameplay_term_id_dictionary,
-        tf_idf_model=app.gameplay_tf_idf_model, lsa_model=app.gameplay_lsa_model,
-        user_submitted_text=user_submitted_text
+        network='gameplay', fold_in=app.gameplay_fold_in,
+        similarity_index=app.gameplay_similarity_index, text_preprocessor=app.gameplay_text_preprocessor,
+        user_submitted_text=user_submitted_text, result_cache=app.gameplay_result_cache
     )
     return jsonify(
         user_submitted_text=user_submitted_text,
@@ -572,153 +823,323 @@ def generate_gamenet_gameplay_query_for_game_idea():
     )
 
 
-def load_gamenet_ontology_database():
-    """Load the database of GameNet game representations from a TSV file."""
-    database = []
-    with open('static/games_metadata-ontology.tsv', 'r') as tsvfile:
-        reader = csv.reader(tsvfile, delimiter='\t')
-        for row in reader:
-            game_id, title, year, platform, wiki_url, wiki_summary, related_games_str, unrelated_games_str = row
-            game_object = (
-                GameNetGame(
-                    game_id, title, year, platform, wiki_url,
-                    wiki_summary, related_games_str, unrelated_games_str
-                )
-            )
-            database.append(game_object)
-    # Now that all the games have been read in, allow each game's un/related-games entries to be
-    # attributed game titles and years via lookup into the database that is now fully populated
-    for game in database:
-        for entry in game.related_games+game.unrelated_games:
-            title = database[int(entry.game_id)].title
-            year = database[int(entry.game_id)].year
-            entry.set_game_title_and_year(title=title, year=year)
-    return database
-
-
-def load_gamesage_ontology_database():
-    """Load the database of GameSage game representations from a TSV file."""
-    database = []
-    with open('static/game_lsa_vectors-ontology.tsv', 'r') as tsv_file:
-        reader = csv.reader(tsv_file, delimiter='\t')
-        for row in reader:
-            game_id, title, year, lsa_vector_str = row
-            game_object = GameSageGame(game_id, title, lsa_vector_str)
-            database.append(game_object)
-    return database
-
-
-def load_ontology_term_id_dictionary():
-    """Load the term-ID dictionary for our corpus."""
-    term_id_dictionary = gensim.corpora.Dictionary.load('./static/ontology-id2term.dict')
-    return term_id_dictionary
-
-
-def load_ontology_tf_idf_model():
-    """Load our tf-idf model."""
-    tf_idf_model = (
-        gensim.models.TfidfModel.load('./static/ontology-tfidf_model')
-    )
-    return tf_idf_model
-
-
-def load_ontology_lsa_model():
-    """Load our LSA model."""
-    lsa_model = gensim.models.LsiModel.load('./static/ontology-model_207.lsi')
-    return lsa_model
-
-
-def load_gamenet_gameplay_database():
-    """Load the database of GameNet game representations from a TSV file."""
-    database = []
-    with open('static/games_metadata-gameplay.tsv', 'r') as tsvfile:
-        reader = csv.reader(tsvfile, delimiter='\t')
-        for row in reader:
-            game_id, title, year, platform, wiki_url, wiki_summary, related_games_str, unrelated_games_str = row
-            game_object = (
-                GameNetGame(
-                    game_id, title, year, platform, wiki_url,
-                    wiki_summary, related_games_str, unrelated_games_str
-                )
-            )
-            # Append a bunch of None entries so that games are indexed by their
-            # IDs, which allows fast accessing
-            while len(database) < int(game_id):
-                database.append(None)
-            # Now can append the game_object at the index matching its game_id
-            database.append(game_object)
-    # Now that all the games have been read in, allow each game's un/related-games entries to be
-    # attributed game titles and years via lookup into the database that is now fully populated
-    for game in [game for game in database if game]:
-        for entry in game.related_games+game.unrelated_games:
-            game_object_of_that_entry = database[int(entry.game_id)]
-            title = game_object_of_that_entry.title
-            year = game_object_of_that_entry.year
-            entry.set_game_title_and_year(title=title, year=year)
-    return database
-
-
-def load_gamesage_gameplay_database():
-    """Load the database of GameSage game representations from a TSV file."""
-    database = []
-    with open('static/game_lsa_vectors-gameplay.tsv', 'r') as tsv_file:
-        reader = csv.reader(tsv_file, delimiter='\t')
-        for row in reader:
-            game_id, title, year, lsa_vector_str = row
-            game_object = GameSageGame(game_id, title, lsa_vector_str)
-            database.append(game_object)
-    return database
-
-
-def load_gameplay_term_id_dictionary():
-    """Load the term-ID dictionary for our corpus."""
-    term_id_dictionary = gensim.corpora.Dictionary.load('./static/gameplay-id2term.dict')
-    return term_id_dictionary
-
-
-def load_gameplay_tf_idf_model():
-    """Load our tf-idf model."""
-    tf_idf_model = (
-        gensim.models.TfidfModel.load('./static/gameplay-tfidf_model')
-    )
-    return tf_idf_model
-
-
-def load_gameplay_lsa_model():
-    """Load our LSA model."""
-    lsa_model = gensim.models.LsiModel.load('./static/gameplay-model_334.lsi')
-    return lsa_model
+@app.route('/gamenet/analyticsStats')
+def analytics_queue_stats():
+    """Report the enqueued, dropped, and saved counts for the queue of analytics events."""
+    return jsonify(**app.analytics_queue.stats())
+
+
+@app.route('/gamesage/<network>/cacheStats')
+def gamesage_result_cache_stats(network):
+    """Report the hit, miss, and eviction counts for a network's GameSage result cache."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    return jsonify(**getattr(app, '{}_result_cache'.format(network)).stats())
+
+
+def get_gamesage_json_payload():
+    """Return the JSON object that a GameSage request's body holds, or None if it doesn't hold one."""
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict):
+        return None
+    return payload
+
+
+def get_gamesage_k(payload):
+    """Return the 'k' given in a GameSage request's JSON payload, clamped to the maximum, or None if it's invalid."""
+    k = payload.get('k', 50)
+    # JSON true and false come through as bools, which are ints too
+    if isinstance(k, bool) or not isinstance(k, (int, long)) or k < 1:
+        return None
+    return min(k, app.config['GAMESAGE_MAX_RESULTS'])
+
+
+@app.route('/gamesage/<network>/submittedTexts', methods=['POST'])
+def generate_gamenet_queries_for_game_ideas(network):
+    """Generate queries for GameNet for a batch of game ideas, submitted as JSON."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    payload = get_gamesage_json_payload()
+    if payload is None:
+        return jsonify(error="The request body must be a JSON object"), 400
+    user_submitted_texts = payload.get('user_submitted_texts')
+    if not isinstance(user_submitted_texts, list) or not all(
+        isinstance(text, basestring) for text in user_submitted_texts
+    ):
+        return jsonify(error="'user_submitted_texts' must be a list of strings"), 400
+    if len(user_submitted_texts) > app.config['GAMESAGE_MAX_BATCH_SIZE']:
+        return jsonify(
+            error="At most {} texts may be submitted at once".format(app.config['GAMESAGE_MAX_BATCH_SIZE'])
+        ), 400
+    k = get_gamesage_k(payload)
+    if k is None:
+        return jsonify(error="'k' must be a positive integer"), 400
+    related_games_strings = GameSage.get_related_games_for_texts(
+        network=network, fold_in=getattr(app, '{}_fold_in'.format(network)),
+        similarity_index=getattr(app, '{}_similarity_index'.format(network)),
+        text_preprocessor=getattr(app, '{}_text_preprocessor'.format(network)),
+        user_submitted_texts=user_submitted_texts, k=k, number_of_threads=app.config['GAMESAGE_BATCH_THREADS'],
+        result_cache=getattr(app, '{}_result_cache'.format(network))
+    )
+    return jsonify(results=[
+        {'most_related_games_str': most_related_games_str, 'least_related_games_str': least_related_games_str}
+        for most_related_games_str, least_related_games_str in related_games_strings
+    ])
+
+
+def is_list_of_game_ids(value):
+    """Return whether a value given as JSON is a list of game IDs (numbers or strings)."""
+    return isinstance(value, list) and all(
+        isinstance(game_id, (basestring, int, long)) and not isinstance(game_id, bool) for game_id in value
+    )
+
+
+def normalize_game_id(game_id):
+    """Convert a game ID given as JSON (a number or a Unicode string) into the byte string that databases key on."""
+    if isinstance(game_id, unicode):
+        return game_id.encode('utf-8')
+    return str(game_id)
+
+
+@app.route('/gamesage/<network>/seedGames', methods=['POST'])
+def generate_gamenet_query_for_seed_games(network):
+    """Generate a query for GameNet for "more like these games", given a set of seed games as JSON."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    payload = get_gamesage_json_payload()
+    if payload is None:
+        return jsonify(error="The request body must be a JSON object"), 400
+    game_ids = payload.get('game_ids')
+    negative_game_ids = payload.get('negative_game_ids', [])
+    for name, ids in (('game_ids', game_ids), ('negative_game_ids', negative_game_ids)):
+        if not is_list_of_game_ids(ids):
+            return jsonify(error="'{}' must be a list of game IDs".format(name)), 400
+    if len(game_ids) + len(negative_game_ids) > app.config['GAMESAGE_MAX_SEED_GAMES']:
+        return jsonify(
+            error="At most {} seed games may be given at once".format(app.config['GAMESAGE_MAX_SEED_GAMES'])
+        ), 400
+    k = get_gamesage_k(payload)
+    if k is None:
+        return jsonify(error="'k' must be a positive integer"), 400
+    negative_weight = payload.get('negative_weight', app.config['GAMESAGE_NEGATIVE_SEED_WEIGHT'])
+    if isinstance(negative_weight, bool) or not isinstance(negative_weight, (int, long, float)) or negative_weight < 0:
+        return jsonify(error="'negative_weight' must be a non-negative number"), 400
+    try:
+        most_related_games_str, least_related_games_str = GameSage.get_related_games_for_seed_games(
+            network=network, similarity_index=getattr(app, '{}_similarity_index'.format(network)),
+            game_ids=[normalize_game_id(game_id) for game_id in game_ids],
+            negative_game_ids=[normalize_game_id(game_id) for game_id in negative_game_ids],
+            negative_weight=negative_weight, k=k
+        )
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    return jsonify(most_related_games_str=most_related_games_str, least_related_games_str=least_related_games_str)
+
+
+@app.route('/gamesage/<network>/refinementSessions', methods=['POST'])
+def start_gamesage_refinement_session(network):
+    """Generate a query for GameNet for a text, given as JSON, and keep it to be refined by relevance feedback."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    payload = get_gamesage_json_payload()
+    if payload is None:
+        return jsonify(error="The request body must be a JSON object"), 400
+    user_submitted_text = payload.get('user_submitted_text')
+    if not isinstance(user_submitted_text, basestring):
+        return jsonify(error="'user_submitted_text' must be a string"), 400
+    gamesage = GameSage(
+        network=network, fold_in=getattr(app, '{}_fold_in'.format(network)),
+        similarity_index=getattr(app, '{}_similarity_index'.format(network)),
+        text_preprocessor=getattr(app, '{}_text_preprocessor'.format(network)),
+        user_submitted_text=user_submitted_text, result_cache=getattr(app, '{}_result_cache'.format(network))
+    )
+    original_weight, relevant_weight, nonrelevant_weight = app.config['GAMESAGE_ROCCHIO_WEIGHTS']
+    refinement_session = RefinementSession(
+        network=network, similarity_index=gamesage.similarity_index, lsa_vector=gamesage.lsa_vector,
+        original_weight=original_weight, relevant_weight=relevant_weight, nonrelevant_weight=nonrelevant_weight,
+        max_judged_games=app.config['GAMESAGE_MAX_SEED_GAMES']
+    )
+    handle = getattr(app, '{}_refinement_session_store'.format(network)).add(refinement_session)
+    return jsonify(
+        handle=handle, user_submitted_text=user_submitted_text,
+        most_related_games_str=gamesage.most_related_games_str,
+        least_related_games_str=gamesage.least_related_games_str
+    )
+
+
+@app.route('/gamesage/<network>/refinementSessions/<handle>', methods=['POST'])
+def refine_gamesage_query(network, handle):
+    """Refine a session's query for GameNet by feedback about games to be more and less like, given as JSON."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    refinement_session = getattr(app, '{}_refinement_session_store'.format(network)).get(handle)
+    if refinement_session is None:
+        return jsonify(error="This refinement session has expired; start a new one"), 404
+    payload = get_gamesage_json_payload()
+    if payload is None:
+        return jsonify(error="The request body must be a JSON object"), 400
+    more_like_game_ids = payload.get('more_like_game_ids', [])
+    less_like_game_ids = payload.get('less_like_game_ids', [])
+    for name, ids in (('more_like_game_ids', more_like_game_ids), ('less_like_game_ids', less_like_game_ids)):
+        if not is_list_of_game_ids(ids):
+            return jsonify(error="'{}' must be a list of game IDs".format(name)), 400
+    if len(more_like_game_ids) + len(less_like_game_ids) > app.config['GAMESAGE_MAX_SEED_GAMES']:
+        return jsonify(
+            error="At most {} games may be given as feedback at once".format(app.config['GAMESAGE_MAX_SEED_GAMES'])
+        ), 400
+    k = get_gamesage_k(payload)
+    if k is None:
+        return jsonify(error="'k' must be a positive integer"), 400
+    try:
+        refinement_session.refine(
+            more_like_game_ids=[normalize_game_id(game_id) for game_id in more_like_game_ids],
+            less_like_game_ids=[normalize_game_id(game_id) for game_id in less_like_game_ids]
+        )
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    most_related_games_str, least_related_games_str = refinement_session.get_related_games_strings(k=k)
+    return jsonify(
+        handle=handle, most_related_games_str=most_related_games_str, least_related_games_str=least_related_games_str
+    )
+
+
+@app.route('/gamesage/<network>/refinementSessionStats')
+def gamesage_refinement_session_stats(network):
+    """Report the size and the hit, miss, eviction, and expiration counts of a network's refinement sessions."""
+    if network not in ('ontology', 'gameplay'):
+        abort(404)
+    return jsonify(**getattr(app, '{}_refinement_session_store'.format(network)).stats())
 
 
 if __name__ == '__main__':
     app.secret_key = 'super secret key'
     # Prepare the ontology network (i.e., tools as fueled by Wikipedia corpus)
-    app.gamenet_ontology_database = load_gamenet_ontology_database()
+    app.gamenet_ontology_store = load_gamenet_ontology_store()
+    app.gamenet_ontology_title_autocompleter = build_title_autocompleter(store=app.gamenet_ontology_store)
+    app.gamenet_ontology_fuzzy_title_matcher = build_fuzzy_title_matcher(store=app.gamenet_ontology_store)
+    app.gamenet_ontology_popularity_tracker = build_popularity_tracker(
+        network='ontology', store=app.gamenet_ontology_store
+    )
     app.gamesage_ontology_database = load_gamesage_ontology_database()
     app.ontology_term_id_dictionary = load_ontology_term_id_dictionary()
     app.ontology_tf_idf_model = load_ontology_tf_idf_model()
     app.ontology_lsa_model = load_ontology_lsa_model()
+    app.ontology_fold_in = build_fold_in(
+        term_id_dictionary=app.ontology_term_id_dictionary, tf_idf_model=app.ontology_tf_idf_model,
+        lsa_model=app.ontology_lsa_model
+    )
+    app.ontology_similarity_index = build_similarity_index(
+        database=app.gamesage_ontology_database, network='ontology',
+        quantization=app.config['GAMESAGE_QUANTIZATION']['ontology'],
+        rescoring_factor=app.config['GAMESAGE_QUANTIZED_RESCORING_FACTOR'],
+        number_of_probes=app.config['GAMESAGE_APPROXIMATE_SEARCH_PROBES']['ontology']
+    )
+    app.ontology_text_preprocessor = build_text_preprocessor(
+        network='ontology', database=app.gamesage_ontology_database,
+        lemma_cache_directory=app.config['GAMESAGE_LEMMA_CACHE_DIRECTORY'],
+        tagger_pool_size=app.config['GAMESAGE_TAGGER_POOL_SIZE'], tagger_timeout=app.config['GAMESAGE_TAGGER_TIMEOUT']
+    )
+    app.ontology_result_cache = GameSageResultCache(max_size=app.config['GAMESAGE_RESULT_CACHE_SIZE'])
+    app.ontology_refinement_session_store = RefinementSessionStore(
+        max_size=app.config['GAMESAGE_REFINEMENT_SESSION_STORE_SIZE'],
+        time_to_live=app.config['GAMESAGE_REFINEMENT_SESSION_TIME_TO_LIVE']
+    )
     # Prepare the gameplay network (i.e., tools as fueled by GameFAQs corpus)
-    app.gamenet_gameplay_database = load_gamenet_gameplay_database()
+    app.gamenet_gameplay_store = load_gamenet_gameplay_store()
+    app.gamenet_gameplay_title_autocompleter = build_title_autocompleter(store=app.gamenet_gameplay_store)
+    app.gamenet_gameplay_fuzzy_title_matcher = build_fuzzy_title_matcher(store=app.gamenet_gameplay_store)
+    app.gamenet_gameplay_popularity_tracker = build_popularity_tracker(
+        network='gameplay', store=app.gamenet_gameplay_store
+    )
     app.gamesage_gameplay_database = load_gamesage_gameplay_database()
     app.gameplay_term_id_dictionary = load_gameplay_term_id_dictionary()
     app.gameplay_tf_idf_model = load_gameplay_tf_idf_model()
     app.gameplay_lsa_model = load_gameplay_lsa_model()
+    app.gameplay_fold_in = build_fold_in(
+        term_id_dictionary=app.gameplay_term_id_dictionary, tf_idf_model=app.gameplay_tf_idf_model,
+        lsa_model=app.gameplay_lsa_model
+    )
+    app.gameplay_similarity_index = build_similarity_index(
+        database=app.gamesage_gameplay_database, network='gameplay',
+        quantization=app.config['GAMESAGE_QUANTIZATION']['gameplay'],
+        rescoring_factor=app.config['GAMESAGE_QUANTIZED_RESCORING_FACTOR'],
+        number_of_probes=app.config['GAMESAGE_APPROXIMATE_SEARCH_PROBES']['gameplay']
+    )
+    app.gameplay_text_preprocessor = build_text_preprocessor(
+        network='gameplay', database=app.gamesage_gameplay_database,
+        lemma_cache_directory=app.config['GAMESAGE_LEMMA_CACHE_DIRECTORY'],
+        tagger_pool_size=app.config['GAMESAGE_TAGGER_POOL_SIZE'], tagger_timeout=app.config['GAMESAGE_TAGGER_TIMEOUT']
+    )
+    app.gameplay_result_cache = GameSageResultCache(max_size=app.config['GAMESAGE_RESULT_CACHE_SIZE'])
+    app.gameplay_refinement_session_store = RefinementSessionStore(
+        max_size=app.config['GAMESAGE_REFINEMENT_SESSION_STORE_SIZE'],
+        time_to_live=app.config['GAMESAGE_REFINEMENT_SESSION_TIME_TO_LIVE']
+    )
     app.run(debug=False)
 else:
     app.secret_key = 'super secret key'
     # Prepare the ontology network (i.e., tools as fueled by Wikipedia corpus)
-    app.gamenet_ontology_database = load_gamenet_ontology_database()
+    app.gamenet_ontology_store = load_gamenet_ontology_store()
+    app.gamenet_ontology_title_autocompleter = build_title_autocompleter(store=app.gamenet_ontology_store)
+    app.gamenet_ontology_fuzzy_title_matcher = build_fuzzy_title_matcher(store=app.gamenet_ontology_store)
+    app.gamenet_ontology_popularity_tracker = build_popularity_tracker(
+        network='ontology', store=app.gamenet_ontology_store
+    )
     app.gamesage_ontology_database = load_gamesage_ontology_database()
     app.ontology_term_id_dictionary = load_ontology_term_id_dictionary()
     app.ontology_tf_idf_model = load_ontology_tf_idf_model()
     app.ontology_lsa_model = load_ontology_lsa_model()
+    app.ontology_fold_in = build_fold_in(
+        term_id_dictionary=app.ontology_term_id_dictionary, tf_idf_model=app.ontology_tf_idf_model,
+        lsa_model=app.ontology_lsa_model
+    )
+    app.ontology_similarity_index = build_similarity_index(
+        database=app.gamesage_ontology_database, network='ontology',
+        quantization=app.config['GAMESAGE_QUANTIZATION']['ontology'],
+        rescoring_factor=app.config['GAMESAGE_QUANTIZED_RESCORING_FACTOR'],
+        number_of_probes=app.config['GAMESAGE_APPROXIMATE_SEARCH_PROBES']['ontology']
+    )
+    app.ontology_text_preprocessor = build_text_preprocessor(
+        network='ontology', database=app.gamesage_ontology_database,
+        lemma_cache_directory=app.config['GAMESAGE_LEMMA_CACHE_DIRECTORY'],
+        tagger_pool_size=app.config['GAMESAGE_TAGGER_POOL_SIZE'], tagger_timeout=app.config['GAMESAGE_TAGGER_TIMEOUT']
+    )
+    app.ontology_result_cache = GameSageResultCache(max_size=app.config['GAMESAGE_RESULT_CACHE_SIZE'])
+    app.ontology_refinement_session_store = RefinementSessionStore(
+        max_size=app.config['GAMESAGE_REFINEMENT_SESSION_STORE_SIZE'],
+        time_to_live=app.config['GAMESAGE_REFINEMENT_SESSION_TIME_TO_LIVE']
+    )
     # Prepare the gameplay network (i.e., tools as fueled by GameFAQs corpus)
-    app.gamenet_gameplay_database = load_gamenet_gameplay_database()
+    app.gamenet_gameplay_store = load_gamenet_gameplay_store()
+    app.gamenet_gameplay_title_autocompleter = build_title_autocompleter(store=app.gamenet_gameplay_store)
+    app.gamenet_gameplay_fuzzy_title_matcher = build_fuzzy_title_matcher(store=app.gamenet_gameplay_store)
+    app.gamenet_gameplay_popularity_tracker = build_popularity_tracker(
+        network='gameplay', store=app.gamenet_gameplay_store
+    )
     app.gamesage_gameplay_database = load_gamesage_gameplay_database()
     app.gameplay_term_id_dictionary = load_gameplay_term_id_dictionary()
     app.gameplay_tf_idf_model = load_gameplay_tf_idf_model()
     app.gameplay_lsa_model = load_gameplay_lsa_model()
+    app.gameplay_fold_in = build_fold_in(
+        term_id_dictionary=app.gameplay_term_id_dictionary, tf_idf_model=app.gameplay_tf_idf_model,
+        lsa_model=app.gameplay_lsa_model
+    )
+    app.gameplay_similarity_index = build_similarity_index(
+        database=app.gamesage_gameplay_database, network='gameplay',
+        quantization=app.config['GAMESAGE_QUANTIZATION']['gameplay'],
+        rescoring_factor=app.config['GAMESAGE_QUANTIZED_RESCORING_FACTOR'],
+        number_of_probes=app.config['GAMESAGE_APPROXIMATE_SEARCH_PROBES']['gameplay']
+    )
+    app.gameplay_text_preprocessor = build_text_preprocessor(
+        network='gameplay', database=app.gamesage_gameplay_database,
+        lemma_cache_directory=app.config['GAMESAGE_LEMMA_CACHE_DIRECTORY'],
+        tagger_pool_size=app.config['GAMESAGE_TAGGER_POOL_SIZE'], tagger_timeout=app.config['GAMESAGE_TAGGER_TIMEOUT']
+    )
+    app.gameplay_result_cache = GameSageResultCache(max_size=app.config['GAMESAGE_RESULT_CACHE_SIZE'])
+    app.gameplay_refinement_session_store = RefinementSessionStore(
+        max_size=app.config['GAMESAGE_REFINEMENT_SESSION_STORE_SIZE'],
+        time_to_live=app.config['GAMESAGE_REFINEMENT_SESSION_TIME_TO_LIVE']
+    )
 
 if not app.debug:
     import logging
@@ -726,3 +1147,4 @@ if not app.debug:
     logger = logging.getLogger('app_info')
     logger.setLevel(logging.DEBUG)
     logger.addHandler(RotatingFileHandler('gamenet_actions.log', maxBytes=1024 * 1024 * 10, backupCount=20))
+    app.analytics_queue.logger = logger
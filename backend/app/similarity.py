@@ -0,0 +1,157 @@
+import os
+import warnings
+import numpy
+
+
+class LSASimilarityIndex(object):
+    """An in-memory index supporting cosine-similarity queries against every game in a GameSage database."""
+
+    def __init__(self, database, matrix_path=None, mmap_mode='r'):
+        """Initialize an LSASimilarityIndex object.
+
+        If a matrix path is given, the normalized matrix gets saved there (unless a matrix for
+        a database of the same shape already is), and then opened from there with the given
+        mmap mode, so that all the worker processes on a machine can share one copy of it.
+        """
+        self.game_ids = [game.id for game in database]
+        self.index_of_game_id = dict((game_id, index) for index, game_id in enumerate(self.game_ids))
+        # Each game's LSA vector excludes the first dimension, so its dimension
+        # indices run from 1 to the number of LSA dimensions minus one
+        self.number_of_dimensions = len(database[0].lsa_vector)
+        if matrix_path is None:
+            self.matrix = self._build_normalized_matrix(database=database)
+        else:
+            self.matrix = self._load_or_build_normalized_matrix(
+                database=database, matrix_path=matrix_path, mmap_mode=mmap_mode
+            )
+
+    def _build_normalized_matrix(self, database):
+        """Build a contiguous matrix of the games' LSA vectors, each normalized to unit length."""
+        matrix = numpy.zeros((len(database), self.number_of_dimensions), dtype=numpy.float32)
+        for i in xrange(len(database)):
+            matrix[i] = database[i].lsa_vector
+        self.normalize_rows(matrix)
+        return numpy.ascontiguousarray(matrix)
+
+    def _load_or_build_normalized_matrix(self, database, matrix_path, mmap_mode):
+        """Open the normalized matrix saved at the given path, building and saving it first if need be."""
+        expected_shape = (len(database), self.number_of_dimensions)
+        if os.path.exists(matrix_path):
+            try:
+                matrix = numpy.load(matrix_path, mmap_mode=mmap_mode)
+                if matrix.shape == expected_shape and matrix.dtype == numpy.float32:
+                    return matrix
+            except (IOError, OSError, ValueError):
+                pass  # We'll just rebuild it
+        matrix = self._build_normalized_matrix(database=database)
+        # Write to a temporary file first, so that another worker booting at the same time
+        # never opens a partially written matrix
+        temporary_path = '{}.{}.tmp'.format(matrix_path, os.getpid())
+        try:
+            with open(temporary_path, 'wb') as matrix_file:
+                numpy.save(matrix_file, matrix)
+            os.rename(temporary_path, matrix_path)
+        except (IOError, OSError) as error:
+            warnings.warn("Could not save the similarity matrix {}: {}".format(matrix_path, error))
+            return matrix
+        if mmap_mode is None:
+            return matrix
+        return numpy.load(matrix_path, mmap_mode=mmap_mode)
+
+    @staticmethod
+    def normalize_rows(matrix):
+        """Normalize each row of the matrix to unit length, in place (all-zero rows are left alone)."""
+        norms = numpy.sqrt(numpy.einsum('ij,ij->i', matrix, matrix))
+        norms[norms == 0] = 1.0
+        matrix /= norms[:, numpy.newaxis]
+        return matrix
+
+    def vectorize(self, lsa_vector):
+        """Convert an LSA vector into a unit-length array.
+
+        The LSA vector may be given either as a dense array (as folding in produces, and as games'
+        LSA vectors are stored) or as a sparse list of (dimension index, value) tuples (as gensim
+        produces).
+        """
+        if isinstance(lsa_vector, numpy.ndarray):
+            dense_vector = lsa_vector.astype(numpy.float32)
+        else:
+            dense_vector = numpy.zeros(self.number_of_dimensions, dtype=numpy.float32)
+            for dimension_index, value in lsa_vector:
+                if 0 < dimension_index <= self.number_of_dimensions:
+                    dense_vector[dimension_index-1] = value
+        norm = numpy.sqrt(numpy.dot(dense_vector, dense_vector))
+        if norm:
+            dense_vector /= norm
+        return dense_vector
+
+    def score(self, lsa_vector):
+        """Return the cosine similarity between an LSA vector and every game in the index."""
+        return numpy.dot(self.matrix, self.vectorize(lsa_vector))
+
+    def most_and_least_related(self, lsa_vector, k=50):
+        """Return the k most related and k least related games to an LSA vector.
+
+        Each is a list of (database index, score) tuples, with the most related games
+        ordered most related first and the least related games ordered least related first.
+        """
+        scores = self.score(lsa_vector)
+        return self.select_extremes(scores=scores, k=k)
+
+    def most_and_least_related_to_each(self, lsa_vectors, k=50, chunk_size=256):
+        """Return the k most related and k least related games to each of a list of LSA vectors.
+
+        All the vectors are scored with a single matrix-matrix product (per chunk of vectors,
+        to bound the size of the score matrix), and the results are lists of (most related
+        games, least related games) pairs, formatted as in most_and_least_related().
+        """
+        results = []
+        for chunk_start in xrange(0, len(lsa_vectors), chunk_size):
+            chunk = lsa_vectors[chunk_start:chunk_start+chunk_size]
+            query_matrix = numpy.vstack([self.vectorize(lsa_vector) for lsa_vector in chunk])
+            score_matrix = numpy.dot(query_matrix, self.matrix.T)
+            results += self.select_extremes_of_each_row(score_matrix=score_matrix, k=k)
+        return results
+
+    @staticmethod
+    def select_extremes_of_each_row(score_matrix, k):
+        """Select the k highest and k lowest scores in each row of a score matrix, via partial selection."""
+        number_of_rows, number_of_scores = score_matrix.shape
+        k = min(k, number_of_scores)
+        if k == 0:
+            return [([], []) for _ in xrange(number_of_rows)]
+        if k < number_of_scores:
+            top_indices = numpy.argpartition(-score_matrix, k-1, axis=1)[:, :k]
+            bottom_indices = numpy.argpartition(score_matrix, k-1, axis=1)[:, :k]
+        else:
+            top_indices = bottom_indices = numpy.tile(numpy.arange(number_of_scores), (number_of_rows, 1))
+        rows = numpy.arange(number_of_rows)[:, numpy.newaxis]
+        top_scores = score_matrix[rows, top_indices]
+        bottom_scores = score_matrix[rows, bottom_indices]
+        top_order = numpy.argsort(-top_scores, axis=1, kind='mergesort')
+        bottom_order = numpy.argsort(bottom_scores, axis=1, kind='mergesort')
+        top_indices, top_scores = top_indices[rows, top_order], top_scores[rows, top_order]
+        bottom_indices, bottom_scores = bottom_indices[rows, bottom_order], bottom_scores[rows, bottom_order]
+        results = []
+        for i in xrange(number_of_rows):
+            most_related = [(int(j), float(score)) for j, score in zip(top_indices[i], top_scores[i])]
+            least_related = [(int(j), float(score)) for j, score in zip(bottom_indices[i], bottom_scores[i])]
+            results.append((most_related, least_related))
+        return results
+
+    @staticmethod
+    def select_extremes(scores, k):
+        """Select the k highest and k lowest scores via partial selection, rather than a full sort."""
+        k = min(k, len(scores))
+        if k == 0:
+            return [], []
+        if k < len(scores):
+            top_indices = numpy.argpartition(-scores, k-1)[:k]
+            bottom_indices = numpy.argpartition(scores, k-1)[:k]
+        else:
+            top_indices = bottom_indices = numpy.arange(len(scores))
+        top_indices = top_indices[numpy.argsort(-scores[top_indices], kind='mergesort')]
+        bottom_indices = bottom_indices[numpy.argsort(scores[bottom_indices], kind='mergesort')]
+        most_related = [(int(i), float(scores[i])) for i in top_indices]
+        least_related = [(int(i), float(scores[i])) for i in bottom_indices]
+        return most_related, least_related
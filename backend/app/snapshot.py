@@ -0,0 +1,247 @@
+"""Binary snapshots of the parsed GameNet stores and GameSage databases, which make worker startup fast.
+
+Parsing a database's TSV file means csv-parsing every row, decoding its text, building query
+URLs, and parsing un/related-games strings, which takes many seconds. A snapshot stores the
+result of all of this as columnar arrays (numbers as numeric arrays, text as string tables) in an
+uncompressed .npz file, tagged with a hash of the TSV file it was built from; at startup, the
+snapshot gets loaded if its hash matches the TSV file's, and otherwise it gets rebuilt from the
+TSV file (and saved for the next startup).
+
+Large numeric arrays (the games' LSA vectors, the un/related-games structures, and the games'
+vectors as grouped by approximate similarity indexes or quantized) are saved as
+separate .npy files next to the .npz file, and get opened read-only with mmap, so that all the
+worker processes on a machine share a single copy of them in the page cache.
+
+To build all the snapshots ahead of a deploy, run this from the directory containing routes.py:
+
+    python snapshot.py
+"""
+
+import hashlib
+import os
+import warnings
+import numpy
+from game import GameSageGame
+from adjacency import RelatedGamesAdjacency
+from store import GameStore
+
+# Bump this whenever the layout of a snapshot, or the way that games get parsed, changes, so
+# that existing snapshots get rebuilt rather than misread
+SNAPSHOT_FORMAT_VERSION = 4
+SNAPSHOT_DIRECTORY = './snapshots'
+
+# The string attributes of each kind of game, and whether each holds Unicode text (rather than bytes)
+GAMENET_STRING_COLUMNS = (
+    ('id', False), ('title', True), ('year', False), ('platform', True), ('wiki_url', False),
+    ('wiki_summary', True), ('multiline_title', True), ('google_images_query', True), ('youtube_query', True),
+)
+GAMESAGE_STRING_COLUMNS = (('id', False), ('title', True), ('gamenet_link', False))
+# The arrays making up a network's un/related-games structure
+ADJACENCY_ARRAYS = ('offsets', 'neighbor_ids', 'scores', 'background_color_codes')
+# The arrays that get saved as separate .npy files, to be opened with mmap
+MEMORY_MAPPED_ARRAYS = ('lsa_vectors', 'permutation', 'clustered_matrix', 'quantized_matrix') + tuple(
+    '{}_{}'.format(name, array_name) for name in ('related_games', 'unrelated_games') for array_name in ADJACENCY_ARRAYS
+)
+
+
+def hash_source_file(path):
+    """Return a hash of a TSV file's contents, which identifies the snapshots that were built from it."""
+    source_hash = hashlib.sha1('snapshot format {}\n'.format(SNAPSHOT_FORMAT_VERSION).encode('ascii'))
+    with open(path, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b''):
+            source_hash.update(block)
+    return source_hash.hexdigest()
+
+
+def load_database_via_snapshot(snapshot_name, source_path, parse_database, serialize_database,
+                               deserialize_database, rebuild=False, mmap_mode='r'):
+    """Load a database from its snapshot, rebuilding the snapshot from the TSV file if that has changed.
+
+    If mmap_mode is None, the snapshot's large arrays get read into memory, rather than mapped.
+    """
+    source_hash = hash_source_file(source_path)
+    snapshot_path = os.path.join(SNAPSHOT_DIRECTORY, '{}.npz'.format(snapshot_name))
+    if not rebuild:
+        arrays = read_snapshot(path=snapshot_path, source_hash=source_hash, mmap_mode=mmap_mode)
+        if arrays is not None:
+            return deserialize_database(arrays)
+    database = parse_database(source_path)
+    try:
+        write_snapshot(path=snapshot_path, arrays=serialize_database(database), source_hash=source_hash)
+    except (IOError, OSError) as error:
+        # Not being able to save a snapshot only costs the next startup some time
+        warnings.warn("Could not save the snapshot {}: {}".format(snapshot_path, error))
+        return database
+    if mmap_mode is None:
+        return database
+    # Reload the database from the snapshot just written, so that even the worker that built
+    # it shares its large arrays with the other workers, rather than holding its own copy
+    return deserialize_database(read_snapshot(path=snapshot_path, source_hash=source_hash, mmap_mode=mmap_mode))
+
+
+def get_memory_mapped_array_path(snapshot_path, name):
+    """Return the path to the .npy file holding one of a snapshot's memory-mapped arrays."""
+    return '{}-{}.npy'.format(os.path.splitext(snapshot_path)[0], name)
+
+
+def read_snapshot(path, source_hash, mmap_mode='r'):
+    """Return a snapshot's arrays, or None if there is no snapshot built from the given TSV file hash."""
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = numpy.load(path)
+        try:
+            if (int(snapshot['format_version'][0]) != SNAPSHOT_FORMAT_VERSION or
+                    str(snapshot['source_hash'][0]) != source_hash):
+                return None
+            arrays = dict((name, snapshot[name]) for name in snapshot.files)
+        finally:
+            snapshot.close()
+        for name in arrays.pop('memory_mapped_array_names').tolist():
+            arrays[str(name)] = numpy.load(get_memory_mapped_array_path(path, name=str(name)), mmap_mode=mmap_mode)
+        return arrays
+    except (IOError, OSError, ValueError, KeyError) as error:
+        warnings.warn("Ignoring the unreadable snapshot {}: {}".format(path, error))
+        return None
+
+
+def write_snapshot(path, arrays, source_hash):
+    """Save a snapshot's arrays, tagged with the hash of the TSV file that they were built from."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    arrays = dict(arrays)
+    # The memory-mapped arrays get written before the .npz file, so that a snapshot's .npz file
+    # never refers to arrays that don't yet exist
+    memory_mapped_array_names = [name for name in MEMORY_MAPPED_ARRAYS if name in arrays]
+    for name in memory_mapped_array_names:
+        array_path = get_memory_mapped_array_path(path, name=name)
+        temporary_array_path = '{}.{}.tmp'.format(array_path, os.getpid())
+        with open(temporary_array_path, 'wb') as array_file:
+            numpy.save(array_file, numpy.ascontiguousarray(arrays.pop(name)))
+        os.rename(temporary_array_path, array_path)
+    arrays['memory_mapped_array_names'] = numpy.array(memory_mapped_array_names)
+    arrays['format_version'] = numpy.array([SNAPSHOT_FORMAT_VERSION], dtype=numpy.int32)
+    arrays['source_hash'] = numpy.array([source_hash])
+    # Write to a temporary file first, so that another worker booting at the same time never
+    # reads a partially written snapshot
+    temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary_path, 'wb') as snapshot_file:
+        numpy.savez(snapshot_file, **arrays)
+    os.rename(temporary_path, path)
+
+
+def pack_strings(strings):
+    """Pack a list of strings into a string table: a byte array of their UTF-8 encodings, and their offsets into it."""
+    encoded_strings = [string.encode('utf-8') if isinstance(string, unicode) else string for string in strings]
+    offsets = numpy.zeros(len(encoded_strings)+1, dtype=numpy.int64)
+    numpy.cumsum([len(string) for string in encoded_strings], out=offsets[1:])
+    data = b''.join(encoded_strings)
+    if data:
+        data = numpy.frombuffer(data, dtype=numpy.uint8)
+    else:
+        data = numpy.zeros(0, dtype=numpy.uint8)
+    return data, offsets
+
+
+def unpack_strings(data, offsets, decode):
+    """Unpack the strings in a string table, decoding them from UTF-8 if decode is True."""
+    data = data.tobytes()
+    offsets = offsets.tolist()
+    strings = [data[offsets[i]:offsets[i+1]] for i in xrange(len(offsets)-1)]
+    if decode:
+        strings = [string.decode('utf-8') for string in strings]
+    return strings
+
+
+def _add_string_column(arrays, name, strings):
+    """Add a string table for a column of strings to a snapshot's arrays."""
+    arrays['{}_data'.format(name)], arrays['{}_offsets'.format(name)] = pack_strings(strings)
+
+
+def _get_string_column(arrays, name, decode):
+    """Return a column of strings from a snapshot's arrays."""
+    return unpack_strings(
+        data=arrays['{}_data'.format(name)], offsets=arrays['{}_offsets'.format(name)], decode=decode
+    )
+
+
+def _add_adjacency_arrays(arrays, name, adjacency):
+    """Add the arrays of a network's un/related-games structure to a snapshot's arrays."""
+    for array_name in ADJACENCY_ARRAYS:
+        arrays['{}_{}'.format(name, array_name)] = getattr(adjacency, array_name)
+
+
+def _get_adjacency(arrays, name, store):
+    """Return a network's un/related-games structure from a snapshot's arrays."""
+    return RelatedGamesAdjacency(
+        store=store, **dict(
+            (array_name, arrays['{}_{}'.format(name, array_name)]) for array_name in ADJACENCY_ARRAYS
+        )
+    )
+
+
+def serialize_gamenet_store(store):
+    """Convert a GameNet network's store into a snapshot's arrays."""
+    arrays = {}
+    for name, decode in GAMENET_STRING_COLUMNS:
+        _add_string_column(arrays, name=name, strings=store.columns[name])
+    _add_adjacency_arrays(arrays, name='related_games', adjacency=store.related_games)
+    _add_adjacency_arrays(arrays, name='unrelated_games', adjacency=store.unrelated_games)
+    return arrays
+
+
+def deserialize_gamenet_store(arrays):
+    """Rebuild a GameNet network's store from a snapshot's arrays, without parsing anything."""
+    store = GameStore(columns=dict(
+        (name, _get_string_column(arrays, name=name, decode=decode)) for name, decode in GAMENET_STRING_COLUMNS
+    ))
+    store.related_games = _get_adjacency(arrays, name='related_games', store=store)
+    store.unrelated_games = _get_adjacency(arrays, name='unrelated_games', store=store)
+    store.version = str(arrays['source_hash'][0])
+    return store
+
+
+def serialize_gamesage_database(database):
+    """Convert a GameSage database into a snapshot's arrays."""
+    arrays = {}
+    for name, decode in GAMESAGE_STRING_COLUMNS:
+        _add_string_column(arrays, name=name, strings=[getattr(game, name) for game in database])
+    arrays['lsa_vectors'] = numpy.array([game.lsa_vector for game in database], dtype=numpy.float64)
+    return arrays
+
+
+def deserialize_gamesage_database(arrays):
+    """Rebuild a GameSage database from a snapshot's arrays, without parsing anything.
+
+    Each game's LSA vector is a row of the snapshot's (usually memory-mapped) matrix of LSA vectors.
+    """
+    columns = dict(
+        (name, _get_string_column(arrays, name=name, decode=decode)) for name, decode in GAMESAGE_STRING_COLUMNS
+    )
+    lsa_vectors = arrays['lsa_vectors']
+    database = []
+    for row in xrange(lsa_vectors.shape[0]):
+        game = GameSageGame.__new__(GameSageGame)
+        for name, _ in GAMESAGE_STRING_COLUMNS:
+            setattr(game, name, columns[name][row])
+        game.lsa_vector = lsa_vectors[row]
+        database.append(game)
+    return database
+
+
+def main():
+    # Imported here, since the loaders themselves import this module
+    from loading import (
+        load_gamenet_ontology_store, load_gamesage_ontology_database, load_gamenet_gameplay_store,
+        load_gamesage_gameplay_database
+    )
+    for load_database in (
+        load_gamenet_ontology_store, load_gamesage_ontology_database, load_gamenet_gameplay_store,
+        load_gamesage_gameplay_database
+    ):
+        load_database(rebuild_snapshot=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,62 @@
 $(function(){
-    var ICON_LINK = "/gamenet/icon_click";
-    var GAME_CLICK_LINK = "/gamenet/gamenet_link_click";
+    var EVENTS_LINK = "/gamenet/events";
+    // Click events get buffered and sent together, every FLUSH_INTERVAL milliseconds, as soon as
+    // MAX_BUFFERED_EVENTS of them pile up, or when the page gets hidden (e.g., on following a link)
+    var FLUSH_INTERVAL = 10000;
+    var MAX_BUFFERED_EVENTS = 20;
     var game_id = $('.gameTitle').data('game');
     var network = $('.gameTitle').data('network');
+    var buffered_events = [];
+
+    function flush_events(){
+        if (buffered_events.length === 0) {
+            return;
+        }
+        var body = JSON.stringify({events: buffered_events});
+        buffered_events = [];
+        // sendBeacon() requests survive the page unloading; a plain-text body keeps them simple requests
+        if (!(navigator.sendBeacon && navigator.sendBeacon(EVENTS_LINK, body))) {
+            $.ajax({type: 'POST', url: EVENTS_LINK, data: body, contentType: 'text/plain'});
+        }
+    }
+
+    function record_event(click_event){
+        // Game idea pages have no game in the network for their clicks to be recorded against
+        if (game_id === undefined) {
+            return;
+        }
+        click_event.network = network;
+        buffered_events.push(click_event);
+        if (buffered_events.length >= MAX_BUFFERED_EVENTS) {
+            flush_events();
+        }
+    }
+
     var wiki_icon = $("img[alt='Wikipedia']").click(function(){
-        $.post(ICON_LINK, {game_id: game_id, icon_type: 'wikipedia', network: network})
+        record_event({type: 'icon_click', game_id: game_id, icon_type: 'wikipedia'})
     });
     var youtube_icon = $("img[alt='YouTube']").click(function(){
-        $.post(ICON_LINK, {game_id: game_id, icon_type: 'youtube', network: network})
+        record_event({type: 'icon_click', game_id: game_id, icon_type: 'youtube'})
     });
     var google_icon = $("img[alt='Google Images']").click(function(){
-        $.post(ICON_LINK, {game_id: game_id, icon_type: 'google', network: network})
+        record_event({type: 'icon_click', game_id: game_id, icon_type: 'google'})
     });
 
     $('.relatedAndUnrelatedGamesLink').click(function(e){
         var game_dest_id = $(this).data('game-id');
-        $.post(GAME_CLICK_LINK, {game_dest_id: game_dest_id, game_source_id: game_id, network: network})
+        record_event({type: 'game_link_click', game_source_id: game_id, game_dest_id: game_dest_id})
     })
-});
\ No newline at end of file
+
+    // A pre-rendered page gets served without the app ever seeing the view, so report it
+    if ($('.gameTitle').data('prerendered')) {
+        record_event({type: 'game_view', game_id: game_id})
+    }
+
+    setInterval(flush_events, FLUSH_INTERVAL);
+    document.addEventListener('visibilitychange', function(){
+        if (document.visibilityState === 'hidden') {
+            flush_events();
+        }
+    });
+    window.addEventListener('pagehide', flush_events);
+});
@@ -0,0 +1,135 @@
+import numpy
+
+
+class GameStore(object):
+    """A GameNet network's games, held in columns, with constant-time lookups by game ID and by title.
+
+    Row i of every column holds a field of the same game. Game IDs may have gaps (as in the
+    gameplay network), so a dense array maps each ID to its game's row (or to -1, for an ID that
+    no game has), and a hash index maps each case-folded title to the row of the first game with
+    that title.
+    """
+
+    # The metadata fields of each game, each of which gets stored as a column
+    COLUMNS = (
+        'id', 'title', 'year', 'platform', 'wiki_url', 'wiki_summary', 'multiline_title', 'google_images_query',
+        'youtube_query',
+    )
+
+    def __init__(self, columns, related_games=None, unrelated_games=None):
+        """Initialize a GameStore object."""
+        self.columns = columns
+        self.ids = numpy.array([int(game_id) for game_id in columns['id']], dtype=numpy.int32)
+        self.row_of_id = self._build_row_of_id()
+        self.row_of_title = self._build_row_of_title()
+        # These are the network's un/related-games structures (in adjacency.py), which get
+        # set once the store exists, since they look up titles and years in it
+        self.related_games = related_games
+        self.unrelated_games = unrelated_games
+        # This identifies the data that the store holds (as the hash of the TSV file that its
+        # snapshot was built from), for anything derived from it (e.g., rendered pages) to be keyed on
+        self.version = None
+
+    @classmethod
+    def from_games(cls, games):
+        """Build a store from a list of GameNetGame objects."""
+        columns = dict((name, [getattr(game, name) for game in games]) for name in cls.COLUMNS)
+        return cls(columns=columns)
+
+    def _build_row_of_id(self):
+        """Build a dense array mapping each game ID to its game's row, with -1 for IDs that no game has."""
+        row_of_id = numpy.empty(self.ids.max()+1 if len(self.ids) else 0, dtype=numpy.int32)
+        row_of_id.fill(-1)
+        row_of_id[self.ids] = numpy.arange(len(self.ids), dtype=numpy.int32)
+        return row_of_id
+
+    def _build_row_of_title(self):
+        """Build a hash index mapping each case-folded title to the row of the first game with that title."""
+        row_of_title = {}
+        for row, title in enumerate(self.columns['title']):
+            row_of_title.setdefault(self.casefold(title), row)
+        return row_of_title
+
+    @staticmethod
+    def casefold(title):
+        """Normalize a title for case-insensitive matching."""
+        return title.lower()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for row in xrange(len(self.ids)):
+            yield GameNetGameView(store=self, row=row)
+
+    def __contains__(self, game_id):
+        return self.get_row(game_id) is not None
+
+    def __getitem__(self, game_id):
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def get_row(self, game_id):
+        """Return the row of the game with the given ID, or None if there's no such game (or it isn't an ID)."""
+        try:
+            game_id = int(game_id)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= game_id < len(self.row_of_id):
+            return None
+        row = int(self.row_of_id[game_id])
+        if row < 0:
+            return None
+        return row
+
+    def get(self, game_id):
+        """Return a view of the game with the given ID, or None if there's no such game."""
+        row = self.get_row(game_id)
+        if row is None:
+            return None
+        return GameNetGameView(store=self, row=row)
+
+    def get_field(self, game_id, name):
+        """Return a field of the game with the given ID, raising a KeyError if there's no such game."""
+        row = self.get_row(game_id)
+        if row is None:
+            raise KeyError(game_id)
+        return self.columns[name][row]
+
+    def find_by_title(self, title):
+        """Return a view of the first game with the given title (ignoring case), or None if there's no such game."""
+        row = self.row_of_title.get(self.casefold(title))
+        if row is None:
+            return None
+        return GameNetGameView(store=self, row=row)
+
+
+class GameNetGameView(object):
+    """A view of one game in a GameStore, with the attributes of a GameNetGame."""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        """Initialize a GameNetGameView object."""
+        self.store = store
+        self.row = row
+
+    def __getattr__(self, name):
+        # Only called for names that aren't set slots, i.e., the game's fields
+        if name in GameNetGameView.__slots__:
+            raise AttributeError(name)
+        try:
+            column = self.store.columns[name]
+        except KeyError:
+            raise AttributeError(name)
+        return column[self.row]
+
+    @property
+    def related_games(self):
+        return self.store.related_games.view(self.row)
+
+    @property
+    def unrelated_games(self):
+        return self.store.unrelated_games.view(self.row)
@@ -0,0 +1,154 @@
+import collections
+import os
+import threading
+import time
+from nltk import HunposTagger
+
+
+class TaggerTimeoutError(Exception):
+    """Raised when no tagger could be acquired, or a tagger failed to tag a text, within the timeout."""
+    pass
+
+
+class HunposTaggerPool(object):
+    """A pool of long-lived HunPos tagger subprocesses, shared by all the threads of a worker process."""
+
+    def __init__(self, path_to_model, path_to_binary, size=4, timeout=10.0):
+        """Initialize a HunposTaggerPool object."""
+        self.path_to_model = path_to_model
+        self.path_to_binary = path_to_binary
+        self.size = size
+        self.timeout = timeout
+        # Guards the pool's state, and wakes up requests waiting on a full pool whenever a
+        # tagger gets released or a slot gets freed
+        self.condition = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        """Empty the pool (taggers get spawned lazily, as they are needed)."""
+        # Remember which process owns the taggers: a forked worker inherits this pool
+        # from its parent, but must not share the parent's tagger pipes
+        self.pid = os.getpid()
+        self.idle_taggers = collections.deque()
+        self.number_of_taggers = 0
+
+    def tag(self, tokens):
+        """POS-tag a list of tokens using an idle tagger from the pool.
+
+        The timeout covers both waiting for a tagger and using it, so a TaggerTimeoutError is
+        raised if the tokens can't be tagged within that many seconds all told.
+        """
+        deadline = time.time() + self.timeout
+        tagger = self._acquire(deadline=deadline)
+        if time.time() >= deadline:
+            # Spawning the tagger used up the rest of the time, but it's fine for the next request
+            self._release(tagger)
+            raise TaggerTimeoutError("No HunPos tagger became ready within {} seconds".format(self.timeout))
+        try:
+            pos_tagged_tokens = self._tag_with_timeout(tagger=tagger, tokens=tokens, deadline=deadline)
+        except Exception:
+            # The tagger may be left in an inconsistent state, so replace it
+            self._discard(tagger)
+            raise
+        self._release(tagger)
+        return pos_tagged_tokens
+
+    def _acquire(self, deadline):
+        """Return an idle tagger, spawning one if the pool isn't full, or else waiting for either until the deadline."""
+        with self.condition:
+            if self.pid != os.getpid():
+                self._reset()
+            while not self.idle_taggers and self.number_of_taggers >= self.size:
+                remaining_time = deadline - time.time()
+                if remaining_time <= 0:
+                    raise TaggerTimeoutError("No HunPos tagger became free within {} seconds".format(self.timeout))
+                self.condition.wait(remaining_time)
+            if self.idle_taggers:
+                tagger = self.idle_taggers.popleft()
+            else:
+                # A slot is free (never used yet, or freed by a discarded tagger), so claim it
+                self.number_of_taggers += 1
+                tagger = None
+        if tagger is None:
+            return self._spawn_into_claimed_slot()
+        if not self._is_alive(tagger):
+            # The tagger's subprocess died while it was idle, so restart it in the same slot
+            try:
+                tagger.close()
+            except Exception:
+                pass
+            tagger = self._spawn_into_claimed_slot()
+        return tagger
+
+    def _release(self, tagger):
+        """Return a tagger to the pool, waking up a request waiting for one."""
+        with self.condition:
+            if self.pid == os.getpid():
+                self.idle_taggers.append(tagger)
+                self.condition.notify()
+                return
+        tagger.close()
+
+    def _discard(self, tagger):
+        """Shut down a tagger that can no longer be used, freeing its slot in the pool for a waiting request."""
+        try:
+            tagger.close()
+        except Exception:
+            pass  # It may well have died already
+        self._free_slot()
+
+    def _free_slot(self):
+        """Give up a claimed slot in the pool, waking up a request waiting for one, to spawn a tagger into it."""
+        with self.condition:
+            if self.pid == os.getpid():
+                self.number_of_taggers -= 1
+                self.condition.notify()
+
+    def _spawn_into_claimed_slot(self):
+        """Spawn a new tagger subprocess, which loads the model once, up front, into an already claimed slot."""
+        try:
+            return HunposTagger(self.path_to_model, self.path_to_binary)
+        except Exception:
+            # Give up the slot, so that a later (or waiting) request can try again
+            self._free_slot()
+            raise
+
+    @staticmethod
+    def _is_alive(tagger):
+        """Return whether the tagger's subprocess is still running."""
+        # HunposTagger doesn't expose its subprocess publicly
+        return tagger._hunpos.poll() is None
+
+    def _tag_with_timeout(self, tagger, tokens, deadline):
+        """POS-tag the tokens, killing the tagger's subprocess if it's still running at the deadline."""
+        timed_out = threading.Event()
+
+        def kill_tagger():
+            timed_out.set()
+            try:
+                tagger._hunpos.kill()
+            except OSError:
+                pass  # It finished (or died) just in time
+
+        watchdog = threading.Timer(max(deadline - time.time(), 0), kill_tagger)
+        watchdog.start()
+        try:
+            pos_tagged_tokens = tagger.tag(tokens)
+        except (IOError, OSError):
+            # Killing the subprocess breaks its pipes
+            if not timed_out.is_set():
+                raise
+        finally:
+            watchdog.cancel()
+        if timed_out.is_set():
+            raise TaggerTimeoutError("HunPos tagger did not finish within {} seconds".format(self.timeout))
+        return pos_tagged_tokens
+
+    def close(self):
+        """Shut down all the idle taggers in the pool."""
+        while True:
+            with self.condition:
+                if self.pid != os.getpid() or not self.idle_taggers:
+                    return
+                tagger = self.idle_taggers.popleft()
+            self._discard(tagger)
@@ -0,0 +1,61 @@
+"""Tests for MultiwordPhraseMatcher, against the loop of str.replace() calls that it replaced. Run this from
+the directory containing routes.py:
+
+    python -m unittest test_preprocessing
+"""
+
+import random
+import unittest
+from preprocessing import MultiwordPhraseMatcher
+
+
+def tokenize_with_replace_loop(text, phrases):
+    """Tokenize the phrases in a text as GameSage did before MultiwordPhraseMatcher, one phrase at a time."""
+    multiword_phrases = [phrase for phrase in phrases if len(phrase.split()) > 1]
+    tokenized_phrases = dict((phrase, '_'.join(phrase.split())) for phrase in multiword_phrases)
+    multiword_phrases.sort(key=lambda p: len(p.split()), reverse=True)
+    text = ' {} '.format(text)
+    for phrase in multiword_phrases:
+        while ' {} '.format(phrase) in text:
+            text = text.replace(' {} '.format(phrase), ' {} '.format(tokenized_phrases[phrase]))
+    return ' '.join(text.split())
+
+
+class MultiwordPhraseMatcherTest(unittest.TestCase):
+
+    def assert_matches_replace_loop(self, text, phrases):
+        self.assertEqual(
+            MultiwordPhraseMatcher(phrases=phrases).tokenize(text=text),
+            tokenize_with_replace_loop(text=text, phrases=phrases),
+            "Mismatch for text {!r} and phrases {!r}".format(text, phrases)
+        )
+
+    def test_longer_phrases_take_priority(self):
+        self.assert_matches_replace_loop(text='x a b c y', phrases=['a b', 'a b c', 'b c'])
+        self.assertEqual(MultiwordPhraseMatcher(phrases=['a b', 'a b c']).tokenize(text='x a b c y'), 'x a_b_c y')
+
+    def test_adjacent_occurrences(self):
+        self.assert_matches_replace_loop(text='a b a b a b', phrases=['a b'])
+        self.assert_matches_replace_loop(text='a a a a a', phrases=['a a'])
+
+    def test_phrase_matching_a_tokenized_phrase(self):
+        # 'a b' becomes 'a_b' first, which 'a_b c' then matches
+        self.assert_matches_replace_loop(text='x a b c y', phrases=['a b', 'a_b c'])
+        self.assertEqual(MultiwordPhraseMatcher(phrases=['a b', 'a_b c']).tokenize(text='x a b c y'), 'x a_b_c y')
+        # Given the other way around, 'a_b c' gets its turn before 'a b' has been tokenized
+        self.assert_matches_replace_loop(text='x a b c y', phrases=['a_b c', 'a b'])
+
+    def test_randomized_texts_and_phrases(self):
+        random_state = random.Random(0)
+        words = ['a', 'b', 'c', 'd', 'a_b', 'b_c', 'a_b_c']
+        for _ in xrange(2000):
+            phrases = [
+                ' '.join(random_state.choice(words) for _ in xrange(random_state.randint(1, 4)))
+                for _ in xrange(random_state.randint(1, 6))
+            ]
+            text = ' '.join(random_state.choice(words) for _ in xrange(random_state.randint(0, 12)))
+            self.assert_matches_replace_loop(text=text, phrases=phrases)
+
+
+if __name__ == '__main__':
+    unittest.main()
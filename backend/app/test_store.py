@@ -0,0 +1,46 @@
+"""Tests for GameStore's lookups by game ID. Run this from the directory containing routes.py:
+
+    python -m unittest test_store
+"""
+
+import unittest
+from store import GameStore
+
+
+class GameStoreLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        # Game IDs with a gap (3), as in the gameplay network
+        columns = dict((name, []) for name in GameStore.COLUMNS)
+        for game_id, title, year in (('1', 'Pong', '1972'), ('2', 'Tetris', '1984'), ('4', 'Doom', '1993')):
+            for name in GameStore.COLUMNS:
+                columns[name].append('')
+            columns['id'][-1], columns['title'][-1], columns['year'][-1] = game_id, title, year
+        self.store = GameStore(columns=columns)
+
+    def test_get_field_of_known_id(self):
+        self.assertEqual(self.store.get_field('2', 'title'), 'Tetris')
+        self.assertEqual(self.store.get_field(4, 'year'), '1993')
+
+    def test_get_field_rejects_unknown_id_in_range(self):
+        # ID 3 falls inside the dense ID array, but no game has it
+        self.assertRaises(KeyError, self.store.get_field, '3', 'title')
+        self.assertRaises(KeyError, self.store.get_field, 0, 'year')
+
+    def test_get_field_rejects_unknown_id_out_of_range(self):
+        self.assertRaises(KeyError, self.store.get_field, '5', 'title')
+        self.assertRaises(KeyError, self.store.get_field, -1, 'title')
+
+    def test_get_row_rejects_non_numeric_id(self):
+        self.assertIsNone(self.store.get_row('foo'))
+        self.assertIsNone(self.store.get('foo'))
+        self.assertRaises(KeyError, self.store.get_field, 'foo', 'title')
+
+    def test_unknown_id_is_not_in_store(self):
+        self.assertNotIn('3', self.store)
+        self.assertIsNone(self.store.get('3'))
+        self.assertRaises(KeyError, self.store.__getitem__, '3')
+
+
+if __name__ == '__main__':
+    unittest.main()
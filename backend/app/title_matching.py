@@ -0,0 +1,134 @@
+import re
+import time
+import unicodedata
+import numpy
+from store import GameNetGameView
+
+
+class FuzzyTitleMatcher(object):
+    """A typo-tolerant index over a GameNet network's titles, for resolving titles that don't match exactly.
+
+    Each title is normalized (case-folded, with punctuation dropped) and broken into its character
+    trigrams, and an inverted index maps each trigram to the rows of the titles containing it. A
+    query's candidates are the titles sharing the most trigrams with it, as measured by their Dice
+    coefficient, which numpy tallies over the query's posting lists all at once; only a short list
+    of the best candidates then get reranked by their (relatively expensive) edit distance to the
+    query, in order of their Dice coefficients, for as long as a time budget allows.
+    """
+
+    WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+    # How many of the candidates with the highest Dice coefficients get reranked by edit distance
+    SHORTLIST_SIZE = 30
+    # A match resolves a query outright only if it's at least this similar to it, and more
+    # similar by at least this margin than the next best match
+    RESOLVE_SIMILARITY = 0.85
+    RESOLVE_MARGIN = 0.05
+    # Matches whose trigrams and characters are both less similar to the query than this don't
+    # get suggested at all
+    SUGGEST_SIMILARITY = 0.4
+
+    def __init__(self, store):
+        """Initialize a FuzzyTitleMatcher object."""
+        self.store = store
+        self.normalized_titles = [self.normalize(title) for title in store.columns['title']]
+        self.trigram_postings, self.trigram_counts = self._build_index()
+
+    def normalize(self, title):
+        """Normalize a title for fuzzy matching: case-fold it, strip its accents, and reduce it to its words."""
+        decomposed_title = unicodedata.normalize('NFKD', self.store.casefold(title))
+        unaccented_title = u''.join(char for char in decomposed_title if not unicodedata.combining(char))
+        return u' '.join(self.WORD_PATTERN.findall(unaccented_title))
+
+    @staticmethod
+    def get_trigrams(normalized_title):
+        """Return the set of character trigrams of a normalized title, padded so that word starts count more."""
+        padded_title = u'  {} '.format(normalized_title)
+        return set(padded_title[i:i+3] for i in xrange(len(padded_title)-2))
+
+    def _build_index(self):
+        """Build the inverted index from each trigram to its titles' rows, and the number of trigrams of each title."""
+        rows_of_trigram = {}
+        trigram_counts = numpy.zeros(len(self.normalized_titles), dtype=numpy.int32)
+        for row, normalized_title in enumerate(self.normalized_titles):
+            trigrams = self.get_trigrams(normalized_title)
+            trigram_counts[row] = len(trigrams)
+            for trigram in trigrams:
+                rows_of_trigram.setdefault(trigram, []).append(row)
+        trigram_postings = dict(
+            (trigram, numpy.array(rows, dtype=numpy.int32)) for trigram, rows in rows_of_trigram.iteritems()
+        )
+        return trigram_postings, trigram_counts
+
+    @staticmethod
+    def compute_edit_distance(a, b):
+        """Return the edit distance between two strings, counting a transposition of adjacent characters as one edit."""
+        if len(a) < len(b):
+            a, b = b, a
+        row_before_previous_row = None
+        previous_row = range(len(b)+1)
+        for i, a_char in enumerate(a):
+            current_row = [i+1]
+            for j, b_char in enumerate(b):
+                if a_char == b_char:
+                    # Neighboring distances differ by at most one, so this is always the minimum
+                    edit_distance = previous_row[j]
+                else:
+                    edit_distance = min(previous_row[j+1], current_row[j], previous_row[j]) + 1
+                    if i and j and a_char == b[j-1] and a[i-1] == b_char:
+                        edit_distance = min(edit_distance, row_before_previous_row[j-1] + 1)
+                current_row.append(edit_distance)
+            row_before_previous_row, previous_row = previous_row, current_row
+        return previous_row[-1]
+
+    def find_candidates(self, normalized_query):
+        """Return (row, Dice coefficient) pairs of the titles sharing the most trigrams with a query, best first."""
+        query_trigrams = self.get_trigrams(normalized_query)
+        postings = [self.trigram_postings[trigram] for trigram in query_trigrams if trigram in self.trigram_postings]
+        if not postings:
+            return []
+        shared_trigram_counts = numpy.bincount(numpy.concatenate(postings), minlength=len(self.normalized_titles))
+        dice_coefficients = 2.0 * shared_trigram_counts / (len(query_trigrams) + self.trigram_counts)
+        shortlist_size = min(self.SHORTLIST_SIZE, len(dice_coefficients))
+        rows = numpy.argpartition(-dice_coefficients, shortlist_size-1)[:shortlist_size]
+        rows = rows[numpy.argsort(-dice_coefficients[rows], kind='mergesort')]
+        return [(int(row), float(dice_coefficients[row])) for row in rows if shared_trigram_counts[row]]
+
+    def match(self, query, k=5, time_budget=None):
+        """Return up to k (game view, similarity) pairs of the games whose titles best match the query, best first.
+
+        A match's similarity is one minus the edit distance between its normalized title and the
+        query's, relative to the longer of the two. Matches get ranked by the mean of their
+        similarity and Dice coefficient, so that titles that the query abbreviates or reorders
+        (e.g., 'zelda ocarina') still rank highly. If a time budget (in seconds) is given, then
+        candidates stop getting reranked once it runs out, and any that weren't reranked yet
+        are left out.
+        """
+        normalized_query = self.normalize(query)
+        if not normalized_query or k <= 0:
+            return []
+        start_time = time.time()
+        matches = []
+        for i, (row, dice_coefficient) in enumerate(self.find_candidates(normalized_query=normalized_query)):
+            # The first candidate always gets reranked, however tight the budget is
+            if i > 0 and time_budget is not None and time.time() - start_time > time_budget:
+                break
+            normalized_title = self.normalized_titles[row]
+            edit_distance = self.compute_edit_distance(normalized_query, normalized_title)
+            similarity = 1.0 - float(edit_distance) / max(len(normalized_query), len(normalized_title))
+            if max(similarity, dice_coefficient) >= self.SUGGEST_SIMILARITY:
+                matches.append((similarity, dice_coefficient, row))
+        matches.sort(key=lambda match: (-(match[0] + match[1]), -match[0], match[2]))
+        return [(GameNetGameView(store=self.store, row=row), similarity) for similarity, _, row in matches[:k]]
+
+    def resolve(self, query, k=5, time_budget=None):
+        """Return the game that a query unambiguously refers to (or else None), and up to k games it might refer to."""
+        matches = self.match(query=query, k=max(k, 2), time_budget=time_budget)
+        if matches:
+            # The most similar match might not be ranked first
+            matches_by_similarity = sorted(matches, key=lambda match: -match[1])
+            best_game, best_similarity = matches_by_similarity[0]
+            next_best_similarity = matches_by_similarity[1][1] if len(matches) > 1 else 0.0
+            if (best_similarity >= self.RESOLVE_SIMILARITY
+                    and best_similarity - next_best_similarity >= self.RESOLVE_MARGIN):
+                return best_game, []
+        return None, [game for game, _ in matches[:k]]